@@ -10,6 +10,9 @@ from datetime import datetime
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
 from flask_sqlalchemy import SQLAlchemy
 from data import routes_data, neighborhood_data
+from route_cache import bump_data_version, read_data_version
+from route_deltas import RouteDeltaFeed, publish_route_delta, publish_location_delta
+from routing_engine import TransitEngine, parse_fare
 
 # إعداد Flask
 app = Flask(__name__)
@@ -19,6 +22,54 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 db = SQLAlchemy(app)
 
+def mark_data_changed(reason: str):
+    """رفع إصدار البيانات حتى يتجاهل البوت إجابات المسارات المحفوظة القديمة"""
+    try:
+        bump_data_version(reason)
+    except OSError as e:
+        print(f"❌ خطأ في تحديث إصدار البيانات: {e}")
+
+def publish_route_change(op: str, route_data: dict, old_name: str = None):
+    """نشر تعديل خط واحد للبوت ولوحة التحكم بدلاً من إعادة بناء كل الفهارس"""
+    try:
+        publish_route_delta(op, route_data, old_name)
+    except OSError as e:
+        print(f"❌ خطأ في نشر تعديل الخط: {e}")
+        mark_data_changed(f'route_{op}')
+    
+    # حفظ البيانات في data_dynamic.py لإعادة التشغيل التالية
+    try:
+        from database_helper import update_bot_data as write_bot_data
+        write_bot_data(reset_planner=False)
+    except Exception as e:
+        print(f"❌ خطأ في التحديث التلقائي: {e}")
+
+def publish_location_change(location):
+    """نشر المكان الجديد للبوت (يُضاف لقاموس التصحيح الإملائي وفهارس البحث بدون إعادة بنائها)"""
+    try:
+        publish_location_delta({
+            'name': location.name,
+            'neighborhood': location.neighborhood,
+            'category': location.category
+        })
+    except OSError as e:
+        print(f"❌ خطأ في نشر المكان الجديد: {e}")
+
+def route_to_bot_data(route):
+    """تحويل خط من قاعدة البيانات إلى صيغة routes_data في البوت"""
+    try:
+        key_points = json.loads(route.key_points) if route.key_points else []
+    except ValueError:
+        key_points = []
+    return {
+        'routeName': route.name,
+        'fare': f"{route.fare} جنيه مصري",
+        'startArea': route.start_area or '',
+        'endArea': route.end_area or '',
+        'keyPoints': key_points,
+        'notes': route.notes or ''
+    }
+
 # إضافة مرشح JSON للقوالب
 @app.template_filter('from_json')
 def from_json_filter(value):
@@ -78,6 +129,18 @@ class RouteConnection(db.Model):
     def __repr__(self):
         return f'<RouteConnection {self.from_route.name} → {self.to_route.name} at {self.connection_point}>'
 
+class WalkingTransfer(db.Model):
+    """تحويلات المشي المستنتجة من الإحداثيات (يملؤها transfer_inference.py)"""
+    id = db.Column(db.Integer, primary_key=True)
+    from_stop = db.Column(db.String(200), nullable=False)
+    to_stop = db.Column(db.String(200), nullable=False)
+    distance_m = db.Column(db.Float, nullable=False)  # المسافة المستقيمة بالمتر
+    walking_time = db.Column(db.Integer, nullable=False)  # وقت المشي التقديري بالدقائق
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<WalkingTransfer {self.from_stop} ↔ {self.to_stop} ({self.walking_time} min)>'
+
 class User(db.Model):
     """جدول العملاء والمستخدمين"""
     id = db.Column(db.Integer, primary_key=True)
@@ -130,7 +193,7 @@ def init_database():
             for route in routes_data:
                 new_route = Route(
                     name=route['routeName'],
-                    fare=float(route['fare'].split()[0]) if 'fare' in route else 4.5,
+                    fare=parse_fare(route.get('fare')),
                     start_area=route.get('startArea', ''),
                     end_area=route.get('endArea', ''),
                     key_points=json.dumps(route['keyPoints'], ensure_ascii=False),
@@ -189,13 +252,7 @@ def add_route():
         
         db.session.add(new_route)
         db.session.commit()
-        
-        # تحديث بيانات البوت تلقائياً
-        try:
-            update_bot_data()
-            print("✅ تم تحديث بيانات البوت تلقائياً (إضافة)")
-        except Exception as e:
-            print(f"❌ خطأ في التحديث التلقائي: {e}")
+        publish_route_change('add', route_to_bot_data(new_route))
         
         flash(f'تم إضافة الخط "{name}" بنجاح!', 'success')
         return redirect(url_for('routes_list'))
@@ -245,6 +302,8 @@ def add_location():
         
         db.session.add(new_location)
         db.session.commit()
+        mark_data_changed('location_added')
+        publish_location_change(new_location)
         
         flash(f'تم إضافة المكان "{name}" بنجاح!', 'success')
         return redirect(url_for('locations_list'))
@@ -264,16 +323,7 @@ def export_data():
     locations = Location.query.all()
     
     # تجهيز بيانات الخطوط
-    routes_export = []
-    for route in routes:
-        routes_export.append({
-            'routeName': route.name,
-            'fare': f"{route.fare} جنيه مصري",
-            'startArea': route.start_area,
-            'endArea': route.end_area,
-            'keyPoints': json.loads(route.key_points),
-            'notes': route.notes
-        })
+    routes_export = [route_to_bot_data(route) for route in routes]
     
     # تجهيز بيانات الأماكن
     neighborhoods_export = {}
@@ -296,6 +346,7 @@ def edit_route(route_id):
     route = Route.query.get_or_404(route_id)
     
     if request.method == 'POST':
+        old_name = route.name
         route.name = request.form.get('name')
         route.fare = float(request.form.get('fare', 4.5))
         route.start_area = request.form.get('start_area', '')
@@ -305,13 +356,7 @@ def edit_route(route_id):
         route.notes = request.form.get('notes', '')
         
         db.session.commit()
-        
-        # تحديث بيانات البوت تلقائياً
-        try:
-            update_bot_data()
-            print("✅ تم تحديث بيانات البوت تلقائياً")
-        except Exception as e:
-            print(f"❌ خطأ في التحديث التلقائي: {e}")
+        publish_route_change('update', route_to_bot_data(route), old_name)
         
         flash(f'تم تحديث الخط "{route.name}" بنجاح!', 'success')
         return redirect(url_for('routes_list'))
@@ -343,9 +388,11 @@ def delete_route(route_id):
     """حذف خط"""
     route = Route.query.get_or_404(route_id)
     route_name = route.name
+    route_data = route_to_bot_data(route)
     
     db.session.delete(route)
     db.session.commit()
+    publish_route_change('remove', route_data, route_name)
     
     flash(f'تم حذف الخط "{route_name}" بنجاح!', 'success')
     return redirect(url_for('routes_list'))
@@ -367,6 +414,7 @@ def edit_location(location_id):
         location.location_notes = request.form.get('location_notes', '')
         
         db.session.commit()
+        mark_data_changed('location_edited')
         
         flash(f'تم تحديث المكان "{location.name}" بنجاح!', 'success')
         return redirect(url_for('locations_list'))
@@ -388,6 +436,7 @@ def delete_location(location_id):
     
     db.session.delete(location)
     db.session.commit()
+    mark_data_changed('location_deleted')
     
     flash(f'تم حذف المكان "{location_name}" بنجاح!', 'success')
     return redirect(url_for('locations_list'))
@@ -419,6 +468,7 @@ def add_connection():
         
         db.session.add(new_connection)
         db.session.commit()
+        mark_data_changed('connection_added')
         
         flash(f'تم إضافة الربط بنجاح!', 'success')
         return redirect(url_for('connections_list'))
@@ -440,6 +490,7 @@ def edit_connection(connection_id):
         connection.connection_notes = request.form.get('connection_notes', '')
         
         db.session.commit()
+        mark_data_changed('connection_edited')
         
         flash(f'تم تحديث الربط بنجاح!', 'success')
         return redirect(url_for('connections_list'))
@@ -454,6 +505,7 @@ def delete_connection(connection_id):
     
     db.session.delete(connection)
     db.session.commit()
+    mark_data_changed('connection_deleted')
     
     flash(f'تم حذف الربط بنجاح!', 'success')
     return redirect(url_for('connections_list'))
@@ -511,6 +563,139 @@ def delete_user(user_id):
     flash(f'تم حذف المستخدم "{user_name}" بنجاح!', 'success')
     return redirect(url_for('users_list'))
 
+# محرك المواصلات المبني من قاعدة البيانات لكل إصدار بيانات
+_batch_engine = {'version': None, 'engine': None, 'feed': None}
+
+def get_batch_engine():
+    """محرك المواصلات الحالي (يُعاد بناؤه بعد أي تعديل يرفع إصدار البيانات وتُطبق عليه تعديلات الخطوط)"""
+    version = read_data_version()
+    if _batch_engine['engine'] is None or _batch_engine['version'] != version:
+        from database_helper import get_routes_from_db
+        _batch_engine['feed'] = RouteDeltaFeed()
+        _batch_engine['engine'] = TransitEngine(get_routes_from_db())
+        _batch_engine['version'] = version
+    else:
+        _batch_engine['feed'].sync(_batch_engine['engine'])
+    return _batch_engine['engine']
+
+@app.route('/api/direct_routes', methods=['POST'])
+def batch_direct_routes():
+    """فحص الخطوط المباشرة لعدد كبير من الأزواج دفعة واحدة
+    المدخل: {"pairs": [["مكان 1", "مكان 2"], ...]}
+    """
+    payload = request.get_json(silent=True) or {}
+    pairs = payload.get('pairs')
+    if not isinstance(pairs, list) or not all(isinstance(pair, (list, tuple)) and len(pair) == 2 for pair in pairs):
+        return jsonify({'status': 'error', 'message': 'يجب إرسال pairs كقائمة أزواج [البداية، الوجهة]'}), 400
+    
+    engine = get_batch_engine()
+    results = engine.batch_direct_routes([(str(start), str(end)) for start, end in pairs])
+    
+    return jsonify({
+        'status': 'success',
+        'data_version': read_data_version(),
+        'results': [{
+            'start': str(start),
+            'end': str(end),
+            'direct': bool(route_indices),
+            'routes': [engine.routes[route_idx]['routeName'] for route_idx in route_indices]
+        } for (start, end), route_indices in zip(pairs, results)]
+    })
+
+# مخطط الرحلات وتحليل اتصال الشبكة والبحث بالدقائق لكل إصدار بيانات وتعديلات خطوط (تُبنى مرة واحدة بعد كل تعديل)
+_network_analysis = {'version': None, 'planner': None, 'analysis': None, 'isochrone': None}
+
+def get_dashboard_planner():
+    """مخطط الرحلات للبيانات الحالية مع روابط المشي من route_connection وwalking_transfer"""
+    engine = get_batch_engine()
+    version = (read_data_version(), _batch_engine['feed'].last_seq)
+    if _network_analysis['planner'] is None or _network_analysis['version'] != version:
+        from database_helper import get_route_connections_from_db, get_walking_transfers_from_db
+        from journey_planner import JourneyPlanner
+        _network_analysis.update(version=version, analysis=None, isochrone=None,
+                                 planner=JourneyPlanner(engine, get_route_connections_from_db(), get_walking_transfers_from_db()))
+    return _network_analysis['planner']
+
+def get_network_analysis():
+    """تحليل الوصول بين المحطات للبيانات الحالية"""
+    planner = get_dashboard_planner()
+    if _network_analysis['analysis'] is None:
+        from network_analysis import ReachabilityAnalysis
+        _network_analysis['analysis'] = ReachabilityAnalysis(planner)
+    return _network_analysis['analysis']
+
+def get_isochrone():
+    """البحث عن الأماكن الممكن الوصول إليها خلال N دقيقة (النتائج محفوظة لكل إصدار)"""
+    planner = get_dashboard_planner()
+    if _network_analysis['isochrone'] is None:
+        from database_helper import get_location_coordinates_from_db
+        from isochrone import Isochrone
+        from route_distances import RouteDistances
+        from spatial_index import load_geocache_coordinates
+        coordinates = load_geocache_coordinates()
+        coordinates.update(get_location_coordinates_from_db())
+        locations = [(location.name, location.neighborhood) for location in Location.query.all()]
+        _network_analysis['isochrone'] = Isochrone(planner, RouteDistances(planner.engine, coordinates), locations)
+    return _network_analysis['isochrone']
+
+def isochrone_params():
+    """قراءة (مكان البداية، الدقائق، التبديلات) من الطلب"""
+    from journey_planner import MAX_TRANSFERS
+    from isochrone import DEFAULT_ISOCHRONE_MINUTES
+    start = (request.args.get('start') or '').strip()
+    minutes = request.args.get('minutes', DEFAULT_ISOCHRONE_MINUTES, type=float)
+    transfers = min(max(request.args.get('transfers', MAX_TRANSFERS, type=int), 0), MAX_TRANSFERS)
+    return start, minutes, transfers
+
+@app.route('/api/isochrone')
+def isochrone_api():
+    """الأماكن الممكن الوصول إليها من start خلال minutes دقيقة وtransfers تبديل"""
+    start, minutes, transfers = isochrone_params()
+    if not start:
+        return jsonify({'status': 'error', 'message': 'يجب إرسال start'}), 400
+    results = get_isochrone().query(start, minutes, transfers)
+    return jsonify({
+        'status': 'success',
+        'data_version': read_data_version(),
+        'start': start,
+        'minutes': minutes,
+        'transfers': transfers,
+        'results': results
+    })
+
+@app.route('/isochrone')
+def isochrone_view():
+    """عرض الأماكن الممكن الوصول إليها مجمعة حسب الحي"""
+    from journey_planner import MAX_TRANSFERS
+    start, minutes, transfers = isochrone_params()
+    results = get_isochrone().query(start, minutes, transfers) if start else []
+    by_neighborhood = {}
+    for item in results:
+        by_neighborhood.setdefault(item['neighborhood'], []).append(item)
+    locations = [location.name for location in Location.query.order_by(Location.name).all()]
+    return render_template('isochrone.html',
+                           start=start,
+                           minutes=minutes,
+                           transfers=transfers,
+                           max_transfers=MAX_TRANSFERS,
+                           results=results,
+                           by_neighborhood=by_neighborhood,
+                           locations=locations)
+
+@app.route('/network')
+def network_analysis():
+    """خريطة اتصال الأحياء وتقرير الأحياء ضعيفة الاتصال"""
+    analysis = get_network_analysis()
+    transfers = min(max(request.args.get('transfers', 1, type=int), 0), analysis.max_transfers)
+    locations = [(location.name, location.neighborhood) for location in Location.query.all()]
+    heatmap = analysis.neighborhood_heatmap(locations, transfers)
+    report = analysis.badly_connected_report(locations, transfers)
+    return render_template('network_analysis.html',
+                           heatmap=heatmap,
+                           report=report,
+                           transfers=transfers,
+                           max_transfers=analysis.max_transfers)
+
 @app.route('/api/update_bot')
 def update_bot_data():
     """تحديث بيانات البوت"""
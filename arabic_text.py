@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+"""
+توحيد كتابة النص العربي قبل أي مقارنة أو فهرسة
+"المستشفى"/"المستشفي"، "الجامعة"/"الجامعه"، "إسكان"/"اسكان"، "٣"/"3" تصبح نفس المفتاح
+فتتحول مقارنات كثيرة من مطابقة تقريبية إلى بحث مباشر في القاموس
+"""
+
+import re
+from functools import lru_cache
+from typing import List, Tuple
+
+# عدد النصوص المحفوظة صيغتها الموحدة
+NORMALIZE_CACHE_SIZE = 16384
+
+_FOLD = {
+    # الألف بالهمزة أو المد والألف الوصلية ← ا
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    # الألف المقصورة ← ي، والتاء المربوطة ← ه
+    'ى': 'ي', 'ة': 'ه',
+    # الهمزة على الواو أو الياء
+    'ؤ': 'و', 'ئ': 'ي',
+}
+# التشكيل (الفتحة حتى السكون والألف الخنجرية) والتطويل تُحذف
+_FOLD.update({chr(code): None for code in range(0x064B, 0x0653)})
+_FOLD.update({'ٰ': None, 'ـ': None})
+# الأرقام العربية والفارسية ← 0-9
+_FOLD.update({chr(0x0660 + digit): str(digit) for digit in range(10)})
+_FOLD.update({chr(0x06F0 + digit): str(digit) for digit in range(10)})
+_FOLD_TABLE = str.maketrans(_FOLD)
+
+_SPACES = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
+def normalize_arabic(text: str) -> str:
+    """الصيغة الموحدة للنص (حروف صغيرة، بدون تشكيل أو تطويل، ومسافات مفردة)"""
+    return _SPACES.sub(' ', text.lower().translate(_FOLD_TABLE)).strip()
+
+
+def normalize_with_positions(text: str) -> Tuple[str, List[int]]:
+    """
+    الصيغة الموحدة مع موضع كل حرف منها في النص الأصلي (وعنصر أخير = طول النص الأصلي)
+    لاستخراج أجزاء النص الأصلي من مواضع وُجدت في النص الموحد
+    """
+    chars: List[str] = []
+    positions: List[int] = []
+    for position, ch in enumerate(text):
+        folded = ch.lower().translate(_FOLD_TABLE)
+        for out in folded:
+            if out.isspace():
+                if not chars or chars[-1] == ' ':
+                    continue
+                out = ' '
+            chars.append(out)
+            positions.append(position)
+    if chars and chars[-1] == ' ':
+        chars.pop()
+        positions.pop()
+    positions.append(len(text))
+    return ''.join(chars), positions
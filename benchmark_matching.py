@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+قياس أداء مطابقة أسماء المعالم على قائمة معالم صناعية كبيرة
+الاستخدام: python benchmark_matching.py --landmarks 10000 --queries 300
+"""
+
+import argparse
+import random
+import time
+from typing import List, Dict
+
+from arabic_text import normalize_arabic
+from nlp_search import NLPSearchSystem
+from tfidf_ranker import DEFAULT_TOP_K
+
+_KINDS = ['مستشفى', 'مدرسة', 'مسجد', 'صيدلية', 'مول', 'شارع', 'نادي', 'بنك', 'كنيسة', 'مخبز', 'سوق', 'عيادة']
+_NAMES = ['السلام', 'النور', 'الفرما', 'الزهور', 'الشرق', 'العرب', 'المناخ', 'الضواحي', 'الجنوب', 'الحرية',
+          'الأمل', 'الرحمة', 'النصر', 'الشهداء', 'التحرير', 'الجمهورية', 'الكرنك', 'الهدى', 'الفتح', 'الإيمان']
+_LETTERS = 'ابتثجحخدذرزسشصضطظعغفقكلمنهوي'
+
+
+def make_synthetic_landmarks(count: int = 10000, seed: int = 5) -> Dict:
+    """بيانات أحياء صناعية بنفس شكل neighborhood_data"""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add(f"{rng.choice(_KINDS)} {rng.choice(_NAMES)} {rng.randrange(1, count)}")
+    neighborhoods: Dict[str, Dict[str, List[str]]] = {}
+    for i, name in enumerate(sorted(names)):
+        neighborhoods.setdefault(f"حي {i % 25}", {}).setdefault(name.split()[0], []).append(name)
+    return neighborhoods
+
+
+def misspell(name: str, rng: random.Random) -> str:
+    """خطأ إملائي واحد: حذف أو استبدال حرف"""
+    position = rng.randrange(len(name))
+    if rng.random() < 0.5:
+        return name[:position] + name[position + 1:]
+    return name[:position] + rng.choice(_LETTERS) + name[position + 1:]
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    """قيمة النسبة المئوية من عينات مرتبة"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def _scan_best_match(system: NLPSearchSystem, query: str, min_score: float = 0.6):
+    """المطابقة القديمة: SequenceMatcher على كل المعالم"""
+    query = query.lower().strip()
+    best_name, best_score = None, min_score
+    for landmark_name in system.landmarks_index:
+        score = system.similarity_score(query, landmark_name)
+        if score > best_score:
+            best_name, best_score = landmark_name, score
+    return system.landmarks_index[best_name]['data'].get('name', best_name) if best_name else None
+
+
+def benchmark_matching(landmark_count: int, queries: int, seed: int = 13) -> Dict:
+    """مقارنة زمن find_best_match بالفهرس بزمن المرور على كل المعالم"""
+    started = time.perf_counter()
+    system = NLPSearchSystem(make_synthetic_landmarks(landmark_count))
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(seed)
+    names = list(system.landmarks_index)
+    samples = [misspell(rng.choice(names), rng) for _ in range(queries)]
+    timings = {'index': [], 'scan': []}
+    agreed = 0
+    for query in samples:
+        started = time.perf_counter()
+        match = system.find_best_match(query)
+        timings['index'].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        expected = _scan_best_match(system, query)
+        timings['scan'].append((time.perf_counter() - started) * 1000)
+        agreed += (match['name'] if match else None) == expected
+
+    result = {'build_ms': build_ms, 'agreed': agreed, 'queries': queries}
+    for name, values in timings.items():
+        result[f'{name}_mean_ms'] = sum(values) / len(values)
+        result[f'{name}_p99_ms'] = _percentile(values, 0.99)
+    return result
+
+
+def benchmark_top_matches(landmark_count: int, queries: int, seed: int = 13) -> Dict:
+    """زمن أقرب k معالم بمصفوفة TF-IDF مقابل ترتيب كل المعالم بـ SequenceMatcher، ونسبة وجود الاسم الصحيح"""
+    system = NLPSearchSystem(make_synthetic_landmarks(landmark_count))
+    started = time.perf_counter()
+    system.get_ranker()
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(seed)
+    names = list(system.landmarks_index)
+    samples = [(name, misspell(name, rng)) for name in (rng.choice(names) for _ in range(queries))]
+    timings = {'ranker': [], 'scan': []}
+    found = {'ranker': 0, 'scan': 0}
+    for name, query in samples:
+        started = time.perf_counter()
+        ranked = [normalize_arabic(match['name']) for match in system.find_top_matches(query, DEFAULT_TOP_K)]
+        timings['ranker'].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        scanned = sorted(names, key=lambda landmark_name: -system.similarity_score(query, landmark_name))[:DEFAULT_TOP_K]
+        timings['scan'].append((time.perf_counter() - started) * 1000)
+        found['ranker'] += name in ranked
+        found['scan'] += name in scanned
+
+    result = {'build_ms': build_ms, 'queries': queries}
+    for key, values in timings.items():
+        result[f'{key}_mean_ms'] = sum(values) / len(values)
+        result[f'{key}_p99_ms'] = _percentile(values, 0.99)
+        result[f'{key}_found'] = found[key]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء مطابقة أسماء المعالم")
+    parser.add_argument('--landmarks', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=300)
+    parser.add_argument('--top-k', action='store_true', help=f"قياس أقرب {DEFAULT_TOP_K} معالم (TF-IDF)")
+    args = parser.parse_args()
+
+    if args.top_k:
+        result = benchmark_top_matches(args.landmarks, args.queries)
+        print(f"بناء مصفوفة TF-IDF: {result['build_ms']:.1f} ms")
+        for name, title in (('ranker', "TF-IDF"), ('scan', "كل المعالم")):
+            print(f"{title}: متوسط {result[name + '_mean_ms']:.2f} ms | p99 {result[name + '_p99_ms']:.2f} ms"
+                  f" | الاسم الصحيح ضمن الاقتراحات {result[name + '_found']}/{result['queries']}")
+        return
+
+    result = benchmark_matching(args.landmarks, args.queries)
+    print(f"بناء الفهرس: {result['build_ms']:.1f} ms")
+    for name, title in (('index', "بالفهرس"), ('scan', "كل المعالم")):
+        print(f"{title}: متوسط {result[name + '_mean_ms']:.2f} ms | p99 {result[name + '_p99_ms']:.2f} ms")
+    print(f"نفس النتيجة: {result['agreed']}/{result['queries']}")
+
+
+if __name__ == "__main__":
+    main()
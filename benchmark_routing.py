@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+قياس أداء محرك المواصلات على شبكة صناعية كبيرة
+الاستخدام: python benchmark_routing.py --routes 500 --stops 10000 --queries 200
+           python benchmark_routing.py --routes 100 --stops 2000 --hub-labels
+"""
+
+import argparse
+import random
+import time
+from typing import List, Dict
+
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+
+
+def make_synthetic_network(route_count: int = 500, stop_count: int = 10000,
+                           stops_per_route: int = 40, seed: int = 7) -> List[Dict]:
+    """إنشاء شبكة خطوط صناعية على شبكة مربعة من المحطات"""
+    rng = random.Random(seed)
+    side = max(2, int(stop_count ** 0.5))
+    moves = [(0, 1), (1, 0), (0, -1), (-1, 0)]
+    routes = []
+    for route_number in range(route_count):
+        x, y = rng.randrange(side), rng.randrange(side)
+        dx, dy = rng.choice(moves)
+        key_points = []
+        visited = set()
+        while len(key_points) < stops_per_route:
+            if (x, y) not in visited:
+                visited.add((x, y))
+                # أسماء بطول ثابت حتى لا يحتوي اسم محطة اسماً آخر
+                key_points.append(f"محطة {x:03d}-{y:03d}")
+            # تغيير الاتجاه أحياناً أو عند حافة الشبكة
+            if rng.random() < 0.2 or not (0 <= x + dx < side and 0 <= y + dy < side):
+                dx, dy = rng.choice([m for m in moves if 0 <= x + m[0] < side and 0 <= y + m[1] < side])
+            x, y = x + dx, y + dy
+        routes.append({
+            'routeName': f"خط {route_number}",
+            'fare': f"{rng.choice([4.5, 5, 6])} جنيه مصري",
+            'keyPoints': key_points
+        })
+    return routes
+
+
+def _percentile(samples: List[float], fraction: float) -> float:
+    """قيمة النسبة المئوية من عينات مرتبة"""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def benchmark_planner(routes: List[Dict], queries: int, max_transfers: int, seed: int = 11) -> Dict:
+    """قياس زمن بناء الفهرس وزمن الاستعلام للمخطط"""
+    started = time.perf_counter()
+    engine = TransitEngine(routes)
+    planner = JourneyPlanner(engine)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    rng = random.Random(seed)
+    served = [stop_id for stop_id, served_by in enumerate(engine.stop_routes) if served_by]
+    timings = []
+    found = 0
+    for _ in range(queries):
+        source, target = rng.sample(served, 2)
+        started = time.perf_counter()
+        journeys = planner.plan_between_stops([source], [target], max_transfers=max_transfers)
+        timings.append((time.perf_counter() - started) * 1000)
+        found += bool(journeys)
+
+    return {
+        'build_ms': build_ms,
+        'mean_ms': sum(timings) / len(timings),
+        'p50_ms': _percentile(timings, 0.5),
+        'p99_ms': _percentile(timings, 0.99),
+        'found': found,
+        'queries': queries
+    }
+
+
+def benchmark_hub_labels(routes: List[Dict], queries: int, max_transfers: int, seed: int = 11) -> Dict:
+    """مقارنة فهرس تسميات المحاور بالبحث المباشر على نفس أزواج المحطات"""
+    from route_distances import RouteDistances
+    from hub_labels import HubLabels, transit_graph, online_minutes
+
+    engine = TransitEngine(routes)
+    planner = JourneyPlanner(engine)
+    distances = RouteDistances(engine, {})
+    started = time.perf_counter()
+    labels = HubLabels.build(planner, distances)
+    build_ms = (time.perf_counter() - started) * 1000
+    _, graph = transit_graph(planner, distances)
+
+    rng = random.Random(seed)
+    served = [stop_id for stop_id, served_by in enumerate(engine.stop_routes) if served_by]
+    pairs = [rng.sample(served, 2) for _ in range(queries)]
+    timings = {'labels': [], 'dijkstra': [], 'planner': []}
+    mismatches = 0
+    for source, target in pairs:
+        started = time.perf_counter()
+        label_minutes = labels.stop_minutes(source, target)
+        timings['labels'].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        search_minutes = online_minutes(graph, [source], [target])
+        timings['dijkstra'].append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        planner.plan_between_stops([source], [target], max_transfers=max_transfers)
+        timings['planner'].append((time.perf_counter() - started) * 1000)
+        # الفهرس يحفظ الدقائق كـ float32
+        if search_minutes == float('inf'):
+            mismatches += label_minutes != search_minutes
+        else:
+            mismatches += abs(label_minutes - search_minutes) > 1e-3 * max(1.0, search_minutes)
+
+    stop_count = len(labels.out_offsets) - 1
+    result = {
+        'build_ms': build_ms,
+        'labels_per_stop': labels.label_count() / max(1, 2 * stop_count),
+        'mismatches': mismatches,
+        'queries': queries
+    }
+    for name, samples in timings.items():
+        result[f'{name}_mean_ms'] = sum(samples) / len(samples)
+        result[f'{name}_p99_ms'] = _percentile(samples, 0.99)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="قياس أداء مخطط الرحلات")
+    parser.add_argument('--routes', type=int, default=500)
+    parser.add_argument('--stops', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--max-transfers', type=int, default=2)
+    parser.add_argument('--hub-labels', action='store_true', help="مقارنة فهرس تسميات المحاور بالبحث المباشر")
+    args = parser.parse_args()
+
+    routes = make_synthetic_network(args.routes, args.stops)
+    result = benchmark_planner(routes, args.queries, args.max_transfers)
+    print(f"بناء الفهرس: {result['build_ms']:.1f} ms")
+    print(f"المخطط: متوسط {result['mean_ms']:.2f} ms | p50 {result['p50_ms']:.2f} ms | p99 {result['p99_ms']:.2f} ms "
+          f"| رحلات موجودة {result['found']}/{result['queries']}")
+
+    if args.hub_labels:
+        result = benchmark_hub_labels(routes, args.queries, args.max_transfers)
+        print(f"بناء تسميات المحاور: {result['build_ms'] / 1000:.1f} s | متوسط {result['labels_per_stop']:.1f} محور لكل قائمة")
+        for name, title in (('labels', "تسميات المحاور"), ('dijkstra', "بحث مباشر بالدقائق"), ('planner', "المخطط")):
+            print(f"{title}: متوسط {result[name + '_mean_ms']:.3f} ms | p99 {result[name + '_p99_ms']:.3f} ms")
+        print(f"اختلافات عن البحث المباشر: {result['mismatches']}/{result['queries']}")
+
+
+if __name__ == "__main__":
+    main()
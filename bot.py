@@ -9,6 +9,10 @@ from telegram.ext import (
 )
 from telegram.constants import ParseMode
 
+from route_cache import route_answer_cache
+from proximity_index import get_proximity_index
+from arabic_text import normalize_arabic
+
 # --- استيراد البيانات والتوكن ---
 try:
     from config import BOT_TOKEN
@@ -55,7 +59,7 @@ def get_landmark_data_from_name(landmark_name: str, neighborhoods_dict: dict) ->
     if not isinstance(landmark_name, str):
         logger.error(f"Invalid type for landmark_name: {type(landmark_name)}")
         return None
-    search_name = landmark_name.strip().lower()
+    search_name = normalize_arabic(landmark_name)
     if not search_name:
         logger.warning("Empty landmark name received for search.")
         return None
@@ -71,7 +75,7 @@ def get_landmark_data_from_name(landmark_name: str, neighborhoods_dict: dict) ->
                  for landmark_dict in landmarks:
                       current_name = landmark_dict.get("name")
                       # Ensure current_name is a string before comparing
-                      if isinstance(current_name, str) and current_name.strip().lower() == search_name:
+                      if isinstance(current_name, str) and normalize_arabic(current_name) == search_name:
                            logger.debug(f"Exact match found: {landmark_dict}")
                            # Return a copy including neighborhood and category
                            return_data = landmark_dict.copy()
@@ -81,7 +85,7 @@ def get_landmark_data_from_name(landmark_name: str, neighborhoods_dict: dict) ->
             elif landmarks and isinstance(landmarks[0], str): # Old structure [str, str] (Fallback, should not happen with correct data.py)
                 logger.warning(f"Category '{category}' in neighborhood '{neighborhood}' seems to use old data structure (list of strings).")
                 for item_name in landmarks:
-                     if isinstance(item_name, str) and item_name.strip().lower() == search_name:
+                     if isinstance(item_name, str) and normalize_arabic(item_name) == search_name:
                           logger.debug(f"Fallback match found for string: {item_name}")
                           # Return basic structure if found in old format list
                           return {"name": landmark_name, "served_by": {}, "neighborhood": neighborhood, "category": category}
@@ -512,13 +516,18 @@ def find_route_with_proximity(start_landmark_name, end_landmark_name, available_
          logger.error(f"Invalid landmark names received: Start={type(start_landmark_name)}, End={type(end_landmark_name)}")
          return "❌ خطأ في بيانات البحث."
 
-    if start_landmark_name.strip().lower() == end_landmark_name.strip().lower():
+    if normalize_arabic(start_landmark_name) == normalize_arabic(end_landmark_name):
         return f"✅ أنت بالفعل في وجهتك أو قريب جداً منها: **'{start_landmark_name}'**!"
 
-    logger.debug(f"Looking up START landmark: '{start_landmark_name}'")
-    start_data = get_landmark_data_from_name(start_landmark_name, neighborhoods)
-    logger.debug(f"Looking up END landmark: '{end_landmark_name}'")
-    end_data = get_landmark_data_from_name(end_landmark_name, neighborhoods)
+    cached = route_answer_cache.get(start_landmark_name, end_landmark_name, namespace='proximity', routes=available_routes)
+    if cached:
+        logger.info(f"Cache hit for '{start_landmark_name}' -> '{end_landmark_name}' ({len(cached['result'])} options)")
+        return cached['text']
+
+    # كل البيانات تأتي من الفهرس المبني مرة واحدة (بدون مسح شجرة الأحياء أو نقاط الخطوط)
+    index = get_proximity_index(available_routes, neighborhoods)
+    start_data = index.get_landmark(start_landmark_name)
+    end_data = index.get_landmark(end_landmark_name)
 
     if not start_data:
         logger.warning(f"Could not find start landmark data for '{start_landmark_name}'.")
@@ -527,97 +536,10 @@ def find_route_with_proximity(start_landmark_name, end_landmark_name, available_
         logger.warning(f"Could not find end landmark data for '{end_landmark_name}'.")
         return f"❌ عذراً، لم أتمكن من العثور على بيانات لنقطة النهاية '{end_landmark_name}'."
 
-    start_served_by = start_data.get("served_by", {}) if isinstance(start_data, dict) else {}
-    end_served_by = end_data.get("served_by", {}) if isinstance(end_data, dict) else {}
-    logger.debug(f"START ('{start_landmark_name}') served_by: {start_served_by}")
-    logger.debug(f"END ('{end_landmark_name}') served_by: {end_served_by}")
-
-    if not start_served_by: logger.warning(f"Start landmark '{start_landmark_name}' has empty/invalid 'served_by' data: {start_served_by}")
-    if not end_served_by: logger.warning(f"End landmark '{end_landmark_name}' has empty/invalid 'served_by' data: {end_served_by}")
-
-
-    acceptable_proximity = ["قريبة جدا", "متوسطة"]
-    common_routes_found = []
-    logger.debug(f"Acceptable proximity levels: {acceptable_proximity}")
-    logger.debug(f"Checking routes listed in START served_by keys: {list(start_served_by.keys())}")
-
-    for route_name_base, start_info in start_served_by.items():
-        # Skip if route_name_base itself is not a valid route (e.g., if served_by wasn't properly structured)
-        if not isinstance(start_info, dict): continue
-        logger.debug(f"Processing potential base route: '{route_name_base}'")
-
-        if route_name_base in end_served_by:
-            end_info = end_served_by[route_name_base]
-            if not isinstance(end_info, dict): continue
-
-            logger.debug(f"... Route '{route_name_base}' found in END served_by.")
-            start_prox = start_info.get("proximity")
-            end_prox = end_info.get("proximity")
-            logger.debug(f"... Route '{route_name_base}': Start prox='{start_prox}', End prox='{end_prox}'")
-
-            is_start_prox_acceptable = start_prox in acceptable_proximity
-            is_end_prox_acceptable = end_prox in acceptable_proximity
-            logger.debug(f"... Proximity check: Start acceptable={is_start_prox_acceptable}, End acceptable={is_end_prox_acceptable}")
-
-            if is_start_prox_acceptable and is_end_prox_acceptable:
-                logger.debug(f"... Proximity ACCEPTABLE for '{route_name_base}'. Checking direction...")
-
-                start_nearest_stop = start_info.get("nearest_stop")
-                end_nearest_stop = end_info.get("nearest_stop")
-                logger.debug(f"... Nearest stops from data: Start='{start_nearest_stop}', End='{end_nearest_stop}'")
-
-                if not start_nearest_stop or not end_nearest_stop:
-                    logger.warning(f"... Missing nearest_stop data for route '{route_name_base}'. Cannot check direction.")
-                    continue
-
-                # Find ALL actual route variants in routes_data that contain the base name
-                matching_variants = [r for r in available_routes if isinstance(r.get("routeName"), str) and route_name_base in r.get("routeName")]
-                if not matching_variants:
-                     logger.warning(f"... No route definitions found in routes_data for base name '{route_name_base}'.")
-                     continue
-
-                variant_found_valid_sequence = False
-                for route_definition in matching_variants:
-                     actual_route_name = route_definition.get("routeName")
-                     key_points = route_definition.get("keyPoints")
-                     if not key_points or not isinstance(key_points, list):
-                         logger.warning(f"   ... Route variant '{actual_route_name}' has invalid keyPoints.")
-                         continue
-
-                     # Find indices of the NEAREST STOPS (case-insensitive, whitespace-insensitive)
-                     start_stop_search = start_nearest_stop.strip().lower()
-                     end_stop_search = end_nearest_stop.strip().lower()
-                     start_indices = [i for i, point in enumerate(key_points) if isinstance(point, str) and start_stop_search in point.strip().lower()]
-                     end_indices = [i for i, point in enumerate(key_points) if isinstance(point, str) and end_stop_search in point.strip().lower()]
-                     logger.debug(f"   ... Checking variant '{actual_route_name}': Start Stop '{start_nearest_stop}' indices={start_indices}, End Stop '{end_nearest_stop}' indices={end_indices}")
-
-                     if not start_indices: logger.warning(f"   ... Nearest start stop '{start_nearest_stop}' NOT found in keyPoints of '{actual_route_name}'.")
-                     if not end_indices: logger.warning(f"   ... Nearest end stop '{end_nearest_stop}' NOT found in keyPoints of '{actual_route_name}'.")
-
-                     if start_indices and end_indices:
-                         if any(s_idx < e_idx for s_idx in start_indices for e_idx in end_indices):
-                             logger.info(f"   ... VALID sequence found for route variant '{actual_route_name}'.")
-                             common_routes_found.append({
-                                 "routeName": actual_route_name,
-                                 "start_landmark_name": start_landmark_name,
-                                 "end_landmark_name": end_landmark_name,
-                                 "start_proximity": start_prox,
-                                 "end_proximity": end_prox,
-                                 "start_nearest_stop": start_nearest_stop,
-                                 "end_nearest_stop": end_nearest_stop,
-                                 "fare": route_definition.get('fare', 'غير محددة'),
-                                 "notes": route_definition.get('notes', '')
-                             })
-                             variant_found_valid_sequence = True
-                             # Don't break, allow finding multiple variants (e.g., inner/outer return)
-                         # else: logger.debug(f"   ... Invalid sequence for route variant '{actual_route_name}'.")
-
-                if not variant_found_valid_sequence:
-                     logger.warning(f"... Base route '{route_name_base}' had acceptable proximity, but NO variant had correct stop sequence.")
-
-            else: logger.debug(f"... Proximity NOT acceptable for '{route_name_base}'. Skipping.")
-        # else: logger.debug(f"... Route '{route_name_base}' (from start) not found in END served_by.")
+    if not start_data.get("served_by"): logger.warning(f"Start landmark '{start_landmark_name}' has empty/invalid 'served_by' data.")
+    if not end_data.get("served_by"): logger.warning(f"End landmark '{end_landmark_name}' has empty/invalid 'served_by' data.")
 
+    common_routes_found = index.find_direct_options(start_landmark_name, end_landmark_name, start_data, end_data)
 
     logger.debug(f"Finished checking direct routes. Found {len(common_routes_found)} options.")
 
@@ -640,13 +562,17 @@ def find_route_with_proximity(start_landmark_name, end_landmark_name, available_
          final_reply = f"تم العثور على الخيارات التالية:\n\n"
          final_reply += "\n\n---\n\n".join(possible_routes_details)
          final_reply += "\n\n**ملاحظة:** دقة أماكن الركوب/النزول والقرب تعتمد على البيانات التي أدخلناها. يمكنك دائماً سؤال السائق للتأكيد."
+         route_answer_cache.put(start_landmark_name, end_landmark_name, common_routes_found, final_reply, namespace='proximity',
+                                  routes=available_routes)
          return final_reply
 
     # --- No direct routes found ---
     logger.warning(f"FINAL VERDICT: No direct routes found after proximity/sequence checks for '{start_landmark_name}' -> '{end_landmark_name}'.")
     # (Future: Add transfer logic here)
     reason = "لعدم وجود خط مباشر يخدم المكانين معاً بدرجة قرب مقبولة وبالترتيب الصحيح حسب البيانات الحالية."
-    return f"❌ عذراً، لم أجد مساراً مباشراً حالياً.\n{reason}\nقد تحتاج لخط آخر أو تبديل مواصلات (سيتم إضافة هذه الخيارات لاحقاً)."
+    final_reply = f"❌ عذراً، لم أجد مساراً مباشراً حالياً.\n{reason}\nقد تحتاج لخط آخر أو تبديل مواصلات (سيتم إضافة هذه الخيارات لاحقاً)."
+    route_answer_cache.put(start_landmark_name, end_landmark_name, [], final_reply, namespace='proximity', routes=available_routes)
+    return final_reply
 
 # --- دالة الإلغاء cancel ---
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
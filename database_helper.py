@@ -6,6 +6,18 @@
 import sqlite3
 import json
 
+from journey_planner import JourneyPlanner, MAX_TRANSFERS
+from routing_engine import TransitEngine
+from fare_table import get_fare_table
+from spatial_index import parse_coordinates, load_geocache_coordinates, build_stop_index, SpatialIndex
+from route_deltas import RouteDeltaFeed, LOCATION_DELTA_LOG_FILE, latest_delta_seq, compact_delta_log
+
+# مخطط الرحلات المبني من قاعدة البيانات (يُعاد بناؤه بعد تحديث البيانات)
+_transit_planner = None
+_stop_spatial_index = None
+# متابعة تعديلات الخطوط لتطبيقها على مخطط الرحلات بدون إعادة بنائه
+_route_delta_feed = None
+
 def get_routes_from_db():
     """قراءة جميع الخطوط من قاعدة البيانات"""
     try:
@@ -66,6 +78,26 @@ def get_neighborhoods_from_db():
         print(f"خطأ في قراءة الأماكن من قاعدة البيانات: {e}")
         return {}
 
+def get_location_coordinates_from_db():
+    """قراءة إحداثيات الأماكن المسجلة في جدول location"""
+    try:
+        conn = sqlite3.connect('admin_bot.db')
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT name, coordinates FROM location WHERE coordinates IS NOT NULL AND coordinates != ''")
+        
+        coordinates = {}
+        for name, value in cursor.fetchall():
+            parsed = parse_coordinates(value)
+            if parsed:
+                coordinates[name] = parsed
+        
+        conn.close()
+        return coordinates
+    except Exception as e:
+        print(f"خطأ في قراءة الإحداثيات من قاعدة البيانات: {e}")
+        return {}
+
 def search_locations_by_name(location_name: str, limit: int = 10):
     """البحث عن الأماكن بالاسم مع معلومات التصنيف"""
     try:
@@ -77,7 +109,7 @@ def search_locations_by_name(location_name: str, limit: int = 10):
         query = """
         SELECT name, neighborhood, category, coordinates, 
                location_type, walking_distance, location_notes
-        FROM locations 
+        FROM location 
         WHERE name LIKE ? OR name LIKE ? OR name LIKE ?
         ORDER BY 
             CASE 
@@ -191,8 +223,80 @@ def find_route_connections(from_route_id: int, to_route_id: int):
         print(f"خطأ في البحث عن روابط المواصلات: {e}")
         return []
 
-def find_best_route_with_transfers(start_location: str, end_location: str):
-    """البحث عن أفضل مسار مع إمكانية التحويل"""
+def get_route_connections_from_db():
+    """قراءة روابط التبديل بين الخطوط من جدول route_connection"""
+    try:
+        conn = sqlite3.connect('admin_bot.db')
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        query = """
+        SELECT rc.connection_point, rc.walking_time, rc.connection_notes,
+               r1.name as from_route_name, r2.name as to_route_name
+        FROM route_connection rc
+        JOIN route r1 ON rc.from_route_id = r1.id
+        JOIN route r2 ON rc.to_route_id = r2.id
+        """
+        cursor.execute(query)
+        
+        results = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return results
+        
+    except Exception as e:
+        print(f"خطأ في قراءة روابط المواصلات: {e}")
+        return []
+
+def get_walking_transfers_from_db():
+    """قراءة تحويلات المشي المستنتجة من جدول walking_transfer (انظر transfer_inference.py)"""
+    try:
+        conn = sqlite3.connect('admin_bot.db')
+        conn.row_factory = sqlite3.Row
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT from_stop, to_stop, distance_m, walking_time FROM walking_transfer")
+        
+        results = [dict(row) for row in cursor.fetchall()]
+        conn.close()
+        return results
+        
+    except sqlite3.OperationalError:
+        # الجدول لم يُنشأ بعد
+        return []
+    except Exception as e:
+        print(f"خطأ في قراءة تحويلات المشي: {e}")
+        return []
+
+def get_transit_planner(refresh: bool = False) -> JourneyPlanner:
+    """إرجاع مخطط الرحلات المبني من الخطوط والروابط في قاعدة البيانات"""
+    global _transit_planner, _stop_spatial_index, _route_delta_feed
+    if _transit_planner is None or refresh:
+        _route_delta_feed = RouteDeltaFeed()
+        engine = TransitEngine(get_routes_from_db())
+        _transit_planner = JourneyPlanner(engine, get_route_connections_from_db(), get_walking_transfers_from_db())
+        # أرقام المحطات تغيرت فيُعاد بناء الفهرس المكاني عند الطلب
+        _stop_spatial_index = None
+    elif _route_delta_feed.sync(_transit_planner.engine):
+        # قد تظهر محطات جديدة لها إحداثيات
+        _stop_spatial_index = None
+    return _transit_planner
+
+def get_stop_spatial_index(refresh: bool = False) -> SpatialIndex:
+    """الفهرس المكاني لمحطات مخطط الرحلات (إحداثيات location ثم geocache.json)"""
+    global _stop_spatial_index
+    planner = get_transit_planner()
+    if _stop_spatial_index is None or refresh:
+        coordinates = load_geocache_coordinates()
+        coordinates.update(get_location_coordinates_from_db())
+        _stop_spatial_index = build_stop_index(planner.engine, coordinates)
+    return _stop_spatial_index
+
+def find_best_route_with_transfers(start_location: str, end_location: str, max_transfers: int = MAX_TRANSFERS,
+                                   max_fare: float = None, cheapest_first: bool = False):
+    """
+    البحث عن أفضل مسار مع إمكانية التحويل (حتى max_transfers تبديل)
+    max_fare: أقصى إجمالي تعريفة، cheapest_first: ترتيب الرحلات من الأرخص
+    """
     
     # البحث عن الأماكن أولاً
     start_locations = search_locations_by_name(start_location, 5)
@@ -208,29 +312,39 @@ def find_best_route_with_transfers(start_location: str, end_location: str):
     start_loc = start_locations[0]
     end_loc = end_locations[0]
     
-    # البحث عن الخطوط المباشرة
-    start_routes = get_routes_serving_location(start_loc['name'])
-    end_routes = get_routes_serving_location(end_loc['name'])
+    # تحليل المكانين مرة واحدة للفحص السريع وللبحث
+    planner = get_transit_planner()
+    engine = planner.engine
+    fare_table = get_fare_table(engine)
+    route_mask = fare_table.route_mask(max_fare) if max_fare is not None else -1
+    sources = engine.resolve_best_stops(start_loc['name'])
+    targets = engine.resolve_best_stops(end_loc['name'])
+    journeys = []
+    if sources and targets:
+        # فحص سريع بأقنعة الخطوط: إذا وُجد خط مشترك تكفي جولة واحدة بدون تبديل
+        if engine.routes_mask(sources) & engine.routes_mask(targets) & route_mask:
+            journeys = planner.plan_between_stops(sources, targets, max_transfers=0, max_fare=max_fare)
+        
+        # رحلات باريتو: أقل تبديلات، أقل مشي، أقل تعريفة
+        if not journeys:
+            journeys = planner.plan_between_stops(sources, targets, max_transfers=max_transfers, max_fare=max_fare)
+    if cheapest_first:
+        journeys = fare_table.cheapest_first(journeys)
     
-    # البحث عن مسارات مباشرة
+    # المسارات المباشرة: ركوب خط واحد فقط (رحلة بدون تبديل قد تبدأ بالمشي لمحطة مرتبطة)
     direct_routes = []
-    for start_route in start_routes:
-        for end_route in end_routes:
-            if start_route['id'] == end_route['id']:
-                # نفس الخط - تحقق من الترتيب
-                key_points = start_route['key_points']
-                start_indices = [i for i, point in enumerate(key_points) 
-                               if start_loc['name'].lower() in point.lower()]
-                end_indices = [i for i, point in enumerate(key_points) 
-                             if end_loc['name'].lower() in point.lower()]
-                
-                if start_indices and end_indices:
-                    if any(s_idx < e_idx for s_idx in start_indices for e_idx in end_indices):
-                        direct_routes.append({
-                            'route': start_route,
-                            'start_location': start_loc,
-                            'end_location': end_loc
-                        })
+    for journey in journeys:
+        if journey['transfers'] == 0 and all(leg['type'] == 'ride' for leg in journey['legs']):
+            leg = journey['legs'][0]
+            direct_routes.append({
+                'route': {
+                    'name': leg['route'].get('routeName'),
+                    'fare': leg['fare'],
+                    'notes': leg['route'].get('notes', '')
+                },
+                'start_location': start_loc,
+                'end_location': end_loc
+            })
     
     if direct_routes:
         return {
@@ -238,23 +352,12 @@ def find_best_route_with_transfers(start_location: str, end_location: str):
             'routes': direct_routes
         }
     
-    # البحث عن مسارات بالتحويل
-    transfer_routes = []
-    
-    for start_route in start_routes:
-        for end_route in end_routes:
-            if start_route['id'] != end_route['id']:
-                # البحث عن رابط بين الخطين
-                route_connections = find_route_connections(start_route['id'], end_route['id'])
-                
-                for connection in route_connections:
-                    transfer_routes.append({
-                        'start_route': start_route,
-                        'end_route': end_route,
-                        'connection': connection,
-                        'start_location': start_loc,
-                        'end_location': end_loc
-                    })
+    # المسارات بالتحويل
+    transfer_routes = [{
+        'journey': journey,
+        'start_location': start_loc,
+        'end_location': end_loc
+    } for journey in journeys]
     
     if transfer_routes:
         return {
@@ -269,9 +372,15 @@ def find_best_route_with_transfers(start_location: str, end_location: str):
         'end_locations': end_locations
     }
 
-def update_bot_data():
-    """تحديث ملف البيانات للبوت"""
+def update_bot_data(reset_planner: bool = True):
+    """
+    تحديث ملف البيانات للبوت
+    reset_planner=False عند تعديل خط واحد لأن التعديل يصل لمخطط الرحلات عبر سجل التعديلات
+    """
     try:
+        # التعديلات تُنشر بعد حفظها في قاعدة البيانات، فكل تعديل حتى هذا الرقم موجود في البيانات المقروءة بعده
+        applied_route_seq = latest_delta_seq()
+        applied_location_seq = latest_delta_seq(LOCATION_DELTA_LOG_FILE)
         routes_data = get_routes_from_db()
         neighborhood_data = get_neighborhoods_from_db()
         
@@ -286,7 +395,21 @@ def update_bot_data():
             f.write(f'routes_data = {repr(routes_data)}\n\n')
             
             f.write('# بيانات الأحياء من قاعدة البيانات\n')
-            f.write(f'neighborhood_data = {repr(neighborhood_data)}\n')
+            f.write(f'neighborhood_data = {repr(neighborhood_data)}\n\n')
+            
+            f.write('# آخر تعديل في سجلات التعديلات موجود في هذه البيانات (البوت يطبق الأحدث منه فقط)\n')
+            f.write(f'applied_route_delta_seq = {applied_route_seq}\n')
+            f.write(f'applied_location_delta_seq = {applied_location_seq}\n')
+        
+        # التعديلات الموجودة في الملف لم تعد لازمة لإعادة التشغيل
+        compact_delta_log(applied_route_seq)
+        compact_delta_log(applied_location_seq, LOCATION_DELTA_LOG_FILE)
+        
+        # إعادة بناء مخطط الرحلات عند الطلب التالي
+        if reset_planner:
+            global _transit_planner, _stop_spatial_index
+            _transit_planner = None
+            _stop_spatial_index = None
         
         print("✅ تم تحديث بيانات البوت بنجاح!")
         return True
@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""
+استخراج نقطتي البداية والوجهة من نص السؤال في مرور واحد (Aho-Corasick)
+آلة واحدة تُبنى مرة واحدة على أسماء المعالم والأسماء المختصرة وكلمات الربط
+كل التطابقات (حتى المتداخلة) تُجمع ثم يُختار الأطول، وكلمة الربط قبل المعلم تحدد دوره
+"""
+
+from collections import deque
+from typing import List, Dict, Tuple, Optional, Iterable, Iterator
+
+from arabic_text import normalize_arabic, normalize_with_positions
+
+# أنواع المقاطع
+FROM = 'from'
+TO = 'to'
+PLACE = 'place'
+
+# حروف الجر الملتصقة بالاسم ("لمول الفرما"، "لـمول الفرما" بعد حذف التطويل) - تُعامل ككلمة ربط للوجهة
+ATTACHED_TO_PREFIXES = ('ل',)
+
+
+class AhoCorasick:
+    """آلة Aho-Corasick: كل الأنماط الموجودة في النص (مع المتداخلة) في مرور واحد"""
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        # الحالة ← رقم النمط المنتهي عندها (-1 إذا لم ينته نمط)
+        self._terminal: List[int] = [-1]
+        # الحالة ← كل الأنماط المنتهية عندها أو عند حالات الفشل التالية (تُحسب في build)
+        self._outputs: List[List[int]] = [[]]
+        self.patterns: List[str] = []
+        self.values: List = []
+        self._built = True
+
+    def add(self, pattern: str, value) -> int:
+        """إضافة نمط (النمط المكرر يحتفظ بآخر قيمة)"""
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(-1)
+                self._outputs.append([])
+            state = next_state
+        pattern_idx = self._terminal[state]
+        if pattern_idx >= 0:
+            self.values[pattern_idx] = value
+            return pattern_idx
+        pattern_idx = len(self.patterns)
+        self.patterns.append(pattern)
+        self.values.append(value)
+        self._terminal[state] = pattern_idx
+        self._built = False
+        return pattern_idx
+
+    def build(self):
+        """حساب روابط الفشل ومخرجات كل حالة بالعرض (BFS)"""
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            self._outputs[state] = [self._terminal[state]] if self._terminal[state] >= 0 else []
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(ch, 0)
+                own = [self._terminal[next_state]] if self._terminal[next_state] >= 0 else []
+                self._outputs[next_state] = own + self._outputs[self._fail[next_state]]
+        self._built = True
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, int]]:
+        """(البداية، النهاية، رقم النمط) لكل تطابق في النص"""
+        if not self._built:
+            self.build()
+        state = 0
+        for end, ch in enumerate(text, 1):
+            while state and ch not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(ch, 0)
+            for pattern_idx in self._outputs[state]:
+                yield end - len(self.patterns[pattern_idx]), end, pattern_idx
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum()
+
+
+class LocationExtractor:
+    """كلمات الربط والمعالم في آلة واحدة، والمقاطع المختارة تحدد البداية والوجهة"""
+
+    def __init__(self, places: Iterable[Tuple[str, str]], from_keywords: Iterable[str],
+                 to_keywords: Iterable[str]):
+        """places: (النص كما يكتبه المستخدم، الاسم المرجع) - كل الأنماط بالصيغة الموحدة"""
+        self.automaton = AhoCorasick()
+        for keyword in from_keywords:
+            self.automaton.add(normalize_arabic(keyword), (FROM, keyword))
+        for keyword in to_keywords:
+            self.automaton.add(normalize_arabic(keyword), (TO, keyword))
+        for text, name in places:
+            self.add_place(text, name)
+        self.automaton.build()
+
+    def add_place(self, text: str, name: str):
+        """إضافة معلم (الآلة يُعاد حساب روابطها عند أول بحث بعد الإضافة)"""
+        text = normalize_arabic(text)
+        if text:
+            self.automaton.add(text, (PLACE, name))
+
+    def spans(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """المقاطع المختارة بالترتيب: (البداية، النهاية، النوع، القيمة) بمواضع النص الموحد"""
+        return self._spans(normalize_arabic(text))
+
+    def _spans(self, text: str) -> List[Tuple[int, int, str, str]]:
+        """
+        مقاطع نص موحد: التطابق يجب أن يكون كلمات كاملة (المعلم قد يسبقه حرف جر ملتصق)
+        وعند التداخل يُختار الأطول ثم الأسبق
+        """
+        length = len(text)
+
+        def bounded_start(start: int) -> bool:
+            return start == 0 or not _is_word_char(text[start - 1])
+
+        candidates = []
+        for start, end, pattern_idx in self.automaton.iter_matches(text):
+            if end < length and _is_word_char(text[end]):
+                continue
+            kind, value = self.automaton.values[pattern_idx]
+            if bounded_start(start):
+                candidates.append((start, end, kind, value))
+            elif kind == PLACE:
+                for prefix in ATTACHED_TO_PREFIXES:
+                    prefix_start = start - len(prefix)
+                    if text.startswith(prefix, prefix_start) and prefix_start >= 0 and bounded_start(prefix_start):
+                        candidates.append((prefix_start, prefix_start + len(prefix), TO, prefix))
+                        candidates.append((start, end, kind, value))
+                        break
+
+        occupied = [False] * length
+        selected = []
+        for span in sorted(candidates, key=lambda span: (span[0] - span[1], span[0])):
+            start, end = span[0], span[1]
+            if not any(occupied[start:end]):
+                occupied[start:end] = [True] * (end - start)
+                selected.append(span)
+        selected.sort()
+        return selected
+
+    def extract(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        (البداية، الوجهة) من المعالم الموجودة في النص
+        المعلم بعد كلمة "من" بداية وبعد "إلى/لـ" وجهة، والمعالم بدون كلمة ربط تُكمل الناقص بالترتيب
+        """
+        start_place = end_place = None
+        untagged = []
+        pending = None
+        for _, _, kind, value in self.spans(text):
+            if kind != PLACE:
+                pending = kind
+                continue
+            if pending == FROM and start_place is None:
+                start_place = value
+            elif pending == TO and end_place is None:
+                end_place = value
+            else:
+                untagged.append(value)
+            pending = None
+
+        if start_place is None and end_place is None and len(untagged) >= 2:
+            return untagged[0], untagged[1]
+        if end_place is None and untagged:
+            end_place = untagged.pop(0)
+        if start_place is None and untagged:
+            start_place = untagged.pop(0)
+        return start_place, end_place
+
+    def fragments(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        عند عدم وجود معالم معروفة: النص بين كلمة "من" وكلمة الوجهة، والنص بعد كلمة الوجهة
+        (للمطابقة التقريبية بعد ذلك)
+        """
+        # الأجزاء تُقتطع من النص الأصلي (قد تُبحث كما هي في قاعدة البيانات)
+        normalized, positions = normalize_with_positions(text)
+        connectors = [(start, end, kind) for start, end, kind, _ in self._spans(normalized) if kind != PLACE]
+        from_end = next((end for _, end, kind in connectors if kind == FROM), None)
+        to_span = next(((start, end) for start, end, kind in connectors
+                        if kind == TO and (from_end is None or start >= from_end)), None)
+        if to_span is None:
+            return None, None
+        end_fragment = text[positions[to_span[1]]:].strip() or None
+        if from_end is None:
+            return None, end_fragment
+        return text[positions[from_end]:positions[to_span[0]]].strip() or None, end_fragment
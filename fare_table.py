@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+جداول التعريفة الرقمية المحسوبة مسبقاً من المحرك
+التعريفة تُقرأ من نص الخط ("4.5 جنيه مصري (تعريفة موحدة...)") مرة واحدة عند الفهرسة
+وبعدها إجمالي الرحلة وترتيب الأرخص والبحث بحد أقصى للتعريفة لا تحتاج أي تحليل نصوص
+"""
+
+from typing import List, Dict, Iterable
+
+import numpy as np
+
+
+def format_fare(value: float) -> str:
+    """عرض التعريفة الرقمية"""
+    return f"{value:g} جنيه"
+
+
+class FareTable:
+    """
+    route_fares: تعريفة كل خط (الخط المحذوف = ما لا نهاية)
+    transfer_fares: إجمالي رحلة بتبديل واحد [الخط الأول، الخط الثاني]
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.revision = None
+        self.refresh()
+
+    def refresh(self):
+        """إعادة الحساب من تعريفات المحرك الحالية"""
+        engine = self.engine
+        fares = np.array(engine.route_fares, dtype=np.float64)
+        fares[list(engine.removed_routes)] = np.inf
+        self.route_fares = fares
+        self.transfer_fares = fares[:, None] + fares[None, :]
+        # الخطوط مرتبة بالتعريفة مع قناع تراكمي: أول i خط في الترتيب
+        order = np.argsort(fares, kind='stable')
+        self._sorted_fares = fares[order]
+        self._prefix_masks = [0]
+        for route_idx in order.tolist():
+            self._prefix_masks.append(self._prefix_masks[-1] | 1 << route_idx)
+        self.revision = engine.revision
+
+    def sync(self):
+        """إعادة الحساب فقط إذا تغيرت خطوط المحرك"""
+        if self.revision != self.engine.revision:
+            self.refresh()
+
+    def route_mask(self, max_fare: float) -> int:
+        """قناع الخطوط التي تعريفتها لا تزيد عن max_fare"""
+        return self._prefix_masks[int(np.searchsorted(self._sorted_fares, max_fare, side='right'))]
+
+    def journey_fare(self, route_indices: Iterable[int]) -> float:
+        """إجمالي تعريفة خطوط الرحلة بالترتيب"""
+        route_indices = list(route_indices)
+        if len(route_indices) == 2:
+            return float(self.transfer_fares[route_indices[0], route_indices[1]])
+        return float(self.route_fares[route_indices].sum()) if route_indices else 0.0
+
+    def cheapest_first(self, journeys: List[Dict]) -> List[Dict]:
+        """ترتيب الرحلات من الأرخص ثم الأقل تبديلاً ثم الأقل مشياً"""
+        def total(journey: Dict) -> float:
+            return self.journey_fare(leg['route_idx'] for leg in journey['legs'] if leg['type'] == 'ride')
+        return sorted(journeys, key=lambda journey: (total(journey), journey['transfers'], journey['walking_minutes']))
+
+
+# جداول مبنية لكل محرك
+_fare_tables: Dict[int, FareTable] = {}
+
+
+def get_fare_table(engine) -> FareTable:
+    """جدول التعريفة للمحرك (يُحدَّث تلقائياً بعد تعديل خطوطه)"""
+    table = _fare_tables.get(id(engine))
+    if table is None or table.engine is not engine:
+        if len(_fare_tables) >= 8:
+            _fare_tables.clear()
+        table = FareTable(engine)
+        _fare_tables[id(engine)] = table
+    else:
+        table.sync()
+    return table
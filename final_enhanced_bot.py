@@ -22,6 +22,21 @@ from telegram.constants import ParseMode
 # --- Fix for imports when running from a different directory ---
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from routing_engine import get_engine
+from route_cache import route_answer_cache
+from landmark_table import load_landmark_table
+from route_deltas import RouteDeltaFeed, LOCATION_DELTA_LOG_FILE
+from route_distances import get_route_distances
+from journey_planner import JourneyPlanner
+from isochrone import Isochrone, DEFAULT_ISOCHRONE_MINUTES
+from itineraries import ItinerarySearch
+from fare_table import format_fare
+from ngram_index import NGramIndex
+from entity_extractor import LocationExtractor
+from arabic_text import normalize_arabic
+from spelling import SpellingCorrector
+from tfidf_ranker import TfidfRanker, DEFAULT_TOP_K
+
 # --- استيراد نظام إدارة العملاء ---
 try:
     from user_manager import user_manager
@@ -58,10 +73,23 @@ except ValueError as e:
     logger.error(f"!!! خطأ في إعداد التوكن: {e}")
     exit(1)
 
+# البحث بالدقائق (/reachable) - يُبنى عند أول استخدام ويُعاد بناؤه بعد أي تعديل في الخطوط
+isochrone_index = None
+
+# الرحلات البديلة (زر "خيارات أخرى") - حالة البحث محفوظة لكل سؤال حتى أي تعديل في الخطوط
+itinerary_search = None
+ITINERARY_PAGE_SIZE = 3
+
+# اقتراحات "هل تقصد" تظهر إذا كانت ثاني أقرب نتيجة بدرجة قريبة من الأولى
+AMBIGUITY_RATIO = 0.9
+
 try:
     # محاولة تحميل البيانات المحدثة من قاعدة البيانات أولاً
     try:
         from data_dynamic import routes_data, neighborhood_data
+        import data_dynamic
+        applied_route_delta_seq = getattr(data_dynamic, 'applied_route_delta_seq', None)
+        applied_location_delta_seq = getattr(data_dynamic, 'applied_location_delta_seq', None)
         if routes_data and neighborhood_data:
             logger.info(f"✅ تم تحميل البيانات المحدثة: {len(routes_data)} خط، {len(neighborhood_data)} حي")
         else:
@@ -69,6 +97,13 @@ try:
     except (ImportError, AttributeError):
         logger.warning("⚠️ البيانات المحدثة غير متوفرة، استخدام البيانات الثابتة")
         from data import routes_data, neighborhood_data
+        applied_route_delta_seq = applied_location_delta_seq = None
+    
+    # تعديلات الخطوط من لوحة التحكم تُطبق على الفهرس أثناء التشغيل
+    # (بدءاً من أول تعديل غير موجود في data_dynamic.py، أو من نهاية السجل إذا لم يُعرف)
+    route_delta_feed = RouteDeltaFeed(applied_seq=applied_route_delta_seq)
+    # الأماكن المضافة من لوحة التحكم تُضاف لفهارس البحث الذكي والتصحيح الإملائي
+    location_delta_feed = RouteDeltaFeed(LOCATION_DELTA_LOG_FILE, applied_seq=applied_location_delta_seq)
     
     if not routes_data or not isinstance(routes_data, list):
         logger.error("routes_data is empty or not a list")
@@ -80,6 +115,14 @@ try:
         
     logger.info(f"Successfully loaded {len(routes_data)} routes and {len(neighborhood_data)} neighborhoods")
     
+    # بناء فهرس المحطات مرة واحدة عند التحميل
+    transit_engine = get_engine(routes_data)
+    
+    # جدول الإجابات الجاهز (يُبنى بـ python landmark_table.py) - يُتجاهل إذا لم يطابق الخطوط الحالية
+    landmark_table = load_landmark_table(routes_data)
+    if landmark_table:
+        logger.info(f"✅ تم تحميل جدول إجابات المعالم: {len(landmark_table.landmarks)} معلم")
+    
 except ImportError as e:
     logger.error(f"!!! خطأ فادح: لم يتم العثور على ملفات البيانات: {e}")
     exit(1)
@@ -299,6 +342,10 @@ geocoding_system = GeocodingSystem()
 class NLPSearchSystem:
     def __init__(self):
         self.landmarks_index = self._build_landmarks_index()
+        # المرشحون للبحث التقريبي (بدلاً من المرور على كل المعالم)
+        self.ngram_index = NGramIndex(self.landmarks_index)
+        # مصفوفة TF-IDF لترتيب أقرب المعالم (تُبنى عند أول استخدام وبعد إضافة أي مكان)
+        self._ranker: Optional[TfidfRanker] = None
         
         # كلمات ربط عربية محسنة
         self.from_keywords = ['من', 'من عند', 'بدءاً من', 'انطلاقاً من', 'ابتداء من', 'جاي من', 'خارج من']
@@ -317,6 +364,18 @@ class NLPSearchSystem:
             'الكنيسة': ['الكنيسة الإنجيلية', 'كنيسة'],
             'المسجد': ['المسجد الكبير', 'الجامع الكبير', 'مسجد']
         }
+        
+        # أفعال الذهاب تعامل ككلمات ربط للوجهة ("إزاي أروح X")
+        self.go_keywords = ['أروح', 'اروح', 'أوصل', 'اوصل']
+        # آلة واحدة لكل المعالم والأسماء المختصرة وكلمات الربط (المعالم تأخذ الأولوية عند تساوي النص)
+        places = [(alias, standard_name) for standard_name, aliases in self.place_aliases.items()
+                  for alias in [standard_name] + aliases]
+        places += [(name, info['original_name']) for name, info in self.landmarks_index.items()]
+        self.location_extractor = LocationExtractor(places, self.from_keywords,
+                                                    self.to_keywords + self.go_keywords)
+        # قاموس التصحيح الإملائي على كلمات المعالم والمحطات (وكلمات الربط حتى لا تُصحح إلى أسماء أماكن)
+        self.spelling = SpellingCorrector(list(self.landmarks_index) + transit_engine.stops.keys
+                                          + self.from_keywords + self.to_keywords + self.question_keywords)
     
     def _build_landmarks_index(self) -> Dict[str, Dict]:
         """بناء فهرس لجميع المعالم للبحث السريع"""
@@ -325,14 +384,14 @@ class NLPSearchSystem:
             for category, landmarks in categories.items():
                 for landmark in landmarks:
                     if isinstance(landmark, dict):
-                        name = landmark.get('name', '').lower()
+                        name = normalize_arabic(landmark.get('name', ''))
                         index[name] = {
                             'neighborhood': neighborhood,
                             'category': category,
                             'original_name': landmark.get('name', '')
                         }
                     elif isinstance(landmark, str):
-                        name = landmark.lower()
+                        name = normalize_arabic(landmark)
                         index[name] = {
                             'neighborhood': neighborhood,
                             'category': category,
@@ -340,13 +399,68 @@ class NLPSearchSystem:
                         }
         return index
     
+    def add_landmark(self, name: str, neighborhood: str, category: str):
+        """إضافة مكان جديد لكل فهارس البحث بدون إعادة بنائها"""
+        key = normalize_arabic(name)
+        if not key or key in self.landmarks_index:
+            return
+        self.landmarks_index[key] = {
+            'neighborhood': neighborhood,
+            'category': category,
+            'original_name': name
+        }
+        self.ngram_index.add(key)
+        self.location_extractor.add_place(key, name)
+        self.spelling.add_texts([key])
+        self._ranker = None
+    
+    def get_ranker(self) -> TfidfRanker:
+        """مصفوفة TF-IDF على المعالم الحالية"""
+        if self._ranker is None:
+            self._ranker = TfidfRanker(self.landmarks_index)
+        return self._ranker
+    
+    def find_top_matches(self, query: str, limit: int = DEFAULT_TOP_K) -> List[Dict]:
+        """أقرب المعالم للنص مرتبة بدرجة TF-IDF (لاقتراحات "هل تقصد")"""
+        matches = []
+        for name, score in self.get_ranker().top_k(query, limit):
+            landmark_info = self.landmarks_index[name]
+            matches.append({'name': landmark_info['original_name'], 'score': score, 'info': landmark_info})
+        return matches
+    
+    def resolve_place(self, query: str) -> Tuple[Optional[Dict], List[Dict]]:
+        """
+        (أفضل تطابق، اقتراحات): الاقتراحات تُرجع بدلاً من التطابق إذا لم يوجد تطابق
+        أو إذا تقاربت درجتا أقرب معلمين (السؤال يحتمل أكثر من مكان)
+        """
+        match = self.find_best_match(query)
+        if match and match['score'] >= 1.0:
+            return match, []
+        candidates = self.find_top_matches(query)
+        ambiguous = len(candidates) > 1 and candidates[1]['score'] >= AMBIGUITY_RATIO * candidates[0]['score']
+        if match and not ambiguous:
+            return match, []
+        if match and all(candidate['name'] != match['name'] for candidate in candidates):
+            candidates = [match] + candidates[:DEFAULT_TOP_K - 1]
+        return None, candidates
+    
     def similarity_score(self, text1: str, text2: str) -> float:
         """حساب درجة التشابه بين نصين"""
-        return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
+        return SequenceMatcher(None, normalize_arabic(text1), normalize_arabic(text2)).ratio()
     
     def find_best_match(self, query: str, min_score: float = 0.5) -> Optional[Dict]:
         """البحث عن أفضل تطابق لمعلم معين - محسن للفهم الأذكى"""
-        query = query.lower().strip()
+        query = normalize_arabic(query)
+        # الاسم المكتوب بأي صيغة إملائية للمعلم نفسه
+        landmark_info = self.landmarks_index.get(query)
+        if landmark_info:
+            return {'name': landmark_info['original_name'], 'score': 1.0, 'info': landmark_info}
+        # نفس البحث بعد تصحيح كل كلمة من قاموس المفردات
+        corrected = self.spelling.correct(query)
+        landmark_info = self.landmarks_index.get(corrected)
+        if landmark_info:
+            return {'name': landmark_info['original_name'], 'score': self.similarity_score(query, corrected),
+                    'info': landmark_info}
         best_match = None
         best_score = min_score
         
@@ -355,7 +469,11 @@ class NLPSearchSystem:
         query_words = [word for word in query.split() if word not in stop_words]
         cleaned_query = ' '.join(query_words)
         
-        for landmark_name, landmark_info in self.landmarks_index.items():
+        # المعالم التي تشارك السؤال أو إحدى كلماته أكبر عدد من المقاطع الحرفية
+        candidates = self.ngram_index.shortlist(query, cleaned_query, *[word for word in query_words if len(word) > 2])
+        
+        for landmark_name in candidates:
+            landmark_info = self.landmarks_index[landmark_name]
             # حساب التشابه مع النص الأصلي
             score1 = self.similarity_score(query, landmark_name)
             # حساب التشابه مع النص المنظف
@@ -398,17 +516,19 @@ class NLPSearchSystem:
         """استخراج نقطتي البداية والوجهة من النص - محسن"""
         text = text.replace('؟', '').replace('?', '').strip()
         
-        # البحث عن أنماط "من X إلى Y" مع التطبيع
-        for from_word in self.from_keywords:
-            for to_word in self.to_keywords:
-                if from_word in text and to_word in text:
-                    parts = text.split(from_word, 1)
-                    if len(parts) > 1:
-                        remaining = parts[1].split(to_word, 1)
-                        if len(remaining) > 1:
-                            start_location = self.normalize_place_name(remaining[0].strip())
-                            end_location = self.normalize_place_name(remaining[1].strip())
-                            return start_location, end_location
+        # المعالم المعروفة في النص مباشرة (بدون مطابقة تقريبية)
+        start_location, end_location = self.location_extractor.extract(text)
+        if start_location and end_location:
+            return start_location, end_location
+        
+        # البحث عن أنماط "من X إلى Y" مع التطبيع للطرف غير المعروف فقط
+        start_fragment, end_fragment = self.location_extractor.fragments(text)
+        if start_location is None and start_fragment:
+            start_location = self.normalize_place_name(start_fragment)
+        if end_location is None and end_fragment:
+            end_location = self.normalize_place_name(end_fragment)
+        if start_location or end_location:
+            return start_location, end_location
         
         # البحث عن أنماط "إزاي أروح X"
         for q_word in self.question_keywords:
@@ -417,7 +537,7 @@ class NLPSearchSystem:
                 if len(parts) > 1:
                     remaining_text = parts[1].strip()
                     # إزالة كلمات إضافية
-                    for remove_word in ['أروح', 'اروح', 'أوصل', 'اوصل']:
+                    for remove_word in self.go_keywords:
                         remaining_text = remaining_text.replace(remove_word, '').strip()
                     if remaining_text:
                         return None, remaining_text  # الوجهة فقط
@@ -433,18 +553,16 @@ class NLPSearchSystem:
             'message': 'لم أتمكن من فهم طلبك. يرجى المحاولة مرة أخرى.',
             'start_location': None,
             'end_location': None,
-            'suggestions': []
+            'suggestions': [],
+            'start_candidates': [],
+            'end_candidates': []
         }
         
         if start_text:
-            start_match = self.find_best_match(start_text)
-            if start_match:
-                result['start_location'] = start_match
+            result['start_location'], result['start_candidates'] = self.resolve_place(start_text)
         
         if end_text:
-            end_match = self.find_best_match(end_text)
-            if end_match:
-                result['end_location'] = end_match
+            result['end_location'], result['end_candidates'] = self.resolve_place(end_text)
         
         # تحديد حالة النتيجة
         if result['start_location'] and result['end_location']:
@@ -456,7 +574,10 @@ class NLPSearchSystem:
         elif result['end_location']:
             result['status'] = 'partial_match'
             result['message'] = f"تم العثور على الوجهة: {result['end_location']['name']}. من فضلك حدد نقطة البداية."
-        
+        elif result['start_candidates'] or result['end_candidates']:
+            result['status'] = 'ambiguous'
+            result['message'] = "🤔 لم أتأكد من المكان المقصود."
+
         return result
 
 nlp_system = NLPSearchSystem()
@@ -526,37 +647,153 @@ def build_keyboard(items: List, prefix: str, back_target: Optional[str] = None,
     
     return InlineKeyboardMarkup(keyboard)
 
+def sync_route_deltas():
+    """تطبيق تعديلات الخطوط الجديدة على الفهرس وحذف الإجابات المتأثرة بها فقط"""
+    global isochrone_index, itinerary_search
+    for delta, route_idx in route_delta_feed.sync(transit_engine):
+        if route_idx is None:
+            continue
+        isochrone_index = None
+        itinerary_search = None
+        route_names = {delta.get('old_name'), (delta.get('route') or {}).get('routeName')} - {None}
+        removed = delta.get('op') == 'remove'
+
+        def affected(start: str, end: str, direct_routes) -> bool:
+            if any(route.get('routeName') in route_names for route in direct_routes or []):
+                return True
+            # الخط الجديد أو المعدل قد يخدم زوجاً لم يكن له مسار مباشر
+            return not removed and bool(transit_engine.batch_direct_routes([(start, end)], route_mask=1 << route_idx)[0])
+
+        dropped = route_answer_cache.invalidate(affected, namespace='find_route_logic')
+        if landmark_table:
+            landmark_table.mark_stale(route_idx)
+        get_route_distances(transit_engine).update_route(route_idx)
+        logger.info(f"🔄 تعديل خط ({delta.get('op')}): {', '.join(route_names)} - حُذفت {dropped} إجابة محفوظة")
+
+def sync_location_deltas():
+    """إضافة الأماكن الجديدة من لوحة التحكم لفهارس البحث الذكي"""
+    for delta in location_delta_feed.poll():
+        location = delta.get('location') or {}
+        if location.get('name'):
+            nlp_system.add_landmark(location['name'], location.get('neighborhood', ''), location.get('category', ''))
+            logger.info(f"📍 مكان جديد في البحث الذكي: {location['name']}")
+
+def get_isochrone() -> Isochrone:
+    """البحث بالدقائق على المحرك الحالي مع أوقات المشي من route_connection وwalking_transfer"""
+    global isochrone_index
+    if isochrone_index is None:
+        try:
+            from database_helper import get_route_connections_from_db, get_walking_transfers_from_db
+            connections, walking_transfers = get_route_connections_from_db(), get_walking_transfers_from_db()
+        except ImportError:
+            connections, walking_transfers = [], []
+        planner = JourneyPlanner(transit_engine, connections, walking_transfers)
+        landmarks = [(landmark.get('name', '') if isinstance(landmark, dict) else landmark, neighborhood)
+                     for neighborhood, categories in neighborhood_data.items()
+                     for landmarks_list in categories.values()
+                     for landmark in landmarks_list]
+        isochrone_index = Isochrone(planner, get_route_distances(transit_engine), landmarks)
+    return isochrone_index
+
+def get_itinerary_search() -> ItinerarySearch:
+    """الرحلات البديلة على نفس مخطط الرحلات المستخدم في البحث بالدقائق"""
+    global itinerary_search
+    if itinerary_search is None:
+        itinerary_search = ItinerarySearch(get_isochrone().planner, get_route_distances(transit_engine))
+    return itinerary_search
+
+def itinerary_page(start_landmark: str, end_landmark: str, offset: int = 0) -> str:
+    """صفحة من الرحلات البديلة مرتبة بالدقائق (تكمل من حالة البحث المحفوظة)"""
+    itineraries = get_itinerary_search().alternatives(start_landmark, end_landmark, offset, ITINERARY_PAGE_SIZE)
+    if not itineraries:
+        return ""
+    result = "🔄 **رحلات بديلة (الأسرع أولاً):**\n\n"
+    for i, itinerary in enumerate(itineraries, offset + 1):
+        rides = [leg for leg in itinerary['legs'] if leg['type'] == 'ride']
+        result += f"{i}. " + " ← ".join(f"**{leg['route'].get('routeName')}**" for leg in rides) + "\n"
+        for leg in itinerary['legs']:
+            if leg['type'] == 'ride':
+                result += f"   🚌 من {leg['board_stop']} إلى {leg['alight_stop']}\n"
+            else:
+                result += f"   🚶 مشي {leg['minutes']:g} دقيقة إلى {leg['to_stop']}\n"
+        result += f"   ⏱️ حوالي {itinerary['minutes']} دقيقة | 💰 {format_fare(itinerary['fare'])}\n\n"
+    return result
+
+def has_more_itineraries(start_landmark: str, end_landmark: str, shown: int) -> bool:
+    """هل توجد رحلات بديلة بعد المعروضة (فقط عند عدم وجود مسار مباشر)"""
+    if transit_engine.batch_direct_routes([(start_landmark, end_landmark)], ('exact', 'partial'))[0]:
+        return False
+    return bool(get_itinerary_search().alternatives(start_landmark, end_landmark, shown, 1))
+
+def direct_route_minutes(direct_matches: List[Dict]) -> Dict[str, int]:
+    """دقائق الركوب من المسافات التراكمية (طرح واحد لكل خط) - لا تُعرض للخطوط بدون إحداثيات كافية"""
+    minutes = {}
+    route_distances = get_route_distances(transit_engine)
+    for route_info in direct_matches:
+        if not route_distances.has_estimate(route_info['route_idx']):
+            continue
+        best_match = route_info['matches'][0]
+        minutes[route_info['route'].get('routeName')] = route_distances.in_vehicle_minutes(
+            route_info['route_idx'], best_match['start_idx'], best_match['end_idx'])
+    return minutes
+
+def format_direct_routes(direct_routes: List[Dict], minutes: Dict[str, int]) -> str:
+    """قائمة الخطوط المباشرة مع التعريفة ودقائق الركوب والملاحظات"""
+    result = ""
+    for i, route in enumerate(direct_routes, 1):
+        result += f"{i}. **{route.get('routeName', 'خط غير محدد')}**\n"
+        result += f"   💰 التعريفة: {route.get('fare', 'غير محددة')}"
+        if route.get('routeName') in minutes:
+            result += f" | ⏱️ حوالي {minutes[route.get('routeName')]} دقيقة ركوب"
+        result += "\n"
+        if route.get('notes'):
+            result += f"   📝 ملاحظات: {route.get('notes')}\n"
+        result += "\n"
+    return result
+
 def find_route_logic(start_landmark: str, end_landmark: str, routes: List[Dict]) -> str:
     """البحث عن أفضل مسار بين معلمين - محسن"""
     
-    # البحث عن المسارات المباشرة
-    direct_routes = []
-    for route in routes:
-        key_points = route.get('keyPoints', [])
-        if not key_points:
-            continue
-            
-        # البحث عن النقاط في المسار
-        start_indices = [i for i, point in enumerate(key_points) 
-                        if isinstance(point, str) and start_landmark.lower() in point.lower()]
-        end_indices = [i for i, point in enumerate(key_points) 
-                      if isinstance(point, str) and end_landmark.lower() in point.lower()]
+    if routes is routes_data:
+        sync_route_deltas()
+    
+    # الإجابة المحفوظة لنفس الزوج ونفس إصدار البيانات
+    cached = route_answer_cache.get(start_landmark, end_landmark, namespace='find_route_logic', routes=routes)
+    if cached:
+        direct_routes, result = cached['result'], cached['text']
+    else:
+        # قراءة مباشرة من جدول الإجابات الجاهز إن وُجد المعلمان فيه
+        route_indices = None
+        if landmark_table and routes is routes_data:
+            route_indices = landmark_table.lookup(start_landmark, end_landmark)
+            if route_indices is not None and landmark_table.stale_mask:
+                # الخطوط التي تغيرت بعد بناء الجدول تُحسب من الفهرس
+                route_indices = sorted(set(route_indices).union(transit_engine.batch_direct_routes(
+                    [(start_landmark, end_landmark)], route_mask=landmark_table.stale_mask)[0]))
         
-        if start_indices and end_indices:
-            # التحقق من الترتيب الصحيح
-            if any(s_idx < e_idx for s_idx in start_indices for e_idx in end_indices):
-                direct_routes.append(route)
+        if route_indices is not None:
+            direct_routes = [routes[route_idx] for route_idx in route_indices]
+            # مواضع الركوب والنزول تُحسب فقط لخطوط الجدول التي لها تقدير دقائق من إحداثيات حقيقية
+            route_mask = sum(1 << route_idx for route_idx in route_indices)
+            route_mask &= get_route_distances(transit_engine).estimated_mask
+            direct_matches = transit_engine.find_direct_routes(
+                start_landmark, end_landmark, match_types=('exact', 'partial'), route_mask=route_mask) if route_mask else []
+        else:
+            # البحث عن المسارات المباشرة عبر الفهرس المبني مسبقاً (مطابقة تامة أو جزئية فقط)
+            direct_matches = get_engine(routes).find_direct_routes(start_landmark, end_landmark, match_types=('exact', 'partial'))
+            direct_routes = [route_info['route'] for route_info in direct_matches]
+        
+        minutes = direct_route_minutes(direct_matches) if routes is routes_data else {}
+        
+        if direct_routes:
+            result = "🚌 **تم العثور على مسارات مباشرة:**\n\n" + format_direct_routes(direct_routes, minutes)
+        else:
+            result = f"❌ **عذراً، لم أجد مساراً مباشراً بين {start_landmark} و {end_landmark}**\n\nقد تحتاج إلى:\n• استخدام أكثر من خط\n• البحث عن معالم قريبة\n• التأكد من صحة أسماء الأماكن"
+        
+        route_answer_cache.put(start_landmark, end_landmark, direct_routes, result, namespace='find_route_logic', routes=routes)
     
     if direct_routes:
-        result = "🚌 **تم العثور على مسارات مباشرة:**\n\n"
-        for i, route in enumerate(direct_routes, 1):
-            result += f"{i}. **{route.get('routeName', 'خط غير محدد')}**\n"
-            result += f"   💰 التعريفة: {route.get('fare', 'غير محددة')}\n"
-            if route.get('notes'):
-                result += f"   📝 ملاحظات: {route.get('notes')}\n"
-            result += "\n"
-        
-        # إضافة تقارير الوقت الحقيقي
+        # إضافة تقارير الوقت الحقيقي (لا تُحفظ لأنها تتغير باستمرار)
         for route in direct_routes[:1]:  # للمسار الأول فقط
             route_reports = reports_system.get_reports_for_route(route.get('routeName', ''))
             if route_reports:
@@ -565,10 +802,13 @@ def find_route_logic(start_landmark: str, end_landmark: str, routes: List[Dict])
                     emoji = "🔴" if report['report_type'] == 'congestion' else "🟡" if report['report_type'] == 'delay' else "🟢"
                     result += f"{emoji} {report['description']} ({report['timestamp'][:16]})\n"
                 result += "\n"
-        
-        return result
-    else:
-        return f"❌ **عذراً، لم أجد مساراً مباشراً بين {start_landmark} و {end_landmark}**\n\nقد تحتاج إلى:\n• استخدام أكثر من خط\n• البحث عن معالم قريبة\n• التأكد من صحة أسماء الأماكن"
+    elif routes is routes_data:
+        # أسرع الرحلات بتبديل (لا تُحفظ مع الإجابة لأنها تعتمد على كل الخطوط)
+        alternatives = itinerary_page(start_landmark, end_landmark)
+        if alternatives:
+            result += "\n\n" + alternatives
+    
+    return result
 
 # ===== معالجات الأحداث =====
 
@@ -771,6 +1011,7 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
             # البحث الذكي عن مسار
             await update.message.reply_text("🔍 جاري البحث...")
             
+            sync_location_deltas()
             search_result = nlp_system.search_route_from_text(user_text)
             
             if search_result['status'] == 'full_match':
@@ -807,6 +1048,11 @@ async def handle_nlp_search(update: Update, context: ContextTypes.DEFAULT_TYPE)
                     InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
                     InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
                 ]]
+                did_you_mean = did_you_mean_state(search_result)
+                if did_you_mean:
+                    context.user_data['did_you_mean'] = did_you_mean
+                    message += "\n\n" + did_you_mean_prompt(did_you_mean)
+                    keyboard = did_you_mean_buttons(did_you_mean) + keyboard
                 await update.message.reply_text(
                     message,
                     reply_markup=InlineKeyboardMarkup(keyboard)
@@ -1015,10 +1261,13 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
     maps_url = geocoding_system.get_maps_url(chosen)
     keyboard = [
         [InlineKeyboardButton("🗺️ عرض على الخريطة", url=maps_url)],
+        [InlineKeyboardButton("🔁 رحلة العودة", callback_data="return_trip")],
         [InlineKeyboardButton("📝 أبلغ عن حالة المرور", callback_data="submit_report")],
         [InlineKeyboardButton("🔍 بحث جديد", callback_data="traditional_search")],
         [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
     ]
+    if has_more_itineraries(start_landmark, chosen, ITINERARY_PAGE_SIZE):
+        keyboard.insert(1, [InlineKeyboardButton("➕ خيارات أخرى", callback_data="more_options")])
     
     await query.edit_message_text(
         result,
@@ -1027,8 +1276,201 @@ async def select_end_landmark_and_find_route(update: Update, context: ContextTyp
     )
     
     context.user_data.clear()
+    # آخر رحلة لزر رحلة العودة
+    context.user_data['last_trip'] = trip_state(start_landmark, chosen)
     return ConversationHandler.END
 
+def trip_state(start_landmark: str, end_landmark: str, shown: int = ITINERARY_PAGE_SIZE,
+               route_indices: Optional[List[int]] = None) -> Dict:
+    """آخر رحلة لزري العودة والخيارات الأخرى: المكانان مع أرقام خطوط الذهاب المباشرة"""
+    if route_indices is None:
+        route_indices = transit_engine.batch_direct_routes([(start_landmark, end_landmark)])[0]
+    return {'start': start_landmark, 'end': end_landmark, 'shown': shown, 'routes': route_indices}
+
+async def handle_return_trip(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """عكس آخر رحلة (من الوجهة إلى البداية) بدون إعادة اختيار المعالم"""
+    query = update.callback_query
+    await query.answer()
+    
+    last_trip = context.user_data.get('last_trip')
+    if not last_trip:
+        await query.edit_message_text(
+            "❌ لا توجد رحلة سابقة، ابدأ بحثاً جديداً",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔍 بحث جديد", callback_data="traditional_search")]])
+        )
+        return
+    
+    start_landmark, end_landmark = last_trip['end'], last_trip['start']
+    sync_route_deltas()
+    result = f"🔁 **رحلة العودة:** {start_landmark} ← {end_landmark}\n\n"
+    # اتجاهات العودة (راجع/رايح) لخطوط الذهاب على المحطات المحللة في سؤال الذهاب، والبحث الكامل فقط بدونها
+    reverse_matches = transit_engine.reverse_direct_routes(last_trip.get('routes', []), start_landmark, end_landmark)
+    if reverse_matches:
+        result += "🔁 **خطوط العودة لنفس خطوط الذهاب:**\n\n"
+        result += format_direct_routes([route_info['route'] for route_info in reverse_matches],
+                                       direct_route_minutes(reverse_matches))
+        trip = trip_state(start_landmark, end_landmark,
+                          route_indices=[route_info['route_idx'] for route_info in reverse_matches])
+    else:
+        result += find_route_logic(start_landmark, end_landmark, routes_data)
+        trip = trip_state(start_landmark, end_landmark)
+    
+    keyboard = [
+        [InlineKeyboardButton("🗺️ عرض على الخريطة", url=geocoding_system.get_maps_url(end_landmark))],
+        [InlineKeyboardButton("🔁 رحلة العودة", callback_data="return_trip")],
+        [InlineKeyboardButton("🔍 بحث جديد", callback_data="traditional_search")],
+        [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
+    ]
+    if has_more_itineraries(start_landmark, end_landmark, ITINERARY_PAGE_SIZE):
+        keyboard.insert(1, [InlineKeyboardButton("➕ خيارات أخرى", callback_data="more_options")])
+    context.user_data['last_trip'] = trip
+    
+    await query.edit_message_text(
+        result,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+async def handle_more_options(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """الصفحة التالية من الرحلات البديلة لآخر رحلة (من حالة البحث المحفوظة بدون إعادة الحساب)"""
+    query = update.callback_query
+    await query.answer()
+    
+    last_trip = context.user_data.get('last_trip')
+    if not last_trip:
+        await query.edit_message_text(
+            "❌ لا توجد رحلة سابقة، ابدأ بحثاً جديداً",
+            reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("🔍 بحث جديد", callback_data="traditional_search")]])
+        )
+        return
+    
+    start_landmark, end_landmark = last_trip['start'], last_trip['end']
+    shown = last_trip.get('shown', ITINERARY_PAGE_SIZE)
+    sync_route_deltas()
+    result = f"🚌 **{start_landmark} ← {end_landmark}**\n\n"
+    result += itinerary_page(start_landmark, end_landmark, shown) or "❌ لا توجد خيارات أخرى لهذه الرحلة"
+    shown += ITINERARY_PAGE_SIZE
+    
+    keyboard = [
+        [InlineKeyboardButton("🔁 رحلة العودة", callback_data="return_trip")],
+        [InlineKeyboardButton("🔍 بحث جديد", callback_data="traditional_search")],
+        [InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")]
+    ]
+    if has_more_itineraries(start_landmark, end_landmark, shown):
+        keyboard.insert(0, [InlineKeyboardButton("➕ خيارات أخرى", callback_data="more_options")])
+    context.user_data['last_trip'] = trip_state(start_landmark, end_landmark, shown, last_trip.get('routes'))
+    
+    await query.edit_message_text(
+        result,
+        reply_markup=InlineKeyboardMarkup(keyboard),
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+def did_you_mean_state(search_result: Dict) -> Optional[Dict]:
+    """اختيارات "هل تقصد" المعلقة لكل طرف لم يُحدد مكانه بثقة (بالترتيب: البداية ثم الوجهة)"""
+    pending = [(side, [candidate['name'] for candidate in search_result[f'{side}_candidates']])
+               for side in ('start', 'end') if search_result.get(f'{side}_candidates')]
+    if not pending:
+        return None
+    return {
+        'start': (search_result['start_location'] or {}).get('name'),
+        'end': (search_result['end_location'] or {}).get('name'),
+        'pending': pending
+    }
+
+def did_you_mean_prompt(state: Dict) -> str:
+    side = state['pending'][0][0]
+    return f"🤔 هل تقصد {'نقطة البداية' if side == 'start' else 'الوجهة'}:"
+
+def did_you_mean_buttons(state: Dict) -> List[List[InlineKeyboardButton]]:
+    """زر لكل اقتراح (رقم الاقتراح فقط في callback_data حتى لا يتجاوز 64 بايت)"""
+    return [[InlineKeyboardButton(f"📍 {name}", callback_data=f"did_you_mean:{i}")]
+            for i, name in enumerate(state['pending'][0][1])]
+
+async def handle_did_you_mean(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """اختيار أحد اقتراحات "هل تقصد" ثم البحث عن المسار عند اكتمال الطرفين"""
+    query = update.callback_query
+    await query.answer()
+    
+    new_search = [
+        InlineKeyboardButton("🔍 بحث جديد", callback_data="nlp_search"),
+        InlineKeyboardButton("🏠 القائمة الرئيسية", callback_data="main_menu")
+    ]
+    state = context.user_data.get('did_you_mean')
+    choice = int(query.data.split(':', 1)[1])
+    if not state or not state['pending'] or choice >= len(state['pending'][0][1]):
+        await query.edit_message_text(
+            "❌ انتهت صلاحية الاقتراحات، ابدأ بحثاً جديداً",
+            reply_markup=InlineKeyboardMarkup([new_search])
+        )
+        return
+    
+    side, candidates = state['pending'].pop(0)
+    state[side] = candidates[choice]
+    if state['pending']:
+        await query.edit_message_text(
+            f"✅ {state[side]}\n\n{did_you_mean_prompt(state)}",
+            reply_markup=InlineKeyboardMarkup(did_you_mean_buttons(state) + [new_search])
+        )
+        return
+    
+    context.user_data.pop('did_you_mean', None)
+    start_name, end_name = state['start'], state['end']
+    if not (start_name and end_name):
+        missing = 'الوجهة' if start_name else 'نقطة البداية'
+        await query.edit_message_text(
+            f"✅ {state[side]}. من فضلك اكتب طلبك مرة أخرى مع {missing}.",
+            reply_markup=InlineKeyboardMarkup([new_search])
+        )
+        return
+    
+    sync_route_deltas()
+    await query.edit_message_text(
+        find_route_logic(start_name, end_name, routes_data),
+        reply_markup=InlineKeyboardMarkup([
+            [InlineKeyboardButton("🗺️ عرض الوجهة على الخريطة", url=geocoding_system.get_maps_url(end_name))],
+            new_search
+        ]),
+        parse_mode=ParseMode.MARKDOWN
+    )
+
+async def reachable_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """/reachable <المكان> [الدقائق]: الأماكن الممكن الوصول إليها خلال N دقيقة"""
+    args = list(context.args or [])
+    minutes = DEFAULT_ISOCHRONE_MINUTES
+    if args and args[-1].isdigit():
+        minutes = float(args.pop())
+    start_landmark = ' '.join(args).strip()
+    if not start_landmark:
+        await update.message.reply_text(
+            "⏱️ اكتب المكان وعدد الدقائق، مثال:\n/reachable مستشفى آل سليمان 30"
+        )
+        return
+    
+    sync_route_deltas()
+    results = get_isochrone().query(start_landmark, minutes)
+    if not results:
+        await update.message.reply_text(
+            f"❌ لم أجد أماكن يمكن الوصول إليها خلال {minutes:g} دقيقة من {start_landmark}\n"
+            "تأكد من اسم المكان أو جرب مدة أطول"
+        )
+        return
+    
+    by_neighborhood = {}
+    for item in results:
+        by_neighborhood.setdefault(item['neighborhood'], []).append(item)
+    message = f"⏱️ **الأماكن خلال {minutes:g} دقيقة من {start_landmark}:** ({len(results)} مكان)\n\n"
+    for neighborhood, items in by_neighborhood.items():
+        message += f"🏘️ **{neighborhood}**\n"
+        for item in items[:8]:
+            transfers = f" - {item['transfers']} تبديل" if item['transfers'] else ""
+            message += f"• {item['landmark']} (~{item['minutes']} د{transfers})\n"
+        if len(items) > 8:
+            message += f"  و {len(items) - 8} أماكن أخرى\n"
+        message += "\n"
+    
+    await update.message.reply_text(message[:4000], parse_mode=ParseMode.MARKDOWN)
+
 # دوال الإدارة
 async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -> States:
     query = update.callback_query
@@ -1048,7 +1490,7 @@ async def show_admin_panel(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 • المشرفين النشطين: {len(admin_system.admin_ids) + len(SUPER_ADMIN_IDS)}
 • التقارير النشطة: {len(reports_system.get_active_reports())}
 • إجمالي الأحياء: {len(neighborhood_data)}
-• إجمالي الخطوط: {len(routes_data)}
+• إجمالي الخطوط: {len(transit_engine.active_routes())}
 
 اختر العملية المطلوبة:
     """
@@ -1089,6 +1531,7 @@ async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYP
     
     elif query.data == "admin_stats":
         geocache_count = len(geocoding_system.cache)
+        cache_stats = route_answer_cache.stats()
         total_landmarks = sum(len(categories[cat]) for categories in neighborhood_data.values() for cat in categories)
         
         stats_text = f"""
@@ -1097,7 +1540,7 @@ async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYP
 🏘️ **البيانات الأساسية:**
 • الأحياء: {len(neighborhood_data)}
 • المعالم: {total_landmarks}
-• خطوط المواصلات: {len(routes_data)}
+• خطوط المواصلات: {len(transit_engine.active_routes())}
 
 📡 **التقارير:**
 • التقارير النشطة: {len(reports_system.get_active_reports())}
@@ -1106,6 +1549,13 @@ async def handle_admin_actions(update: Update, context: ContextTypes.DEFAULT_TYP
 🗺️ **الجيوكود:**
 • الأماكن المحفوظة: {geocache_count}
 
+⚡ **ذاكرة إجابات المسارات:**
+• الإجابات المحفوظة: {cache_stats['size']}/{cache_stats['maxsize']}
+• مرات الاستخدام (hit): {cache_stats['hits']}
+• مرات الحساب (miss): {cache_stats['misses']}
+• نسبة الاستفادة: {cache_stats['hit_rate']:.1f}%
+• إصدار البيانات: {cache_stats['data_version']}
+
 👥 **الإدارة:**
 • المشرفين: {len(admin_system.admin_ids)}
 • المشرفين الأساسيين: {len(SUPER_ADMIN_IDS)}
@@ -1374,6 +1824,10 @@ def main() -> None:
     )
 
     application.add_handler(conv_handler)
+    application.add_handler(CallbackQueryHandler(handle_return_trip, pattern=r'^return_trip$'))
+    application.add_handler(CallbackQueryHandler(handle_more_options, pattern=r'^more_options$'))
+    application.add_handler(CallbackQueryHandler(handle_did_you_mean, pattern=r'^did_you_mean:\d+$'))
+    application.add_handler(CommandHandler('reachable', reachable_command))
     
     # أوامر إضافية
     application.add_handler(CommandHandler('help', lambda u, c: u.message.reply_text(
@@ -1384,6 +1838,7 @@ def main() -> None:
 /start - بدء المحادثة
 /help - هذه المساعدة
 /cancel - إلغاء العملية الحالية
+/reachable <المكان> <الدقائق> - الأماكن التي تصل إليها خلال مدة معينة
 
 **الميزات:**
 🔍 بحث ذكي بالنص الحر
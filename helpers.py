@@ -5,6 +5,31 @@
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from typing import List, Dict, Any, Optional
+from routing_engine import get_engine
+from journey_planner import JourneyPlanner
+from fare_table import format_fare
+from route_cache import read_data_version
+
+# رقم المحرك ← (إصدار البيانات، المخطط المبني مع روابط المشي من قاعدة البيانات)
+_transfer_planners: Dict[int, tuple] = {}
+
+def get_transfer_planner(routes_data: List[Dict]) -> JourneyPlanner:
+    """مخطط الرحلات مع أوقات المشي من route_connection وwalking_transfer (تُقرأ مرة لكل محرك وإصدار بيانات)"""
+    engine = get_engine(routes_data)
+    version = read_data_version()
+    cached = _transfer_planners.get(id(engine))
+    if cached is not None and cached[0] == version and cached[1].engine is engine:
+        return cached[1]
+    try:
+        from database_helper import get_route_connections_from_db, get_walking_transfers_from_db
+        connections, walking_transfers = get_route_connections_from_db(), get_walking_transfers_from_db()
+    except ImportError:
+        connections, walking_transfers = [], []
+    if len(_transfer_planners) >= 8:
+        _transfer_planners.clear()
+    planner = JourneyPlanner(engine, connections, walking_transfers)
+    _transfer_planners[id(engine)] = (version, planner)
+    return planner
 
 def build_keyboard(items: List, prefix: str, back_target: Optional[str] = None) -> InlineKeyboardMarkup:
     """بناء لوحة المفاتيح التفاعلية"""
@@ -54,64 +79,8 @@ def find_route_logic(start_landmark: str, end_landmark: str, routes_data: List[D
     البحث عن أفضل مسار بين معلمين - محسن مع دعم الأماكن القريبة
     """
     
-    # البحث عن المسارات المباشرة
-    direct_routes = []
-    nearby_routes = []  # للأماكن القريبة
-    
-    # تحسين البحث - استخدام مطابقة أفضل
-    def find_location_in_route(location: str, route_points: List[str]) -> List[int]:
-        """البحث عن مكان في نقاط الخط مع مطابقة محسنة"""
-        indices = []
-        location_clean = location.lower().strip()
-        
-        for i, point in enumerate(route_points):
-            if isinstance(point, str):
-                point_clean = point.lower().strip()
-                # مطابقة دقيقة أولاً
-                if location_clean == point_clean:
-                    indices.append((i, 'exact'))
-                # مطابقة جزئية
-                elif location_clean in point_clean or point_clean in location_clean:
-                    indices.append((i, 'partial'))
-                # مطابقة بالكلمات المفتاحية
-                elif any(word in point_clean for word in location_clean.split() if len(word) > 2):
-                    indices.append((i, 'keyword'))
-        
-        return indices
-    
-    for route in routes_data:
-        key_points = route.get('keyPoints', [])
-        if not key_points:
-            continue
-            
-        # البحث المحسن عن النقاط
-        start_matches = find_location_in_route(start_landmark, key_points)
-        end_matches = find_location_in_route(end_landmark, key_points)
-        
-        if start_matches and end_matches:
-            # التحقق من الترتيب الصحيح
-            valid_routes = []
-            for start_idx, start_type in start_matches:
-                for end_idx, end_type in end_matches:
-                    if start_idx < end_idx:
-                        valid_routes.append({
-                            'start_idx': start_idx,
-                            'end_idx': end_idx,
-                            'start_type': start_type,
-                            'end_type': end_type,
-                            'start_point': key_points[start_idx],
-                            'end_point': key_points[end_idx]
-                        })
-            
-            if valid_routes:
-                # ترتيب حسب دقة المطابقة
-                priority_order = {'exact': 3, 'partial': 2, 'keyword': 1}
-                valid_routes.sort(key=lambda x: priority_order.get(x['start_type'], 0) + priority_order.get(x['end_type'], 0), reverse=True)
-                
-                direct_routes.append({
-                    'route': route,
-                    'matches': valid_routes
-                })
+    # البحث عن المسارات المباشرة عبر الفهرس المبني مسبقاً
+    direct_routes = get_engine(routes_data).find_direct_routes(start_landmark, end_landmark)
     
     if direct_routes:
         result = "🚌 **تم العثور على مسارات مباشرة:**\n\n"
@@ -122,6 +91,7 @@ def find_route_logic(start_landmark: str, end_landmark: str, routes_data: List[D
             result += f"{i}. **{route.get('routeName', 'خط غير محدد')}**\n"
             result += f"   🚏 نقطة الركوب: {best_match['start_point']}\n"
             result += f"   🛑 نقطة النزول: {best_match['end_point']}\n"
+            result += f"   🚏 محطات في الطريق: {best_match['intermediate_stops']}\n"
             result += f"   💰 التعريفة: {route.get('fare', 'غير محددة')}\n"
             
             # إضافة معلومات الأماكن القريبة إذا كانت المطابقة جزئية
@@ -139,52 +109,21 @@ def find_route_logic(start_landmark: str, end_landmark: str, routes_data: List[D
         return result
     
     else:
-        # البحث عن مسارات بتبديل
-        potential_connections = []
-        
-        for route1 in routes_data:
-            for route2 in routes_data:
-                if route1 == route2:
-                    continue
-                
-                # البحث عن نقاط مشتركة للتبديل
-                route1_points = route1.get('keyPoints', [])
-                route2_points = route2.get('keyPoints', [])
-                
-                # هل يخدم route1 نقطة البداية؟
-                route1_has_start = any(start_landmark.lower() in str(point).lower() 
-                                     for point in route1_points)
-                
-                # هل يخدم route2 نقطة النهاية؟ 
-                route2_has_end = any(end_landmark.lower() in str(point).lower() 
-                                   for point in route2_points)
-                
-                if route1_has_start and route2_has_end:
-                    # البحث عن نقاط التبديل المشتركة
-                    common_points = []
-                    for p1 in route1_points:
-                        for p2 in route2_points:
-                            if isinstance(p1, str) and isinstance(p2, str):
-                                if p1.lower() == p2.lower() or \
-                                   (len(p1) > 5 and len(p2) > 5 and 
-                                    (p1.lower() in p2.lower() or p2.lower() in p1.lower())):
-                                    common_points.append(p1)
-                    
-                    if common_points:
-                        potential_connections.append({
-                            'route1': route1,
-                            'route2': route2,
-                            'transfer_points': common_points
-                        })
+        # البحث عن مسارات بتبديل (حتى تبديلين) عبر مخطط الرحلات
+        journeys = [journey for journey in get_transfer_planner(routes_data).plan(start_landmark, end_landmark)
+                    if journey['transfers'] > 0]
         
-        if potential_connections:
+        if journeys:
             result = "🔄 **مسارات بتبديل متاحة:**\n\n"
-            for i, conn in enumerate(potential_connections[:3], 1):  # أول 3 خيارات
-                result += f"{i}. **{conn['route1'].get('routeName')}** ← **{conn['route2'].get('routeName')}**\n"
-                result += f"   🔄 نقاط التبديل: {', '.join(conn['transfer_points'][:2])}\n"
-                fare1 = conn['route1'].get('fare', 'غير محددة')
-                fare2 = conn['route2'].get('fare', 'غير محددة') 
-                result += f"   💰 التعريفة: {fare1} + {fare2}\n\n"
+            for i, journey in enumerate(journeys[:3], 1):  # أول 3 خيارات
+                rides = [leg for leg in journey['legs'] if leg['type'] == 'ride']
+                result += f"{i}. " + " ← ".join(f"**{leg['route'].get('routeName')}**" for leg in rides) + "\n"
+                transfer_points = [leg['alight_stop'] for leg in rides[:-1]]
+                result += f"   🔄 نقاط التبديل: {', '.join(transfer_points)}\n"
+                if journey['walking_minutes']:
+                    result += f"   🚶 مشي للتبديل: {journey['walking_minutes']:g} دقيقة تقريباً\n"
+                fares = [format_fare(leg['fare']) for leg in rides]
+                result += f"   💰 التعريفة: {' + '.join(fares)} = {format_fare(journey['fare'])}\n\n"
             
             result += "📝 **ملاحظة:** قد تحتاج لسؤال السائق عن أفضل نقاط التبديل."
             return result
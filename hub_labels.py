@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس تسميات المحاور (Hub Labels / 2-hop cover) لأقل دقائق بين أي محطتين
+يُبنى خارج البوت مرة واحدة لكل نسخة من الشبكة ويُحفظ في ملف مضغوط
+لكل محطة قائمتان صغيرتان: (محور، دقائق منها إليه) و(محور، دقائق منه إليها)
+وأقل دقائق بين محطتين = أصغر مجموع على المحاور المشتركة بين القائمتين بدون أي بحث في الشبكة
+
+نموذج الدقائق هو نفس نموذج البحث بالدقائق: انتظار قبل كل ركوب + دقائق الخط + المشي بين المحطات
+
+الاستخدام:
+    python hub_labels.py                 # بناء الفهرس لبيانات البوت
+"""
+
+import os
+import sys
+import json
+import heapq
+import random
+import hashlib
+import argparse
+from typing import List, Tuple, Optional, Iterable
+
+import numpy as np
+
+from journey_planner import JourneyPlanner
+from route_distances import RouteDistances, VEHICLE_SPEED_M_PER_MIN
+from isochrone import BOARDING_WAIT_MINUTES
+
+# ملف الفهرس الافتراضي بجوار البوت
+HUB_LABELS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hub_labels.npz')
+
+# عدد أشجار أقصر المسارات العشوائية المستخدمة لترتيب المحاور
+ORDER_SAMPLES = 64
+
+INFINITY = float('inf')
+
+
+def network_fingerprint(planner: JourneyPlanner, distances: RouteDistances) -> str:
+    """بصمة الشبكة (المحطات بأرقامها، الخطوط بمسافاتها، وروابط المشي) - الفهرس صالح فقط لنفس البصمة"""
+    engine = planner.engine
+    payload = json.dumps({
+        'stops': list(engine.stops.keys),
+        'routes': [[engine.stops.keys[stop_id] if stop_id >= 0 else None for stop_id in stops]
+                   for stops in engine.route_stops],
+        'meters': [[round(value) for value in cumulative.tolist()] for cumulative in distances.cumulative],
+        'removed': sorted(engine.removed_routes),
+        'footpaths': sorted([engine.stops.keys[stop_id], engine.stops.keys[other], minutes]
+                            for stop_id, paths in planner.footpaths.items() for other, minutes in paths)
+    }, ensure_ascii=False)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).hexdigest()
+
+
+def transit_graph(planner: JourneyPlanner, distances: RouteDistances) -> Tuple[int, List[List[Tuple[int, float]]]]:
+    """
+    الشبكة كرسم موجه: العقد 0..عدد المحطات-1 = المحطات، وبعدها عقدة لكل موضع على كل خط
+    محطة ← موضع (انتظار الركوب)، موضع ← الموضع التالي (دقائق الخط)، موضع ← محطة (النزول)،
+    محطة ← محطة (مشي أو محطة مكافئة)
+    """
+    engine = planner.engine
+    stop_count = len(engine.stops.keys)
+    graph: List[List[Tuple[int, float]]] = [[] for _ in range(stop_count)]
+    for route_idx, stops in enumerate(engine.route_stops):
+        if route_idx in engine.removed_routes:
+            continue
+        minutes = distances.cumulative[route_idx] / VEHICLE_SPEED_M_PER_MIN
+        first = len(graph)
+        graph.extend([] for _ in stops)
+        for position, stop_id in enumerate(stops):
+            node = first + position
+            if position + 1 < len(stops):
+                graph[node].append((node + 1, float(minutes[position + 1] - minutes[position])))
+            if stop_id >= 0:
+                graph[stop_id].append((node, BOARDING_WAIT_MINUTES))
+                graph[node].append((stop_id, 0.0))
+    for stop_id, equivalents in engine.transfer_table.equivalents.items():
+        graph[stop_id].extend((other, 0.0) for other in equivalents)
+    for stop_id, paths in planner.footpaths.items():
+        graph[stop_id].extend(paths)
+    return stop_count, graph
+
+
+def _reverse(graph: List[List[Tuple[int, float]]]) -> List[List[Tuple[int, float]]]:
+    reverse: List[List[Tuple[int, float]]] = [[] for _ in graph]
+    for node, edges in enumerate(graph):
+        for other, cost in edges:
+            reverse[other].append((node, cost))
+    return reverse
+
+
+def online_minutes(graph: List[List[Tuple[int, float]]], sources: Iterable[int], targets: Iterable[int]) -> float:
+    """أقل دقائق بالبحث المباشر في الرسم (Dijkstra) - للمقارنة مع الفهرس"""
+    targets = set(targets)
+    dist = {source: 0.0 for source in sources}
+    heap = [(0.0, source) for source in dist]
+    heapq.heapify(heap)
+    while heap:
+        minutes, node = heapq.heappop(heap)
+        if minutes > dist[node]:
+            continue
+        if node in targets:
+            return minutes
+        for other, cost in graph[node]:
+            arrival = minutes + cost
+            if arrival < dist.get(other, INFINITY):
+                dist[other] = arrival
+                heapq.heappush(heap, (arrival, other))
+    return INFINITY
+
+
+def _hub_order(graph: List[List[Tuple[int, float]]], stop_count: int, samples: int = ORDER_SAMPLES,
+               seed: int = 3) -> List[int]:
+    """
+    ترتيب المحطات كمحاور: أشجار أقصر المسارات من محطات عشوائية، ودرجة كل محطة = عدد المحطات تحتها في الأشجار
+    (المحطة التي تمر بها رحلات أكثر تغطي أزواجاً أكثر فتصغر القوائم التالية)
+    """
+    served = [stop_id for stop_id in range(stop_count) if graph[stop_id]]
+    score = [0] * stop_count
+    for source in random.Random(seed).sample(served, min(samples, len(served))):
+        dist = {source: 0.0}
+        parent = {source: -1}
+        settled = []
+        heap = [(0.0, source)]
+        while heap:
+            minutes, node = heapq.heappop(heap)
+            if minutes > dist[node]:
+                continue
+            settled.append(node)
+            for other, cost in graph[node]:
+                arrival = minutes + cost
+                if arrival < dist.get(other, INFINITY):
+                    dist[other] = arrival
+                    parent[other] = node
+                    heapq.heappush(heap, (arrival, other))
+        below = dict.fromkeys(settled, 0)
+        for node in reversed(settled):
+            if node < stop_count:
+                below[node] += 1
+                score[node] += below[node]
+            if parent[node] >= 0:
+                below[parent[node]] += below[node]
+    # المحطات خارج العينة بعدد الخطوط والروابط
+    return sorted(range(stop_count), key=lambda stop_id: (-score[stop_id], -len(graph[stop_id])))
+
+
+def _pruned_search(graph: List[List[Tuple[int, float]]], stop_count: int, hub: int, rank: int,
+                   hub_labels: List[Tuple[int, float]], labels: List[List[Tuple[int, float]]]):
+    """
+    بحث من المحور يتوقف عند كل محطة تغطيها التسميات الحالية بنفس الدقائق أو أقل
+    (المحاور المحطات فقط: كل رحلة تبدأ وتنتهي بمحطة فتكفي لتغطية كل الأزواج)
+    """
+    hub_minutes = dict(hub_labels)
+    dist = {hub: 0.0}
+    heap = [(0.0, hub)]
+    while heap:
+        minutes, node = heapq.heappop(heap)
+        if minutes > dist[node]:
+            continue
+        if node < stop_count:
+            if any(hub_minutes.get(other, INFINITY) + other_minutes <= minutes
+                   for other, other_minutes in labels[node]):
+                continue
+            labels[node].append((rank, minutes))
+        for other, cost in graph[node]:
+            arrival = minutes + cost
+            if arrival < dist.get(other, INFINITY):
+                dist[other] = arrival
+                heapq.heappush(heap, (arrival, other))
+
+
+def _pack(labels: List[List[Tuple[int, float]]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """قوائم التسميات ← (بداية كل محطة، أرقام المحاور، الدقائق) بدون كائنات Python"""
+    offsets = np.zeros(len(labels) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(items) for items in labels])
+    hubs = np.fromiter((hub for items in labels for hub, _ in items), dtype=np.int32, count=int(offsets[-1]))
+    minutes = np.fromiter((value for items in labels for _, value in items), dtype=np.float32, count=int(offsets[-1]))
+    return offsets, hubs, minutes
+
+
+class HubLabels:
+    """
+    out: المحطة ← (المحاور الممكن الوصول لها منها، الدقائق)
+    in: المحطة ← (المحاور التي يمكن الوصول منها إليها، الدقائق)
+    المحاور داخل كل قائمة مرتبة بالرقم فتقاطع القائمتين تقاطع مصفوفتين مرتبتين
+    """
+
+    def __init__(self, fingerprint: str, out_offsets: np.ndarray, out_hubs: np.ndarray, out_minutes: np.ndarray,
+                 in_offsets: np.ndarray, in_hubs: np.ndarray, in_minutes: np.ndarray):
+        self.fingerprint = fingerprint
+        self.out_offsets, self.out_hubs, self.out_minutes = out_offsets, out_hubs, out_minutes
+        self.in_offsets, self.in_hubs, self.in_minutes = in_offsets, in_hubs, in_minutes
+
+    @classmethod
+    def build(cls, planner: JourneyPlanner, distances: RouteDistances) -> 'HubLabels':
+        """بناء الفهرس (Pruned Landmark Labeling) - المحطات الأهم في أقصر المسارات أولاً"""
+        stop_count, graph = transit_graph(planner, distances)
+        reverse = _reverse(graph)
+        order = _hub_order(graph, stop_count)
+        labels_out: List[List[Tuple[int, float]]] = [[] for _ in range(stop_count)]
+        labels_in: List[List[Tuple[int, float]]] = [[] for _ in range(stop_count)]
+        for rank, hub in enumerate(order):
+            if not graph[hub] and not reverse[hub]:
+                continue
+            _pruned_search(graph, stop_count, hub, rank, labels_out[hub], labels_in)
+            _pruned_search(reverse, stop_count, hub, rank, labels_in[hub], labels_out)
+        return cls(network_fingerprint(planner, distances), *_pack(labels_out), *_pack(labels_in))
+
+    def save(self, path: str = HUB_LABELS_FILE):
+        """حفظ الفهرس في ملف مؤقت ثم استبداله دفعة واحدة"""
+        temp_path = path + '.tmp.npz'
+        np.savez_compressed(temp_path, fingerprint=np.array(self.fingerprint),
+                            out_offsets=self.out_offsets, out_hubs=self.out_hubs, out_minutes=self.out_minutes,
+                            in_offsets=self.in_offsets, in_hubs=self.in_hubs, in_minutes=self.in_minutes)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str = HUB_LABELS_FILE) -> 'HubLabels':
+        with np.load(path) as data:
+            return cls(str(data['fingerprint']), data['out_offsets'], data['out_hubs'], data['out_minutes'],
+                       data['in_offsets'], data['in_hubs'], data['in_minutes'])
+
+    def label_count(self) -> int:
+        return len(self.out_hubs) + len(self.in_hubs)
+
+    def stop_minutes(self, source: int, target: int) -> float:
+        """أقل دقائق من محطة إلى محطة (ما لا نهاية إذا لم يكن هناك طريق)"""
+        out_start, out_end = self.out_offsets[source], self.out_offsets[source + 1]
+        in_start, in_end = self.in_offsets[target], self.in_offsets[target + 1]
+        _, out_positions, in_positions = np.intersect1d(
+            self.out_hubs[out_start:out_end], self.in_hubs[in_start:in_end], assume_unique=True, return_indices=True)
+        if not len(out_positions):
+            return INFINITY
+        return float((self.out_minutes[out_start + out_positions] + self.in_minutes[in_start + in_positions]).min())
+
+    def minutes(self, sources: Iterable[int], targets: Iterable[int]) -> float:
+        """أقل دقائق بين مجموعتي محطات (مثل محطات معلم البداية ومعلم الوجهة)"""
+        targets = list(targets)
+        return min((self.stop_minutes(source, target) for source in sources for target in targets), default=INFINITY)
+
+
+def load_hub_labels(planner: JourneyPlanner, distances: RouteDistances,
+                    path: str = HUB_LABELS_FILE) -> Optional[HubLabels]:
+    """تحميل الفهرس إذا كان موجوداً ومبنياً لنفس الشبكة"""
+    try:
+        labels = HubLabels.load(path)
+    except (OSError, ValueError, KeyError):
+        return None
+    if labels.fingerprint != network_fingerprint(planner, distances):
+        return None
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بناء فهرس تسميات المحاور")
+    parser.add_argument('--output', default=HUB_LABELS_FILE)
+    args = parser.parse_args()
+
+    from landmark_table import _load_bot_data
+    from routing_engine import TransitEngine
+    from route_distances import get_route_distances
+    routes_data, _ = _load_bot_data()
+    try:
+        from database_helper import get_route_connections_from_db, get_walking_transfers_from_db
+        connections, walking_transfers = get_route_connections_from_db(), get_walking_transfers_from_db()
+    except ImportError:
+        connections, walking_transfers = [], []
+    engine = TransitEngine(routes_data)
+    planner = JourneyPlanner(engine, connections, walking_transfers)
+    labels = HubLabels.build(planner, get_route_distances(engine))
+    labels.save(args.output)
+    stop_count = len(labels.out_offsets) - 1
+    print(f"✅ {stop_count} محطة، {labels.label_count()} تسمية "
+          f"(متوسط {labels.label_count() / max(1, 2 * stop_count):.1f} لكل قائمة) ← {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
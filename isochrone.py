@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+الأماكن التي يمكن الوصول إليها من مكان خلال N دقيقة أو N تبديل
+بحث محدود على جولات (مثل مخطط الرحلات) فوق فهرس المحطات:
+دقائق الركوب من المسافات التراكمية لكل خط، ودقائق المشي من route_connection وwalking_transfer
+"""
+
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional, Iterable
+
+from journey_planner import JourneyPlanner, MAX_TRANSFERS
+from route_distances import RouteDistances, VEHICLE_SPEED_M_PER_MIN
+
+# المدة الافتراضية للبحث (دقيقة)
+DEFAULT_ISOCHRONE_MINUTES = 30.0
+
+# متوسط الانتظار قبل كل ركوب (دقيقة)
+BOARDING_WAIT_MINUTES = 5.0
+
+# عدد الاستعلامات المحفوظة نتائجها لكل إصدار بيانات
+ISOCHRONE_CACHE_SIZE = 256
+
+INFINITY = float('inf')
+
+
+class Isochrone:
+    """البحث عن المعالم الممكن الوصول إليها من مكان البداية"""
+
+    def __init__(self, planner: JourneyPlanner, distances: RouteDistances, landmarks: Iterable[Tuple[str, str]]):
+        engine = planner.engine
+        self.planner = planner
+        self.engine = engine
+        # رقم الخط ← دقائق الركوب التراكمية عند كل موضع
+        self.route_minutes = [(cumulative / VEHICLE_SPEED_M_PER_MIN).tolist() for cumulative in distances.cumulative]
+        # المعالم: [(الاسم، الحي)] ومحطة ← المعالم التي تخدمها
+        self.landmarks: List[Tuple[str, str]] = list(landmarks)
+        self._stop_landmarks: Dict[int, List[int]] = {}
+        for landmark_idx, (name, _) in enumerate(self.landmarks):
+            for stop_id in engine.resolve_best_stops(name):
+                self._stop_landmarks.setdefault(stop_id, []).append(landmark_idx)
+        self._cache: OrderedDict = OrderedDict()
+
+    def _relax_walking(self, stops: Iterable[int], best: Dict[int, Tuple[float, int]],
+                       rides: int, max_minutes: float) -> List[int]:
+        """المشي خطوة واحدة (أو الانتقال لمحطة مكافئة) من المحطات التي تحسنت"""
+        equivalents = self.engine.transfer_table.equivalents
+        improved = []
+        for stop_id in list(stops):
+            minutes = best[stop_id][0]
+            neighbors = [(other, 0.0) for other in equivalents.get(stop_id, [])]
+            neighbors += self.planner.footpaths.get(stop_id, [])
+            for other, walk in neighbors:
+                arrival = minutes + walk
+                if arrival <= max_minutes and arrival < best.get(other, (INFINITY, 0))[0]:
+                    best[other] = (arrival, rides)
+                    improved.append(other)
+        return improved
+
+    def reachable_stops(self, sources: Iterable[int], max_minutes: Optional[float] = None,
+                        max_transfers: int = MAX_TRANSFERS) -> Dict[int, Tuple[float, int]]:
+        """المحطة ← (أقل دقائق للوصول، عدد مرات الركوب) حتى max_minutes وmax_transfers تبديل"""
+        engine = self.engine
+        if max_minutes is None:
+            max_minutes = INFINITY
+        best: Dict[int, Tuple[float, int]] = {stop_id: (0.0, 0) for stop_id in sources}
+        marked = set(best)
+        marked.update(self._relax_walking(marked, best, 0, max_minutes))
+
+        for rides in range(1, max_transfers + 2):
+            # أوقات الجولة السابقة فقط (الركوب من محطة وصلنا لها في نفس الجولة = تبديل إضافي)
+            previous = {stop_id: best[stop_id][0] for stop_id in marked}
+            queue: Dict[int, int] = {}
+            for stop_id in marked:
+                for route_idx, position in engine.stop_routes[stop_id]:
+                    if position < queue.get(route_idx, len(engine.route_stops[route_idx])):
+                        queue[route_idx] = position
+
+            improved = set()
+            for route_idx, first_position in queue.items():
+                stops = engine.route_stops[route_idx]
+                minutes = self.route_minutes[route_idx]
+                # وقت الركوب مطروحاً منه دقائق الخط حتى موضع الركوب
+                boarded = INFINITY
+                for position in range(first_position, len(stops)):
+                    stop_id = stops[position]
+                    if stop_id < 0:
+                        continue
+                    arrival = boarded + minutes[position]
+                    if arrival <= max_minutes and arrival < best.get(stop_id, (INFINITY, 0))[0]:
+                        best[stop_id] = (arrival, rides)
+                        improved.add(stop_id)
+                    if stop_id in previous:
+                        boarded = min(boarded, previous[stop_id] + BOARDING_WAIT_MINUTES - minutes[position])
+
+            if not improved:
+                break
+            improved.update(self._relax_walking(improved, best, rides, max_minutes))
+            marked = improved
+        return best
+
+    def query(self, start_landmark: str, max_minutes: Optional[float] = DEFAULT_ISOCHRONE_MINUTES,
+              max_transfers: int = MAX_TRANSFERS) -> List[Dict]:
+        """
+        المعالم الممكن الوصول إليها مرتبة بالدقائق:
+        [{'landmark', 'neighborhood', 'minutes', 'transfers'}] (النتيجة محفوظة لنفس السؤال)
+        """
+        key = (start_landmark, max_minutes, max_transfers)
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached
+
+        sources = self.engine.resolve_best_stops(start_landmark)
+        reached: Dict[int, Tuple[float, int]] = {}
+        for stop_id, (minutes, rides) in self.reachable_stops(sources, max_minutes, max_transfers).items():
+            for landmark_idx in self._stop_landmarks.get(stop_id, ()):
+                if minutes < reached.get(landmark_idx, (INFINITY, 0))[0]:
+                    reached[landmark_idx] = (minutes, rides)
+
+        results = []
+        for landmark_idx, (minutes, rides) in reached.items():
+            name, neighborhood = self.landmarks[landmark_idx]
+            if name == start_landmark:
+                continue
+            results.append({
+                'landmark': name,
+                'neighborhood': neighborhood,
+                'minutes': round(minutes),
+                'transfers': max(rides - 1, 0)
+            })
+        results.sort(key=lambda item: (item['minutes'], item['landmark']))
+
+        self._cache[key] = results
+        if len(self._cache) > ISOCHRONE_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return results
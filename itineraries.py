@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+أفضل k رحلات بديلة بين مكانين مرتبة بالدقائق
+البديل = تسلسل خطوط مختلف (نفس الخطوط بنقطة تبديل أخرى ليس بديلاً جديداً)
+البحث على طريقة Yen لكن على مستوى الخطوط: كل بادئة (خط، خط، ...) تُوسَّع بالخطوط المرتبطة بها
+بترتيب حد أدنى للدقائق، فتخرج الرحلات الكاملة بالترتيب الصحيح واحدة تلو الأخرى
+حالة البحث (كومة البادئات) تُحفظ لكل سؤال فزر "خيارات أخرى" يكمل من حيث توقف
+"""
+
+import heapq
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional, Iterable
+
+from journey_planner import JourneyPlanner, MAX_TRANSFERS
+from route_distances import RouteDistances, VEHICLE_SPEED_M_PER_MIN
+from isochrone import BOARDING_WAIT_MINUTES
+
+# أقصى عدد عناصر تُسحب من الكومة لكل صفحة (حد أعلى لوقت السؤال)
+MAX_EXPANSIONS_PER_PAGE = 2000
+
+# عدد الأسئلة المحفوظة حالة بحثها
+ITINERARY_CACHE_SIZE = 128
+
+INFINITY = float('inf')
+
+
+class _Prefix:
+    """بادئة رحلة: الخطوط حتى الآن ودقائق الوصول لكل موضع على آخر خط"""
+    __slots__ = ('routes', 'arrivals', 'boards', 'parent')
+
+    def __init__(self, routes: Tuple[int, ...], arrivals: List[float], boards: List[Optional[Tuple]], parent):
+        self.routes = routes
+        self.arrivals = arrivals
+        # الموضع ← (موضع الركوب، موضع النزول من الخط السابق، دقائق المشي قبل الركوب)
+        self.boards = boards
+        self.parent = parent
+
+
+class ItineraryGenerator:
+    """حالة البحث لسؤال واحد: كومة البادئات والرحلات الكاملة والنتائج المعروضة"""
+
+    def __init__(self, search: 'ItinerarySearch', sources: Iterable[int], targets: Iterable[int],
+                 max_transfers: int = MAX_TRANSFERS):
+        self.search = search
+        self.max_rides = max_transfers + 1
+        self.results: List[Dict] = []
+        self._heap: List[Tuple] = []
+        self._counter = 0
+
+        # المحطة ← دقائق المشي منها إلى الوجهة
+        targets = set(targets)
+        self._final_walk: Dict[int, float] = dict.fromkeys(targets, 0.0)
+        for stop_id in search.walk_sources():
+            for other, minutes in search.walks(stop_id):
+                if other in targets and minutes < self._final_walk.get(stop_id, INFINITY):
+                    self._final_walk[stop_id] = minutes
+
+        # الركوب الأول من محطات البداية أو بعد المشي منها
+        boardings: Dict[int, Dict[int, Tuple]] = {}
+        for stop_id in set(sources):
+            for other, walk in [(stop_id, 0.0)] + search.walks(stop_id):
+                for route_idx, position in search.engine.stop_routes[other]:
+                    entry = boardings.setdefault(route_idx, {}).get(position)
+                    if entry is None or walk + BOARDING_WAIT_MINUTES < entry[0]:
+                        boardings[route_idx][position] = (walk + BOARDING_WAIT_MINUTES, None, walk)
+        for route_idx, board_times in boardings.items():
+            self._push_prefix((route_idx,), board_times, None)
+        self.exhausted = not self._heap
+
+    def _push_prefix(self, routes: Tuple[int, ...], board_times: Dict[int, Tuple], parent: Optional[_Prefix]):
+        """الركوب على آخر خط في البادئة من مواضع الركوب الممكنة ثم إضافتها للكومة"""
+        route_idx = routes[-1]
+        if route_idx in self.search.engine.removed_routes:
+            return
+        stops = self.search.engine.route_stops[route_idx]
+        minutes = self.search.route_minutes[route_idx]
+        arrivals = [INFINITY] * len(stops)
+        boards: List[Optional[Tuple]] = [None] * len(stops)
+        # أفضل (وقت الركوب - دقائق الخط حتى موضعه) حتى الموضع الحالي
+        best, best_board = INFINITY, None
+        finish, finish_position = INFINITY, None
+        for position, stop_id in enumerate(stops):
+            if stop_id < 0:
+                continue
+            if best_board is not None:
+                arrivals[position] = best + minutes[position]
+                boards[position] = best_board
+                final_walk = self._final_walk.get(stop_id)
+                if final_walk is not None and arrivals[position] + final_walk < finish:
+                    finish, finish_position = arrivals[position] + final_walk, position
+            entry = board_times.get(position)
+            if entry is not None and entry[0] - minutes[position] < best:
+                best, best_board = entry[0] - minutes[position], (position, entry[1], entry[2])
+
+        prefix = _Prefix(routes, arrivals, boards, parent)
+        if finish_position is not None:
+            self._push(finish, ('done', prefix, finish_position, self._final_walk[stops[finish_position]]))
+        if len(routes) < self.max_rides:
+            lower_bound = min(arrivals)
+            if lower_bound < INFINITY:
+                self._push(lower_bound, ('prefix', prefix))
+
+    def _push(self, minutes: float, item: Tuple):
+        heapq.heappush(self._heap, (minutes, self._counter, item))
+        self._counter += 1
+
+    def _expand(self, prefix: _Prefix):
+        """
+        البادئات الجديدة: التبديل من آخر خط لكل خط مرتبط به
+        بدون العودة لخط في البادئة أو لاتجاه آخر منه (A→B→A ليس بديلاً جديداً)
+        """
+        route_variants = self.search.engine.route_variants
+        used_lines = {route_variants[route_idx][0] for route_idx in prefix.routes}
+        for other_route, pairs in self.search.transfers(prefix.routes[-1]).items():
+            if route_variants[other_route][0] in used_lines:
+                continue
+            board_times: Dict[int, Tuple] = {}
+            for alight_position, board_position, walk in pairs:
+                arrival = prefix.arrivals[alight_position]
+                if arrival == INFINITY:
+                    continue
+                board_time = arrival + walk + BOARDING_WAIT_MINUTES
+                entry = board_times.get(board_position)
+                if entry is None or board_time < entry[0]:
+                    board_times[board_position] = (board_time, alight_position, walk)
+            if board_times:
+                self._push_prefix(prefix.routes + (other_route,), board_times, prefix)
+
+    def page(self, offset: int, count: int) -> List[Dict]:
+        """الرحلات من offset إلى offset + count (تُحسب فقط الرحلات الناقصة)"""
+        expansions = 0
+        while len(self.results) < offset + count and self._heap and expansions < MAX_EXPANSIONS_PER_PAGE:
+            minutes, _, item = heapq.heappop(self._heap)
+            expansions += 1
+            if item[0] == 'done':
+                self.results.append(self.search.build_itinerary(minutes, *item[1:]))
+            else:
+                self._expand(item[1])
+        self.exhausted = not self._heap
+        return self.results[offset:offset + count]
+
+
+class ItinerarySearch:
+    """جداول التبديل بين الخطوط (بالمشي أو بدونه) مع حالة البحث المحفوظة لكل سؤال"""
+
+    def __init__(self, planner: JourneyPlanner, distances: RouteDistances):
+        self.planner = planner
+        self.engine = planner.engine
+        self.route_minutes = [(cumulative / VEHICLE_SPEED_M_PER_MIN).tolist() for cumulative in distances.cumulative]
+        # الخط ← {الخط الآخر ← [(موضع النزول، موضع الركوب، دقائق المشي)]} تُبنى عند أول استخدام
+        self._transfers: Dict[int, Dict[int, List[Tuple[int, int, float]]]] = {}
+        self._generators: OrderedDict = OrderedDict()
+
+    def walks(self, stop_id: int) -> List[Tuple[int, float]]:
+        """المحطات المرتبطة بالمشي أو المكافئة (بدون مشي) - نفس روابط مخطط الرحلات"""
+        neighbors = self.planner.footpaths.get(stop_id, [])
+        equivalents = self.engine.transfer_table.equivalents.get(stop_id)
+        if equivalents:
+            neighbors = neighbors + [(other, 0.0) for other in equivalents]
+        return neighbors
+
+    def walk_sources(self) -> Iterable[int]:
+        """المحطات التي يبدأ منها مشي"""
+        return set(self.planner.footpaths) | set(self.engine.transfer_table.equivalents)
+
+    def transfers(self, route_idx: int) -> Dict[int, List[Tuple[int, int, float]]]:
+        """التبديل من الخط: في نفس المحطة أو محطة مكافئة أو بالمشي لمحطة قريبة"""
+        row = self._transfers.get(route_idx)
+        if row is not None:
+            return row
+        engine = self.engine
+        row = {}
+        for position, stop_id in enumerate(engine.route_stops[route_idx]):
+            if stop_id < 0:
+                continue
+            for other, walk in [(stop_id, 0.0)] + self.walks(stop_id):
+                for other_route, other_position in engine.stop_routes[other]:
+                    if other_route != route_idx:
+                        row.setdefault(other_route, []).append((position, other_position, walk))
+        self._transfers[route_idx] = row
+        return row
+
+    def build_itinerary(self, minutes: float, prefix: _Prefix, alight_position: int, final_walk: float) -> Dict:
+        """إعادة بناء مراحل الرحلة (بنفس شكل رحلات مخطط الرحلات) من آخر بادئة"""
+        engine = self.engine
+        legs = []
+        walking = final_walk
+        while prefix is not None:
+            route_idx = prefix.routes[-1]
+            board_position, previous_alight, walk = prefix.boards[alight_position]
+            key_points = engine.routes[route_idx].get('keyPoints', [])
+            legs.append({
+                'type': 'ride',
+                'route': engine.routes[route_idx],
+                'route_idx': route_idx,
+                'board_idx': board_position,
+                'alight_idx': alight_position,
+                'board_stop': key_points[board_position],
+                'alight_stop': key_points[alight_position],
+                'fare': engine.route_fares[route_idx]
+            })
+            if walk and prefix.parent is not None:
+                legs.append({
+                    'type': 'walk',
+                    'from_stop': engine.stop_names[engine.route_stops[prefix.parent.routes[-1]][previous_alight]],
+                    'to_stop': engine.stop_names[engine.route_stops[route_idx][board_position]],
+                    'minutes': walk
+                })
+            walking += walk
+            prefix, alight_position = prefix.parent, previous_alight
+        legs.reverse()
+        rides = [leg for leg in legs if leg['type'] == 'ride']
+        return {
+            'transfers': len(rides) - 1,
+            'minutes': round(minutes),
+            'walking_minutes': walking,
+            'fare': sum(leg['fare'] for leg in rides),
+            'legs': legs
+        }
+
+    def generator(self, start_landmark: str, end_landmark: str,
+                  max_transfers: int = MAX_TRANSFERS) -> ItineraryGenerator:
+        """حالة البحث المحفوظة للسؤال أو بدء بحث جديد"""
+        key = (start_landmark, end_landmark, max_transfers)
+        generator = self._generators.get(key)
+        if generator is None:
+            generator = ItineraryGenerator(self, self.engine.resolve_best_stops(start_landmark),
+                                           self.engine.resolve_best_stops(end_landmark), max_transfers)
+            self._generators[key] = generator
+            if len(self._generators) > ITINERARY_CACHE_SIZE:
+                self._generators.popitem(last=False)
+        else:
+            self._generators.move_to_end(key)
+        return generator
+
+    def alternatives(self, start_landmark: str, end_landmark: str, offset: int = 0, count: int = 3,
+                     max_transfers: int = MAX_TRANSFERS) -> List[Dict]:
+        """أفضل الرحلات البديلة من offset (مرتبة بالدقائق)"""
+        return self.generator(start_landmark, end_landmark, max_transfers).page(offset, count)
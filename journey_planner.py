@@ -0,0 +1,296 @@
+# -*- coding: utf-8 -*-
+"""
+مخطط الرحلات متعددة التبديلات (على طريقة RAPTOR)
+يبحث على جولات: كل جولة = ركوب خط إضافي، ويحتفظ بالخيارات غير المُهيمَن عليها
+(أقل تبديلات، أقل مشي، أقل تعريفة)
+"""
+
+from typing import List, Dict, Tuple, Optional, Iterable
+
+from routing_engine import TransitEngine, get_engine
+
+# أقصى عدد تبديلات افتراضي
+MAX_TRANSFERS = 2
+
+# سرعة المشي (متر في الدقيقة) ونطاق البحث عن محطات قريبة من نقطة على الخريطة
+WALKING_SPEED_M_PER_MIN = 80.0
+NEARBY_STOPS_RADIUS_M = 600.0
+
+
+def _dominates(a: Tuple, b: Tuple) -> bool:
+    """
+    هل الخيار a أفضل من أو يساوي b في المشي والتعريفة
+    الوصول بالمشي لا يهيمن على الوصول بالركوب لأن الأخير ما زال يسمح بالمشي لمحطة مرتبطة
+    """
+    if a[0] <= b[0] and a[1] <= b[1]:
+        return a[2][0] != 'walk' or b[2][0] == 'walk'
+    return False
+
+
+def _merge_label(bag: List[Tuple], label: Tuple) -> bool:
+    """إضافة خيار إلى مجموعة باريتو وحذف ما يهيمن عليه - يرجع False إذا كان مُهيمَناً عليه"""
+    for other in bag:
+        if _dominates(other, label):
+            return False
+    bag[:] = [other for other in bag if not _dominates(label, other)]
+    bag.append(label)
+    return True
+
+
+class JourneyPlanner:
+    """مخطط رحلات على فهرس المحطات مع روابط المشي بين الخطوط"""
+
+    def __init__(self, engine: TransitEngine, connections: Optional[List[Dict]] = None,
+                 walking_transfers: Optional[List[Dict]] = None):
+        self.engine = engine
+        # المحطة ← [(المحطة المجاورة، دقائق المشي)]
+        self.footpaths: Dict[int, List[Tuple[int, float]]] = {}
+        for connection in connections or []:
+            self.add_connection(connection)
+        for transfer in walking_transfers or []:
+            self.add_walking_transfer(transfer)
+
+    def add_connection(self, connection: Dict):
+        """إضافة رابط مشي من جدول route_connection"""
+        engine = self.engine
+        from_idx = engine.find_route_index(connection.get('from_route_name', ''))
+        to_idx = engine.find_route_index(connection.get('to_route_name', ''))
+        point = connection.get('connection_point') or ''
+        if from_idx is None or to_idx is None or not point:
+            return
+
+        walking_time = float(connection.get('walking_time') or 0)
+        for from_stop in engine.find_stops_on_route(from_idx, point):
+            for to_stop in engine.find_stops_on_route(to_idx, point):
+                # المحطة المشتركة تسمح بالتبديل بدون مشي أصلاً
+                if from_stop != to_stop:
+                    self._add_footpath(from_stop, to_stop, walking_time)
+
+    def add_walking_transfer(self, transfer: Dict):
+        """إضافة تحويل مشي مستنتج من جدول walking_transfer (في الاتجاهين)"""
+        from_stop = self.engine.stops.lookup(transfer.get('from_stop') or '')
+        to_stop = self.engine.stops.lookup(transfer.get('to_stop') or '')
+        if from_stop is None or to_stop is None or from_stop == to_stop:
+            return
+        walking_time = float(transfer.get('walking_time') or 0)
+        self._add_footpath(from_stop, to_stop, walking_time)
+        self._add_footpath(to_stop, from_stop, walking_time)
+
+    def _add_footpath(self, from_stop: int, to_stop: int, minutes: float):
+        """إضافة مسار مشي مع الاحتفاظ بأقصر وقت"""
+        paths = self.footpaths.setdefault(from_stop, [])
+        for i, (stop, existing) in enumerate(paths):
+            if stop == to_stop:
+                paths[i] = (stop, min(existing, minutes))
+                return
+        paths.append((to_stop, minutes))
+
+    def plan(self, start_landmark: str, end_landmark: str,
+             max_transfers: int = MAX_TRANSFERS, max_results: int = 5,
+             max_fare: Optional[float] = None) -> List[Dict]:
+        """البحث عن رحلات بين مكانين حتى max_transfers تبديل (وبإجمالي تعريفة لا يزيد عن max_fare)"""
+        sources = self.engine.resolve_best_stops(start_landmark)
+        targets = self.engine.resolve_best_stops(end_landmark)
+        if not sources or not targets:
+            return []
+        return self.plan_between_stops(sources, targets, max_transfers, max_results, max_fare)
+
+    def plan_from_coordinates(self, origin: Tuple[float, float], destination: Tuple[float, float], spatial_index,
+                              max_transfers: int = MAX_TRANSFERS, max_results: int = 5,
+                              radius_m: float = NEARBY_STOPS_RADIUS_M, k: int = 5) -> List[Dict]:
+        """البحث عن رحلات بين نقطتين على الخريطة باختيار محطات الركوب والنزول بالمسافة الفعلية"""
+        sources = {stop: distance / WALKING_SPEED_M_PER_MIN
+                   for stop, distance in spatial_index.nearest(origin[0], origin[1], k, radius_m)}
+        # المشي من محطة النزول إلى الوجهة يدخل في البحث نفسه (التقليم واختيار أفضل محطة نزول)
+        targets = {stop: distance / WALKING_SPEED_M_PER_MIN
+                   for stop, distance in spatial_index.nearest(destination[0], destination[1], k, radius_m)}
+        if not sources or not targets:
+            return []
+        return self.plan_between_stops(sources, targets, max_transfers, max_results)
+
+    def plan_between_stops(self, sources: Iterable[int], targets: Iterable[int],
+                           max_transfers: int = MAX_TRANSFERS, max_results: int = 5,
+                           max_fare: Optional[float] = None) -> List[Dict]:
+        """
+        البحث على جولات بين مجموعتي محطات
+        sources قائمة محطات أو قاموس {المحطة: دقائق المشي إليها}
+        targets قائمة محطات أو قاموس {المحطة: دقائق المشي منها إلى الوجهة}
+        الخيار = (دقائق المشي، التعريفة، بيانات إعادة بناء الرحلة)
+        """
+        engine = self.engine
+        if not isinstance(targets, dict):
+            targets = dict.fromkeys(targets, 0.0)
+        if max_fare is None:
+            max_fare = float('inf')
+        best: Dict[int, List[Tuple]] = {}
+        previous: Dict[int, List[Tuple]] = {}
+        arrivals: List[Tuple[int, Tuple]] = []  # (عدد التبديلات، الخيار)
+        target_bag: List[Tuple] = []
+
+        if not isinstance(sources, dict):
+            sources = dict.fromkeys(sources, 0.0)
+        for stop, walk in sources.items():
+            label = (float(walk), 0.0, ('start', stop))
+            best[stop] = [label]
+            previous[stop] = [label]
+        self._relax_footpaths(set(previous), previous, best, targets, target_bag, arrivals, -1)
+        marked = set(previous)
+
+        for ride in range(max_transfers + 1):
+            # الخطوط التي تمر بمحطة تحسنت في الجولة السابقة من أبكر موضع
+            queue: Dict[int, int] = {}
+            for stop in marked:
+                for route_idx, position in engine.stop_routes[stop]:
+                    if position < queue.get(route_idx, len(engine.route_stops[route_idx])):
+                        queue[route_idx] = position
+
+            current: Dict[int, List[Tuple]] = {}
+            for route_idx, first_position in queue.items():
+                stops = engine.route_stops[route_idx]
+                fare = engine.route_fares[route_idx]
+                route_bag: List[Tuple] = []
+                for position in range(first_position, len(stops)):
+                    stop = stops[position]
+                    if stop < 0:
+                        continue
+                    # النزول في هذه المحطة (التقليم المحلي أولاً لأنه الأرخص)
+                    if route_bag:
+                        stop_best = best.get(stop)
+                        for walk, cost, boarded in route_bag:
+                            if stop_best:
+                                for other in stop_best:
+                                    if other[0] <= walk and other[1] <= cost and other[2][0] != 'walk':
+                                        break
+                                else:
+                                    other = None
+                                if other is not None:
+                                    continue
+                            label = (walk, cost, ('ride', boarded[0], route_idx, boarded[1], position))
+                            self._arrive(stop, label, ride, best, current, targets, target_bag, arrivals)
+                    # الركوب من هذه المحطة
+                    if stop in marked:
+                        for label in previous[stop]:
+                            boarding = (label[0], label[1] + fare, (label, position))
+                            if boarding[1] <= max_fare and not any(t[0] <= boarding[0] and t[1] <= boarding[1] for t in target_bag):
+                                _merge_label(route_bag, boarding)
+
+            self._relax_footpaths(set(current), current, best, targets, target_bag, arrivals, ride)
+            if not current:
+                break
+            previous = current
+            marked = set(current)
+
+        return self._collect(arrivals, max_results)
+
+    def _arrive(self, stop: int, label: Tuple, ride: int, best: Dict, current: Dict,
+                targets: Dict[int, float], target_bag: List[Tuple], arrivals: List) -> bool:
+        """تسجيل الوصول لمحطة مع التقليم المحلي وتقليم الوجهة (خيارات الوجهة تشمل المشي الأخير)"""
+        walk, cost = label[0], label[1]
+        if target_bag and any(w <= walk and c <= cost and (w, c) != (walk, cost) for w, c, _ in target_bag):
+            return False
+        if stop in targets:
+            arrived = (walk + targets[stop], cost, label[2])
+            arrivals.append((ride, arrived))
+            _merge_label(target_bag, arrived)
+        if not _merge_label(best.setdefault(stop, []), label):
+            return False
+        _merge_label(current.setdefault(stop, []), label)
+        return True
+
+    def _relax_footpaths(self, stops: set, bags: Dict, best: Dict, targets: Dict[int, float],
+                         target_bag: List[Tuple], arrivals: List, ride: int):
+        """المشي من المحطات التي تحسنت إلى المحطات المرتبطة بها"""
+        equivalents = self.engine.transfer_table.equivalents
+        for stop in stops:
+            # المحطات المكافئة في جدول التبديل = تبديل بدون مشي
+            neighbors = self.footpaths.get(stop, [])
+            if stop in equivalents:
+                neighbors = neighbors + [(other, 0.0) for other in equivalents[stop]]
+            for neighbor, minutes in neighbors:
+                for label in list(bags.get(stop, ())):
+                    if label[2][0] == 'walk':
+                        continue
+                    walked = (label[0] + minutes, label[1], ('walk', label, stop, neighbor, minutes))
+                    if ride < 0:
+                        # المشي قبل الركوب الأول يبقى ضمن نقاط البداية
+                        if _merge_label(best.setdefault(neighbor, []), walked):
+                            _merge_label(bags.setdefault(neighbor, []), walked)
+                    else:
+                        self._arrive(neighbor, walked, ride, best, bags, targets, target_bag, arrivals)
+
+    def _collect(self, arrivals: List, max_results: int) -> List[Dict]:
+        """اختيار رحلات باريتو (التبديلات، المشي، التعريفة) وإعادة بنائها"""
+        arrivals.sort(key=lambda item: (item[0], item[1][0], item[1][1]))
+        journeys = []
+        kept: List[Tuple[int, float, float]] = []
+        seen_signatures = set()
+        for ride, label in arrivals:
+            walk, cost = label[0], label[1]
+            if any(t <= ride and w <= walk and c <= cost and (t, w, c) != (ride, walk, cost)
+                   for t, w, c in kept):
+                continue
+            journey = self._build_journey(ride, label)
+            signature = tuple(leg.get('route_idx', -1) for leg in journey['legs'])
+            if signature in seen_signatures:
+                continue
+            seen_signatures.add(signature)
+            kept.append((ride, walk, cost))
+            journeys.append(journey)
+            if len(journeys) >= max_results:
+                break
+        return journeys
+
+    def _build_journey(self, ride: int, label: Tuple) -> Dict:
+        """إعادة بناء مراحل الرحلة من سلسلة الخيارات"""
+        engine = self.engine
+        legs = []
+        node = label
+        while node[2][0] != 'start':
+            info = node[2]
+            if info[0] == 'ride':
+                _, parent, route_idx, board_position, alight_position = info
+                key_points = engine.routes[route_idx].get('keyPoints', [])
+                legs.append({
+                    'type': 'ride',
+                    'route': engine.routes[route_idx],
+                    'route_idx': route_idx,
+                    'board_idx': board_position,
+                    'alight_idx': alight_position,
+                    'board_stop': key_points[board_position],
+                    'alight_stop': key_points[alight_position],
+                    'fare': engine.route_fares[route_idx]
+                })
+            else:
+                _, parent, from_stop, to_stop, minutes = info
+                if minutes:
+                    legs.append({
+                        'type': 'walk',
+                        'from_stop': engine.stop_names[from_stop],
+                        'to_stop': engine.stop_names[to_stop],
+                        'minutes': minutes
+                    })
+            node = parent
+        legs.reverse()
+        return {
+            'transfers': max(ride, 0),
+            'walking_minutes': label[0],
+            'fare': label[1],
+            'legs': legs
+        }
+
+
+# مخططات مبنية مسبقاً لكل محرك
+_planners: Dict[int, JourneyPlanner] = {}
+
+
+def get_planner(routes_data: List[Dict], connections: Optional[List[Dict]] = None,
+                walking_transfers: Optional[List[Dict]] = None) -> JourneyPlanner:
+    """إرجاع المخطط المبني لقائمة الخطوط (يُعاد بناؤه عند تمرير روابط أو تحويلات مشي جديدة)"""
+    engine = get_engine(routes_data)
+    planner = _planners.get(id(engine))
+    if planner is None or planner.engine is not engine or connections is not None or walking_transfers is not None:
+        if len(_planners) >= 8:
+            _planners.clear()
+        planner = JourneyPlanner(engine, connections, walking_transfers)
+        _planners[id(engine)] = planner
+    return planner
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+جدول إجابات جاهز لكل زوج معالم (يُبنى خارج البوت)
+كل خلية = الخطوط المباشرة بين معلمين كقناع بتات بترتيب routes_data
+البوت يقرأ الملف عبر mmap فتصبح الإجابة قراءة مباشرة بدون بحث
+
+الاستخدام:
+    python landmark_table.py                      # بناء كامل
+    python landmark_table.py --landmarks "مول الفرما" "مستشفى السلام"   # إعادة بناء جزئية
+"""
+
+import os
+import sys
+import json
+import mmap
+import struct
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Optional, Iterable, Tuple
+
+from routing_engine import TransitEngine, MATCHER_VERSION
+
+# ملف الجدول الافتراضي بجوار البوت
+TABLE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'landmark_table.bin')
+
+MAGIC = b'LMT1'
+# الترويسة: التوقيع، بصمة الخطوط، عدد المعالم، عدد الخطوط، طول أسماء المعالم
+HEADER = struct.Struct('<4s16sIII')
+
+# أنواع المطابقة المستخدمة في find_route_logic
+TABLE_MATCH_TYPES = ('exact', 'partial')
+
+
+def routes_fingerprint(routes_data: List[Dict]) -> bytes:
+    """بصمة الخطوط ومنطق المطابقة - الجدول صالح فقط لنفس الخطوط بنفس الترتيب ونفس إصدار المطابقة"""
+    payload = json.dumps({
+        'matcher': MATCHER_VERSION,
+        'routes': [[route.get('routeName'), route.get('keyPoints')] for route in routes_data]
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.blake2b(payload.encode('utf-8'), digest_size=16).digest()
+
+
+def collect_landmarks(neighborhood_data: Dict) -> List[str]:
+    """أسماء كل المعالم الفريدة في بيانات الأحياء"""
+    names = set()
+    for categories in neighborhood_data.values():
+        for landmarks in categories.values():
+            for landmark in landmarks:
+                name = landmark.get('name') if isinstance(landmark, dict) else landmark
+                if isinstance(name, str) and name.strip():
+                    names.add(name)
+    return sorted(names)
+
+
+def _row_width(route_count: int) -> int:
+    """عدد البايتات لقناع الخطوط في كل خلية"""
+    return max(1, (route_count + 7) // 8)
+
+
+def _decode_mask(cell: bytes) -> List[int]:
+    """تحويل قناع البتات إلى أرقام الخطوط بالترتيب"""
+    mask = int.from_bytes(cell, 'little')
+    route_indices = []
+    route_idx = 0
+    while mask:
+        if mask & 1:
+            route_indices.append(route_idx)
+        mask >>= 1
+        route_idx += 1
+    return route_indices
+
+
+class _PairSolver:
+    """حساب الخطوط المباشرة لكل زوج مع تخزين تغطية كل معلم مرة واحدة"""
+
+    def __init__(self, routes_data: List[Dict], landmarks: List[str]):
+        self.engine = TransitEngine(routes_data)
+        self.landmarks = landmarks
+        self.width = _row_width(len(routes_data))
+        self._coverage: Dict[int, Tuple[int, Dict[int, Tuple[int, int]]]] = {}
+
+    def coverage(self, landmark_idx: int) -> Tuple[int, Dict[int, Tuple[int, int]]]:
+        """قناع خطوط المعلم ومداه على كل خط (بنفس قواعد المطابقة في find_route_logic)"""
+        coverage = self._coverage.get(landmark_idx)
+        if coverage is None:
+            coverage = self.engine._coverage(self.landmarks[landmark_idx], TABLE_MATCH_TYPES)
+            self._coverage[landmark_idx] = coverage
+        return coverage
+
+    def cell(self, start_idx: int, end_idx: int) -> bytes:
+        """قناع الخطوط المباشرة من معلم لآخر"""
+        if start_idx == end_idx:
+            return bytes(self.width)
+        start_mask, start_spans = self.coverage(start_idx)
+        end_mask, end_spans = self.coverage(end_idx)
+        common = start_mask & end_mask
+        mask = 0
+        while common:
+            lowest = common & -common
+            route_idx = lowest.bit_length() - 1
+            if start_spans[route_idx][0] < end_spans[route_idx][1]:
+                mask |= lowest
+            common ^= lowest
+        return mask.to_bytes(self.width, 'little')
+
+    def row(self, start_idx: int) -> bytes:
+        return b''.join(self.cell(start_idx, end_idx) for end_idx in range(len(self.landmarks)))
+
+    def column(self, end_idx: int) -> bytes:
+        return b''.join(self.cell(start_idx, end_idx) for start_idx in range(len(self.landmarks)))
+
+
+# المحلل داخل كل عملية فرعية
+_worker_solver: Optional[_PairSolver] = None
+
+
+def _init_worker(routes_data: List[Dict], landmarks: List[str]):
+    global _worker_solver
+    _worker_solver = _PairSolver(routes_data, landmarks)
+
+
+def _solve_chunk(landmark_indices: List[int], with_columns: bool) -> List[Tuple[int, bytes, Optional[bytes]]]:
+    """حساب صفوف (وأعمدة عند الحاجة) مجموعة معالم"""
+    return [(idx, _worker_solver.row(idx), _worker_solver.column(idx) if with_columns else None)
+            for idx in landmark_indices]
+
+
+def build_cells(routes_data: List[Dict], landmarks: List[str], processes: Optional[int] = None,
+                touched: Optional[Iterable[int]] = None, previous: Optional[bytearray] = None) -> bytearray:
+    """
+    حساب مصفوفة الخلايا بالتوازي
+    عند تمرير touched و previous يُعاد حساب صفوف وأعمدة المعالم المتأثرة فقط
+    """
+    count = len(landmarks)
+    width = _row_width(len(routes_data))
+    row_size = count * width
+    partial = touched is not None and previous is not None
+    indices = sorted(set(touched)) if partial else list(range(count))
+    cells = previous if partial else bytearray(count * row_size)
+
+    if indices:
+        processes = processes or os.cpu_count() or 1
+        chunk_size = max(1, len(indices) // (processes * 4))
+        chunks = [indices[i:i + chunk_size] for i in range(0, len(indices), chunk_size)]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(routes_data, landmarks)) as pool:
+            for results in pool.map(_solve_chunk, chunks, [partial] * len(chunks)):
+                for idx, row, column in results:
+                    cells[idx * row_size:(idx + 1) * row_size] = row
+                    if column is not None:
+                        for start_idx in range(count):
+                            offset = start_idx * row_size + idx * width
+                            cells[offset:offset + width] = column[start_idx * width:(start_idx + 1) * width]
+    return cells
+
+
+def write_table(path: str, fingerprint: bytes, landmarks: List[str], route_count: int, cells: bytes):
+    """كتابة الجدول في ملف مؤقت ثم استبداله دفعة واحدة"""
+    names = json.dumps(landmarks, ensure_ascii=False).encode('utf-8')
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, fingerprint, len(landmarks), route_count, len(names)))
+        f.write(names)
+        f.write(cells)
+    os.replace(temp_path, path)
+
+
+class LandmarkAnswerTable:
+    """قراءة الجدول عبر mmap - البحث عن زوج = قراءة خلية واحدة"""
+
+    def __init__(self, path: str = TABLE_FILE):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.fingerprint, count, self.route_count, names_length = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"ملف جدول غير صالح: {path}")
+        names_start = HEADER.size
+        self.landmarks: List[str] = json.loads(self._mmap[names_start:names_start + names_length].decode('utf-8'))
+        self.index: Dict[str, int] = {name: idx for idx, name in enumerate(self.landmarks)}
+        self.width = _row_width(self.route_count)
+        self._cells_start = names_start + names_length
+        if len(self._mmap) != self._cells_start + count * count * self.width:
+            raise ValueError(f"حجم ملف الجدول غير متوقع: {path}")
+        # الخطوط التي تغيرت بعد بناء الجدول (تُحسب من الفهرس حتى إعادة البناء)
+        self.stale_mask = 0
+
+    def is_valid_for(self, routes_data: List[Dict]) -> bool:
+        """هل بُني الجدول لنفس الخطوط المحملة حالياً"""
+        return self.route_count == len(routes_data) and self.fingerprint == routes_fingerprint(routes_data)
+
+    def lookup(self, start_landmark: str, end_landmark: str) -> Optional[List[int]]:
+        """أرقام الخطوط المباشرة (عدا الخطوط المتغيرة) أو None إذا لم يكن أحد المعلمين في الجدول"""
+        start_idx = self.index.get(start_landmark)
+        end_idx = self.index.get(end_landmark)
+        if start_idx is None or end_idx is None:
+            return None
+        offset = self._cells_start + (start_idx * len(self.landmarks) + end_idx) * self.width
+        route_indices = _decode_mask(self._mmap[offset:offset + self.width])
+        if self.stale_mask:
+            route_indices = [route_idx for route_idx in route_indices if not self.stale_mask >> route_idx & 1]
+        return route_indices
+
+    def mark_stale(self, route_idx: int):
+        """استبعاد خط تغير من إجابات الجدول (بدون إعادة بناء الجدول كاملاً)"""
+        self.stale_mask |= 1 << route_idx
+
+    def cells(self) -> bytearray:
+        """نسخة من مصفوفة الخلايا (لإعادة البناء الجزئي)"""
+        return bytearray(self._mmap[self._cells_start:])
+
+    def close(self):
+        self._mmap.close()
+
+
+def load_landmark_table(routes_data: List[Dict], path: str = TABLE_FILE) -> Optional[LandmarkAnswerTable]:
+    """تحميل الجدول إذا كان موجوداً ومطابقاً للخطوط الحالية"""
+    try:
+        table = LandmarkAnswerTable(path)
+    except (OSError, ValueError):
+        return None
+    if not table.is_valid_for(routes_data):
+        table.close()
+        return None
+    return table
+
+
+def rebuild_table(routes_data: List[Dict], neighborhood_data: Dict, path: str = TABLE_FILE,
+                  processes: Optional[int] = None, touched_landmarks: Optional[Iterable[str]] = None) -> Dict:
+    """بناء الجدول كاملاً أو جزئياً للمعالم المتأثرة بتعديل"""
+    landmarks = collect_landmarks(neighborhood_data)
+    fingerprint = routes_fingerprint(routes_data)
+    touched = None
+    previous = None
+
+    if touched_landmarks is not None:
+        old_table = load_landmark_table(routes_data, path)
+        if old_table is not None:
+            # نسخ الخلايا القديمة للمعالم التي لم تتغير، والمعالم الجديدة تُحسب كاملة
+            touched_names = set(touched_landmarks)
+            count = len(landmarks)
+            width = _row_width(len(routes_data))
+            old_cells = old_table.cells()
+            old_count = len(old_table.landmarks)
+            old_positions = [old_table.index.get(name) for name in landmarks]
+            previous = bytearray(count * count * width)
+            for start_idx, old_start in enumerate(old_positions):
+                if old_start is None:
+                    continue
+                for end_idx, old_end in enumerate(old_positions):
+                    if old_end is not None:
+                        old_offset = (old_start * old_count + old_end) * width
+                        offset = (start_idx * count + end_idx) * width
+                        previous[offset:offset + width] = old_cells[old_offset:old_offset + width]
+            touched = [idx for idx, name in enumerate(landmarks)
+                       if name in touched_names or old_positions[idx] is None]
+            old_table.close()
+
+    cells = build_cells(routes_data, landmarks, processes, touched, previous)
+    write_table(path, fingerprint, landmarks, len(routes_data), cells)
+    return {
+        'landmarks': len(landmarks),
+        'routes': len(routes_data),
+        'recomputed': len(landmarks) if touched is None else len(touched),
+        'partial': touched is not None
+    }
+
+
+def _load_bot_data() -> Tuple[List[Dict], Dict]:
+    """تحميل نفس البيانات التي يحملها البوت"""
+    try:
+        from data_dynamic import routes_data, neighborhood_data
+        if routes_data and neighborhood_data:
+            return routes_data, neighborhood_data
+    except ImportError:
+        pass
+    from data import routes_data, neighborhood_data
+    return routes_data, neighborhood_data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="بناء جدول إجابات المعالم")
+    parser.add_argument('--output', default=TABLE_FILE)
+    parser.add_argument('--processes', type=int, default=None)
+    parser.add_argument('--landmarks', nargs='*', default=None,
+                        help="إعادة بناء جزئية لهذه المعالم فقط")
+    args = parser.parse_args()
+
+    routes_data, neighborhood_data = _load_bot_data()
+    result = rebuild_table(routes_data, neighborhood_data, args.output, args.processes, args.landmarks)
+    mode = "جزئي" if result['partial'] else "كامل"
+    print(f"✅ بناء {mode}: {result['landmarks']} معلم، {result['routes']} خط، "
+          f"أُعيد حساب {result['recomputed']} معلم ← {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+تحليل اتصال الشبكة بمصفوفات منطقية
+الركوب المباشر D = B · U · Bᵀ حيث B مصفوفة (المحطة × موضعها في الخط) و U مثلثية عليا لكل خط
+T مصفوفة التبديل (نفس المحطة، المحطات المتكافئة، روابط المشي)
+بدون تبديل R0 = T · D · T (مشي اختياري قبل الركوب وبعده) ثم R(k+1) = Rk + Rk · D · T
+"""
+
+from typing import List, Dict, Tuple, Iterable
+
+import numpy as np
+
+from journey_planner import JourneyPlanner, MAX_TRANSFERS
+
+# نسبة الاتصال التي يُعتبر الحي أقل منها ضعيف الاتصال
+POOR_CONNECTIVITY_THRESHOLD = 0.5
+
+
+def _product(left: np.ndarray, right: np.ndarray) -> np.ndarray:
+    """ضرب منطقي عبر float32 (أسرع من ضرب المصفوفات المنطقية مباشرة)"""
+    return (left.astype(np.float32) @ right.astype(np.float32)) > 0
+
+
+class ReachabilityAnalysis:
+    """مصفوفات الوصول بين المحطات حتى max_transfers تبديل"""
+
+    def __init__(self, planner: JourneyPlanner, max_transfers: int = MAX_TRANSFERS):
+        engine = planner.engine
+        self.engine = engine
+        stop_count = len(engine.stop_names)
+
+        # B: المحطة × (الخط، الموضع) و U: من موضع لموضع لاحق على نفس الخط
+        positions = [(route_idx, stop_id) for route_idx, stops in enumerate(engine.route_stops)
+                     for stop_id in stops if stop_id >= 0]
+        incidence = np.zeros((stop_count, len(positions)), dtype=bool)
+        later = np.zeros((len(positions), len(positions)), dtype=bool)
+        offset = 0
+        for route_idx, stops in enumerate(engine.route_stops):
+            valid = [stop_id for stop_id in stops if stop_id >= 0]
+            count = len(valid)
+            incidence[valid, np.arange(offset, offset + count)] = True
+            later[offset:offset + count, offset:offset + count] = np.triu(np.ones((count, count), dtype=bool), k=1)
+            offset += count
+
+        # T: البقاء في نفس المحطة أو الانتقال لمحطة مكافئة أو مرتبطة بالمشي
+        transfer = np.eye(stop_count, dtype=bool)
+        for stop_id, others in engine.transfer_table.equivalents.items():
+            transfer[stop_id, others] = True
+        for stop_id, paths in planner.footpaths.items():
+            transfer[stop_id, [neighbor for neighbor, _ in paths]] = True
+
+        direct = _product(_product(incidence, later), incidence.T)
+        ride_then_walk = _product(direct, transfer)
+        self.transfer = transfer
+        # reach[k] = يمكن الوصول بـ k تبديل أو أقل
+        self.reach: List[np.ndarray] = [_product(transfer, ride_then_walk)]
+        for _ in range(max_transfers):
+            previous = self.reach[-1]
+            self.reach.append(previous | _product(previous, ride_then_walk))
+
+    @property
+    def max_transfers(self) -> int:
+        return len(self.reach) - 1
+
+    def landmark_matrix(self, landmarks: List[str], transfers: int) -> np.ndarray:
+        """مصفوفة الوصول بين المعالم: M · R · Mᵀ حيث M تربط المعلم بمحطاته"""
+        membership = np.zeros((len(landmarks), len(self.engine.stop_names)), dtype=bool)
+        for landmark_idx, name in enumerate(landmarks):
+            stops = self.engine.resolve_best_stops(name)
+            if stops:
+                membership[landmark_idx, stops] = True
+        reach = self.reach[min(transfers, self.max_transfers)]
+        matrix = _product(_product(membership, reach), membership.T)
+        np.fill_diagonal(matrix, False)
+        return matrix
+
+    def neighborhood_heatmap(self, locations: Iterable[Tuple[str, str]], transfers: int = 1) -> Dict:
+        """
+        نسبة أزواج المعالم التي يمكن الوصول بينها لكل (حي البداية، حي الوجهة)
+        locations: [(اسم المعلم، الحي)]
+        """
+        locations = list(locations)
+        names = [name for name, _ in locations]
+        neighborhoods = sorted({neighborhood for _, neighborhood in locations})
+        group = np.array([neighborhoods.index(neighborhood) for _, neighborhood in locations], dtype=np.int64)
+        matrix = self.landmark_matrix(names, transfers)
+
+        # مصفوفة الانتماء (المعلم × الحي) لجمع الأزواج حسب الأحياء
+        membership = np.zeros((len(locations), len(neighborhoods)), dtype=np.float32)
+        membership[np.arange(len(locations)), group] = 1
+        reachable = membership.T @ matrix.astype(np.float32) @ membership
+        sizes = membership.sum(axis=0)
+        pairs = np.outer(sizes, sizes) - np.diag(sizes)
+        fractions = np.divide(reachable, pairs, out=np.zeros_like(reachable), where=pairs > 0)
+
+        return {
+            'neighborhoods': neighborhoods,
+            'matrix': fractions.round(3).tolist(),
+            'landmarks_per_neighborhood': sizes.astype(int).tolist(),
+            'transfers': min(transfers, self.max_transfers),
+            'landmark_reach': matrix
+        }
+
+    def badly_connected_report(self, locations: Iterable[Tuple[str, str]], transfers: int = 1,
+                               threshold: float = POOR_CONNECTIVITY_THRESHOLD) -> List[Dict]:
+        """الأحياء مرتبة من الأضعف اتصالاً (نسبة الوصول منها وإليها لبقية المعالم)"""
+        locations = list(locations)
+        heatmap = self.neighborhood_heatmap(locations, transfers)
+        matrix = heatmap['landmark_reach']
+        total = max(1, len(locations) - 1)
+        outbound = matrix.sum(axis=1) / total
+        inbound = matrix.sum(axis=0) / total
+
+        report = []
+        for neighborhood in heatmap['neighborhoods']:
+            members = [i for i, (_, n) in enumerate(locations) if n == neighborhood]
+            unserved = [locations[i][0] for i in members if not self.engine.resolve_best_stops(locations[i][0])]
+            score_out = float(outbound[members].mean())
+            score_in = float(inbound[members].mean())
+            report.append({
+                'neighborhood': neighborhood,
+                'landmarks': len(members),
+                'outbound': round(score_out, 3),
+                'inbound': round(score_in, 3),
+                'unserved_landmarks': unserved,
+                'poor': min(score_out, score_in) < threshold
+            })
+        report.sort(key=lambda item: min(item['outbound'], item['inbound']))
+        return report
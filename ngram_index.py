@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس مقلوب على الحروف الثلاثية (trigrams) لأسماء المعالم
+البحث التقريبي يرشح بضع عشرات من الأسماء التي تشارك السؤال أكبر عدد من الحروف الثلاثية
+ثم يُحسب SequenceMatcher على المرشحين فقط بدلاً من كل المعالم
+"""
+
+import heapq
+from collections import Counter
+from itertools import chain
+from typing import List, Dict, Iterable
+
+# طول المقطع الحرفي
+NGRAM_SIZE = 3
+
+# عدد المرشحين لكل نص بحث
+DEFAULT_SHORTLIST_SIZE = 40
+
+
+def char_ngrams(text: str, size: int = NGRAM_SIZE) -> List[str]:
+    """المقاطع الحرفية للنص مع مسافة في أوله وآخره (حتى تكون للكلمات القصيرة مقاطع)"""
+    padded = f" {text} "
+    return [padded[i:i + size] for i in range(max(1, len(padded) - size + 1))]
+
+
+class NGramIndex:
+    """المقطع الحرفي ← أرقام الأسماء التي تحتويه"""
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.postings: Dict[str, List[int]] = {}
+        self._gram_counts: List[int] = []
+        for name in names:
+            self.add(name)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def add(self, name: str) -> int:
+        """فهرسة اسم جديد (الأسماء المكررة تُفهرس مرة واحدة لكل إضافة)"""
+        name_idx = len(self.names)
+        grams = set(char_ngrams(name))
+        for gram in grams:
+            self.postings.setdefault(gram, []).append(name_idx)
+        self.names.append(name)
+        self._gram_counts.append(len(grams))
+        return name_idx
+
+    def _ranked(self, text: str, limit: int) -> List[int]:
+        """أرقام الأسماء الأقرب للنص بمعامل Dice على المقاطع (مثل نسبة SequenceMatcher)"""
+        grams = set(char_ngrams(text))
+        # عدد المقاطع المشتركة مع كل اسم
+        shared = Counter(chain.from_iterable(self.postings.get(gram, ()) for gram in grams))
+        if len(shared) <= limit:
+            return list(shared)
+        total = len(grams)
+        return heapq.nlargest(limit, shared, key=lambda idx: shared[idx] / (total + self._gram_counts[idx]))
+
+    def shortlist(self, *texts: str, limit: int = DEFAULT_SHORTLIST_SIZE) -> List[str]:
+        """
+        المرشحون لكل نص مجمعين بترتيب الإضافة (نفس ترتيب المرور على كل المعالم عند تساوي الدرجات)
+        الأسماء بدون أي مقطع مشترك مع النصوص لا تُرشح
+        """
+        candidates = set()
+        for text in texts:
+            candidates.update(self._ranked(text, limit))
+        return [self.names[name_idx] for name_idx in sorted(candidates)]
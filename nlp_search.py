@@ -7,6 +7,12 @@ import re
 from typing import List, Dict, Tuple, Optional
 from difflib import SequenceMatcher
 
+from ngram_index import NGramIndex
+from entity_extractor import LocationExtractor
+from arabic_text import normalize_arabic
+from spelling import SpellingCorrector
+from tfidf_ranker import TfidfRanker, DEFAULT_TOP_K
+
 # استيراد مساعد قاعدة البيانات
 try:
     from database_helper import (
@@ -18,15 +24,40 @@ try:
 except ImportError:
     DATABASE_AVAILABLE = False
 
+# "بأقل من 10 جنيه" أو "حد أقصى ٨ جنيه" (\d تشمل الأرقام العربية)
+_MAX_FARE = re.compile(r'\s*(?:ب|و)?(?:أقل من|اقل من|حد أقصى|حد اقصى|في حدود)\s*(\d+(?:\.\d+)?)\s*(?:جنيه|ج)\b')
+_CHEAPEST = re.compile(r'أرخص|ارخص')
+
+
+def fare_preferences(query_text: str) -> Tuple[str, Optional[float], bool]:
+    """(نص السؤال بدون شرط التعريفة، أقصى تعريفة، ترتيب من الأرخص)"""
+    match = _MAX_FARE.search(query_text)
+    max_fare = float(match.group(1)) if match else None
+    return _MAX_FARE.sub('', query_text), max_fare, bool(_CHEAPEST.search(query_text))
+
+
 class NLPSearchSystem:
     def __init__(self, neighborhood_data: Dict):
         self.neighborhood_data = neighborhood_data
         self.landmarks_index = self._build_landmarks_index()
+        # المرشحون للبحث التقريبي (بدلاً من المرور على كل المعالم)
+        self.ngram_index = NGramIndex(self.landmarks_index)
+        # مصفوفة TF-IDF لترتيب أقرب المعالم (تُبنى عند أول استخدام وبعد تغير المعالم)
+        self._ranker: Optional[TfidfRanker] = None
         
         # كلمات ربط عربية شائعة
         self.from_keywords = ['من', 'من عند', 'بدءاً من', 'انطلاقاً من', 'ابتداءً من']
         self.to_keywords = ['إلى', 'الى', 'لـ', 'ل', 'حتى', 'وصولاً إلى', 'باتجاه']
         self.question_keywords = ['إزاي', 'ازاي', 'كيف', 'طريقة', 'أروح', 'اروح', 'أوصل', 'اوصل']
+        # أفعال الذهاب تعامل ككلمات ربط للوجهة ("إزاي أروح X")
+        self.go_keywords = ['أروح', 'اروح', 'أوصل', 'اوصل']
+        # آلة واحدة لكل المعالم وكلمات الربط
+        self.location_extractor = LocationExtractor(
+            [(name, info['data'].get('name', name)) for name, info in self.landmarks_index.items()],
+            self.from_keywords, self.to_keywords + self.go_keywords)
+        # قاموس التصحيح الإملائي على كلمات المعالم (وكلمات الربط حتى لا تُصحح إلى أسماء أماكن)
+        self.spelling = SpellingCorrector(list(self.landmarks_index) + self.from_keywords + self.to_keywords
+                                          + self.question_keywords)
     
     def _build_landmarks_index(self) -> Dict[str, Dict]:
         """بناء فهرس لجميع المعالم للبحث السريع"""
@@ -35,14 +66,14 @@ class NLPSearchSystem:
             for category, landmarks in categories.items():
                 for landmark in landmarks:
                     if isinstance(landmark, dict):
-                        name = landmark.get('name', '').lower()
+                        name = normalize_arabic(landmark.get('name', ''))
                         index[name] = {
                             'neighborhood': neighborhood,
                             'category': category,
                             'data': landmark
                         }
                     elif isinstance(landmark, str):
-                        name = landmark.lower()
+                        name = normalize_arabic(landmark)
                         index[name] = {
                             'neighborhood': neighborhood,
                             'category': category,
@@ -50,22 +81,62 @@ class NLPSearchSystem:
                         }
         return index
     
+    def add_landmark(self, name: str, neighborhood: str, category: str):
+        """إضافة مكان جديد لكل فهارس البحث بدون إعادة بنائها"""
+        key = normalize_arabic(name)
+        if not key or key in self.landmarks_index:
+            return
+        self.landmarks_index[key] = {
+            'neighborhood': neighborhood,
+            'category': category,
+            'data': {'name': name, 'served_by': {}}
+        }
+        self.ngram_index.add(key)
+        self.location_extractor.add_place(key, name)
+        self.spelling.add_texts([key])
+        self._ranker = None
+    
+    def get_ranker(self) -> TfidfRanker:
+        """مصفوفة TF-IDF على المعالم الحالية"""
+        if self._ranker is None:
+            self._ranker = TfidfRanker(self.landmarks_index)
+        return self._ranker
+    
+    def find_top_matches(self, query: str, limit: int = DEFAULT_TOP_K) -> List[Dict]:
+        """أقرب المعالم للنص مرتبة (لاقتراحات "هل تقصد")"""
+        matches = []
+        for name, score in self.get_ranker().top_k(query, limit):
+            landmark_info = self.landmarks_index[name]
+            matches.append({'name': landmark_info['data'].get('name', name), 'score': score, 'info': landmark_info})
+        return matches
+    
     def similarity_score(self, text1: str, text2: str) -> float:
         """حساب درجة التشابه بين نصين"""
-        return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
+        return SequenceMatcher(None, normalize_arabic(text1), normalize_arabic(text2)).ratio()
     
     def find_best_match(self, query: str, min_score: float = 0.6) -> Optional[Dict]:
         """البحث عن أفضل تطابق لمعلم معين"""
-        query = query.lower().strip()
+        query = normalize_arabic(query)
+        # الاسم المكتوب بأي صيغة إملائية للمعلم نفسه
+        landmark_info = self.landmarks_index.get(query)
+        if landmark_info:
+            return {'name': landmark_info['data'].get('name', query), 'score': 1.0, 'info': landmark_info}
+        # نفس البحث بعد تصحيح كل كلمة من قاموس المفردات
+        corrected = self.spelling.correct(query)
+        landmark_info = self.landmarks_index.get(corrected)
+        if landmark_info:
+            return {'name': landmark_info['data'].get('name', corrected), 'score': self.similarity_score(query, corrected),
+                    'info': landmark_info}
         best_match = None
         best_score = min_score
         
-        for landmark_name, landmark_info in self.landmarks_index.items():
+        for landmark_name in self.ngram_index.shortlist(query):
+            landmark_info = self.landmarks_index[landmark_name]
             score = self.similarity_score(query, landmark_name)
             if score > best_score:
                 best_score = score
                 best_match = {
-                    'name': landmark_name,
+                    'name': landmark_info['data'].get('name', landmark_name),
                     'score': score,
                     'info': landmark_info
                 }
@@ -76,6 +147,15 @@ class NLPSearchSystem:
         """استخراج نقطتي البداية والوجهة من النص"""
         text = text.replace('؟', '').replace('?', '').strip()
         
+        # المعالم المعروفة في النص مباشرة (بدون مطابقة تقريبية)
+        start_location, end_location = self.location_extractor.extract(text)
+        if start_location and end_location:
+            return start_location, end_location
+        if start_location or end_location:
+            # الطرف الآخر من كلمات الربط (للمطابقة التقريبية)
+            start_fragment, end_fragment = self.location_extractor.fragments(text)
+            return start_location or start_fragment, end_location or end_fragment
+        
         # البحث عن أنماط "من X إلى Y"
         from_to_pattern = r'(?:من|من عند)\s+(.+?)\s+(?:إلى|الى|لـ|ل|حتى)\s+(.+?)(?:\s|$)'
         match = re.search(from_to_pattern, text)
@@ -155,17 +235,12 @@ class NLPSearchSystem:
 
     def get_suggestions_for_text(self, text: str, limit: int = 5) -> List[str]:
         """الحصول على اقتراحات للنص المدخل"""
-        text = text.lower().strip()
         suggestions = []
         
-        for landmark_name, landmark_info in self.landmarks_index.items():
-            if text in landmark_name:
-                suggestion = f"{landmark_info['data'].get('name', landmark_name)} - {landmark_info['neighborhood']}"
-                if suggestion not in suggestions:
-                    suggestions.append(suggestion)
-            
-            if len(suggestions) >= limit:
-                break
+        for match in self.find_top_matches(text, limit):
+            suggestion = f"{match['name']} - {match['info']['neighborhood']}"
+            if suggestion not in suggestions:
+                suggestions.append(suggestion)
         
         return suggestions
 
@@ -206,7 +281,7 @@ class NLPSearchSystem:
     
     def find_residential_area(self, area_name: str) -> str:
         """البحث عن المنطقة السكنية الأقرب"""
-        area_name = area_name.lower().strip()
+        area_name = normalize_arabic(area_name)
         
         # قائمة المناطق السكنية الشائعة
         residential_areas = [
@@ -218,12 +293,12 @@ class NLPSearchSystem:
         
         # البحث المباشر
         for area in residential_areas:
-            if area_name == area.lower():
+            if area_name == normalize_arabic(area):
                 return area
         
         # البحث الجزئي
         for area in residential_areas:
-            if area_name in area.lower() or area.lower() in area_name:
+            if area_name in normalize_arabic(area) or normalize_arabic(area) in area_name:
                 return area
         
         # البحث بالتشابه
@@ -231,7 +306,7 @@ class NLPSearchSystem:
         best_ratio = 0.6
         
         for area in residential_areas:
-            ratio = SequenceMatcher(None, area_name, area.lower()).ratio()
+            ratio = SequenceMatcher(None, area_name, normalize_arabic(area)).ratio()
             if ratio > best_ratio:
                 best_ratio = ratio
                 best_match = area
@@ -244,6 +319,9 @@ class NLPSearchSystem:
             return self.search(query_text)
         
         try:
+            # شرط التعريفة يُفصل قبل استخراج المواقع حتى لا يُعتبر جزءاً من اسم الوجهة
+            query_text, max_fare, cheapest = fare_preferences(query_text)
+            
             # استخراج المواقع من النص
             start_location, end_location = self.extract_locations_from_text(query_text)
             
@@ -254,7 +332,8 @@ class NLPSearchSystem:
                 }
             
             # البحث في قاعدة البيانات
-            route_result = find_best_route_with_transfers(start_location, end_location)
+            route_result = find_best_route_with_transfers(start_location, end_location,
+                                                          max_fare=max_fare, cheapest_first=cheapest or max_fare is not None)
             
             if route_result['status'] == 'direct_route_found':
                 return self._format_direct_route_result(route_result['routes'])
@@ -323,36 +402,33 @@ class NLPSearchSystem:
         message = "🔄 **تم العثور على مسارات بالتحويل:**\n\n"
         
         for i, route_info in enumerate(routes, 1):
-            start_route = route_info['start_route']
-            end_route = route_info['end_route']
-            connection = route_info['connection']
+            journey = route_info['journey']
             start_loc = route_info['start_location']
             end_loc = route_info['end_location']
             
-            message += f"{i}. **المسار بالتحويل:**\n"
-            message += f"   🚌 الخط الأول: {start_route['name']}\n"
-            message += f"   🚏 اركب من: {start_loc['name']}"
-            
-            if start_loc['location_type'] == 'nearby':
-                distance = start_loc['walking_distance']
-                walking_time = max(1, round(distance / 80))
-                message += f" (🚶 {distance}م ~ {walking_time}د)"
-            
-            message += f"\n   🔄 انزل عند: {connection['connection_point']}\n"
-            message += f"   🚶 امش {connection['walking_time']} دقائق للوصول للخط التالي\n"
-            
-            if connection.get('connection_notes'):
-                message += f"   📝 ملاحظة التحويل: {connection['connection_notes']}\n"
-            
-            message += f"   🚌 الخط الثاني: {end_route['name']}\n"
-            message += f"   🛑 انزل عند: {end_loc['name']}"
+            message += f"{i}. **المسار بالتحويل ({journey['transfers']} تبديل):**\n"
+            ride_number = 0
+            for leg in journey['legs']:
+                if leg['type'] == 'walk':
+                    message += f"   🚶 امش {leg['minutes']:g} دقائق من {leg['from_stop']} إلى {leg['to_stop']}\n"
+                    continue
+                
+                ride_number += 1
+                message += f"   🚌 الخط {ride_number}: {leg['route'].get('routeName')}\n"
+                message += f"   🚏 اركب من: {leg['board_stop']}"
+                if ride_number == 1 and start_loc['location_type'] == 'nearby':
+                    distance = start_loc['walking_distance']
+                    walking_time = max(1, round(distance / 80))
+                    message += f" (🚶 {distance}م ~ {walking_time}د)"
+                message += f"\n   🔄 انزل عند: {leg['alight_stop']}\n"
             
             if end_loc['location_type'] == 'nearby':
-                message += f" (مشي {end_loc['walking_distance']}م)"
+                message += f"   🛑 وجهتك {end_loc['name']} على بعد (مشي {end_loc['walking_distance']}م)\n"
             
-            total_fare = (start_route.get('fare', 0) or 0) + (end_route.get('fare', 0) or 0)
-            message += f"\n   💰 إجمالي التعريفة: {total_fare} جنيه\n"
-            message += f"   ⏱️ وقت التحويل: {connection['walking_time']} دقيقة\n\n"
+            message += f"   💰 إجمالي التعريفة: {journey['fare']:g} جنيه\n"
+            if journey['walking_minutes']:
+                message += f"   ⏱️ وقت التحويل: {journey['walking_minutes']:g} دقيقة\n"
+            message += "\n"
         
         message += "⚠️ **تنبيه:** تأكد من مواعيد المواصلات وخطط لوقت إضافي للتحويل."
         
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس القرب لبيانات served_by
+يُبنى مرة واحدة عند التحميل ويربط:
+  اسم المعلم ← بياناته (served_by، الحي، التصنيف)
+  اسم الخط الأساسي ← الخطوط الفعلية (الاتجاهات) التي تحتوي الاسم
+  (الخط، أقرب محطة) ← مواضع المحطة في الخط
+"""
+
+import logging
+from typing import List, Dict, Tuple, Optional, Set
+
+from stop_table import StopTable
+from arabic_text import normalize_arabic
+
+logger = logging.getLogger(__name__)
+
+# درجات القرب المقبولة للركوب والنزول
+ACCEPTABLE_PROXIMITY = ("قريبة جدا", "متوسطة")
+
+# تتبع تفصيلي (DEBUG) لسؤال واحد من كل هذا العدد بدلاً من كل سؤال
+DEBUG_SAMPLE_EVERY = 20
+
+
+class ProximityIndex:
+    """فهرس المعالم والخطوط ومواضع المحطات لبحث القرب"""
+
+    def __init__(self, routes_data: List[Dict], neighborhood_data: Dict):
+        self.routes_source = routes_data
+        self.neighborhoods_source = neighborhood_data
+        self.routes = [route for route in routes_data if isinstance(route, dict)]
+        # اسم المعلم الموحد ← نسخة من بياناته مع الحي والتصنيف
+        self.landmarks: Dict[str, Dict] = {}
+        # اسم الخط الأساسي ← أرقام الخطوط التي تحتويه
+        self._variants: Dict[str, List[int]] = {}
+        # (رقم الخط، المحطة الموحدة) ← المواضع
+        self._positions: Dict[Tuple[int, str], List[int]] = {}
+        # جدول المحطات الموحد وأرقام المحطات لكل خط (أو None إذا كانت النقاط غير صالحة)
+        self.stops = StopTable()
+        self._route_points: List[Optional[List[int]]] = []
+        # اسم المحطة في served_by ← أرقام المحطات التي تحتويه
+        self._matching_stops: Dict[str, Set[int]] = {}
+        self._queries = 0
+
+        for route in self.routes:
+            key_points = route.get("keyPoints")
+            if not key_points or not isinstance(key_points, list):
+                self._route_points.append(None)
+            else:
+                self._route_points.append([self.stops.intern(point) if isinstance(point, str) else -1
+                                           for point in key_points])
+        self._index_landmarks(neighborhood_data)
+
+        # تجهيز الاتجاهات والمواضع لكل ما تشير إليه بيانات served_by
+        for landmark in self.landmarks.values():
+            served_by = landmark.get("served_by")
+            if not isinstance(served_by, dict):
+                continue
+            for base_name, info in served_by.items():
+                if not isinstance(info, dict):
+                    continue
+                nearest_stop = info.get("nearest_stop")
+                for route_idx in self.variants(base_name):
+                    if isinstance(nearest_stop, str) and nearest_stop:
+                        self.stop_positions(route_idx, nearest_stop)
+
+    def _index_landmarks(self, neighborhood_data: Dict):
+        """فهرسة المعالم بنفس قواعد get_landmark_data_from_name (أول تطابق هو المعتمد)"""
+        for neighborhood, categories in neighborhood_data.items():
+            if not isinstance(categories, dict):
+                continue
+            for category, landmarks in categories.items():
+                if not isinstance(landmarks, list) or not landmarks:
+                    continue
+                if isinstance(landmarks[0], dict):
+                    for landmark_dict in landmarks:
+                        name = landmark_dict.get("name")
+                        if isinstance(name, str) and name.strip():
+                            data = landmark_dict.copy()
+                            data['neighborhood'] = neighborhood
+                            data['category'] = category
+                            self.landmarks.setdefault(normalize_arabic(name), data)
+                elif isinstance(landmarks[0], str):
+                    for name in landmarks:
+                        if isinstance(name, str) and name.strip():
+                            self.landmarks.setdefault(normalize_arabic(name), {
+                                "name": name, "served_by": {},
+                                "neighborhood": neighborhood, "category": category
+                            })
+
+    def get_landmark(self, landmark_name: str) -> Optional[Dict]:
+        """بيانات المعلم بالاسم (بدون مسح شجرة الأحياء)"""
+        if not isinstance(landmark_name, str):
+            return None
+        return self.landmarks.get(normalize_arabic(landmark_name))
+
+    def variants(self, base_name: str) -> List[int]:
+        """الخطوط الفعلية التي يحتوي اسمها اسم الخط الأساسي"""
+        variants = self._variants.get(base_name)
+        if variants is None:
+            variants = [route_idx for route_idx, route in enumerate(self.routes)
+                        if isinstance(route.get("routeName"), str) and base_name in route.get("routeName")]
+            self._variants[base_name] = variants
+        return variants
+
+    def stop_positions(self, route_idx: int, stop_name: str) -> List[int]:
+        """مواضع النقاط في الخط التي يحتوي اسمها الموحد اسم المحطة (مقارنة بالأرقام)"""
+        key = (route_idx, stop_name)
+        positions = self._positions.get(key)
+        if positions is None:
+            matching = self._matching_stops.get(stop_name)
+            if matching is None:
+                matching = self.stops.containing(stop_name)
+                self._matching_stops[stop_name] = matching
+            points = self._route_points[route_idx] or []
+            positions = [i for i, stop_id in enumerate(points) if stop_id in matching]
+            self._positions[key] = positions
+        return positions
+
+    def should_trace(self) -> bool:
+        """هل يُسجَّل هذا السؤال بالتفصيل (عينة من الأسئلة فقط)"""
+        self._queries += 1
+        return self._queries % DEBUG_SAMPLE_EVERY == 1 and logger.isEnabledFor(logging.DEBUG)
+
+    def find_direct_options(self, start_name: str, end_name: str, start_data: Dict, end_data: Dict) -> List[Dict]:
+        """الخطوط المباشرة التي تخدم المعلمين بدرجة قرب مقبولة وبالترتيب الصحيح"""
+        trace = self.should_trace()
+        start_served_by = start_data.get("served_by", {}) if isinstance(start_data, dict) else {}
+        end_served_by = end_data.get("served_by", {}) if isinstance(end_data, dict) else {}
+        if not isinstance(start_served_by, dict) or not isinstance(end_served_by, dict):
+            return []
+        if trace:
+            logger.debug(f"[sampled] '{start_name}' served_by={start_served_by} | '{end_name}' served_by={end_served_by}")
+
+        options = []
+        for base_name, start_info in start_served_by.items():
+            end_info = end_served_by.get(base_name)
+            if not isinstance(start_info, dict) or not isinstance(end_info, dict):
+                continue
+            start_prox = start_info.get("proximity")
+            end_prox = end_info.get("proximity")
+            if start_prox not in ACCEPTABLE_PROXIMITY or end_prox not in ACCEPTABLE_PROXIMITY:
+                if trace:
+                    logger.debug(f"[sampled] '{base_name}': proximity not acceptable ({start_prox}, {end_prox})")
+                continue
+
+            start_stop = start_info.get("nearest_stop")
+            end_stop = end_info.get("nearest_stop")
+            if not start_stop or not end_stop:
+                logger.warning(f"Missing nearest_stop data for route '{base_name}'.")
+                continue
+
+            variants = self.variants(base_name)
+            if not variants:
+                logger.warning(f"No route definitions found in routes_data for base name '{base_name}'.")
+                continue
+
+            found = False
+            for route_idx in variants:
+                if self._route_points[route_idx] is None:
+                    continue
+                start_positions = self.stop_positions(route_idx, start_stop)
+                end_positions = self.stop_positions(route_idx, end_stop)
+                # يكفي أن يكون أول موضع للركوب قبل آخر موضع للنزول
+                if start_positions and end_positions and start_positions[0] < end_positions[-1]:
+                    route = self.routes[route_idx]
+                    options.append({
+                        "routeName": route.get("routeName"),
+                        "start_landmark_name": start_name,
+                        "end_landmark_name": end_name,
+                        "start_proximity": start_prox,
+                        "end_proximity": end_prox,
+                        "start_nearest_stop": start_stop,
+                        "end_nearest_stop": end_stop,
+                        "fare": route.get('fare', 'غير محددة'),
+                        "notes": route.get('notes', '')
+                    })
+                    found = True
+                elif trace:
+                    logger.debug(f"[sampled] '{self.routes[route_idx].get('routeName')}': "
+                                 f"start {start_positions} / end {end_positions}")
+            if not found:
+                logger.warning(f"Base route '{base_name}' had acceptable proximity, but NO variant had correct stop sequence.")
+
+        if trace:
+            logger.debug(f"[sampled] {len(options)} direct options for '{start_name}' -> '{end_name}'")
+        return options
+
+
+# فهارس مبنية مسبقاً لكل مجموعة بيانات
+_indexes: Dict[Tuple[int, int], ProximityIndex] = {}
+
+
+def get_proximity_index(routes_data: List[Dict], neighborhood_data: Dict) -> ProximityIndex:
+    """إرجاع فهرس القرب المبني للبيانات أو بناؤه مرة واحدة"""
+    key = (id(routes_data), id(neighborhood_data))
+    index = _indexes.get(key)
+    if index is None or index.routes_source is not routes_data or index.neighborhoods_source is not neighborhood_data:
+        if len(_indexes) >= 8:
+            _indexes.clear()
+        index = ProximityIndex(routes_data, neighborhood_data)
+        _indexes[key] = index
+    return index
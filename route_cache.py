@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+ذاكرة مؤقتة لإجابات المسارات
+المفتاح = (قائمة الخطوط، البداية الموحدة، الوجهة الموحدة، إصدار البيانات)
+أي تعديل من لوحة التحكم يرفع الإصدار فتصبح الإجابات القديمة غير صالحة تلقائياً
+الإصدار يلغي الإجابات المحفوظة فقط ولا يعيد تحميل الخطوط: البوت يحسب الإجابة الجديدة من بياناته
+في الذاكرة، وهذه لا تتغير أثناء التشغيل إلا بسجل التعديلات (route_deltas) أو بإعادة التشغيل
+"""
+
+import os
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Optional, Tuple, Any, Callable
+
+# ملف إصدار البيانات المشترك بين لوحة التحكم والبوت
+DATA_VERSION_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data_version.json')
+
+# آخر إصدار مقروء مع توقيت تعديل الملف (لتجنب قراءة الملف مع كل سؤال)
+_version_state = {'mtime': None, 'version': 0}
+
+
+def normalize_landmark(name: str) -> str:
+    """توحيد اسم المكان لاستخدامه في مفتاح الذاكرة"""
+    return ' '.join(str(name).lower().split())
+
+
+def read_data_version() -> int:
+    """قراءة إصدار البيانات الحالي (يُعاد قراءة الملف فقط عند تغيّره)"""
+    try:
+        mtime = os.stat(DATA_VERSION_FILE).st_mtime_ns
+    except OSError:
+        return 0
+    if mtime != _version_state['mtime']:
+        try:
+            with open(DATA_VERSION_FILE, 'r', encoding='utf-8') as f:
+                _version_state['version'] = int(json.load(f).get('version', 0))
+        except (OSError, ValueError, AttributeError):
+            return _version_state['version']
+        _version_state['mtime'] = mtime
+    return _version_state['version']
+
+
+def bump_data_version(reason: str = '') -> int:
+    """رفع إصدار البيانات بعد أي تعديل (إضافة/تعديل/حذف) - يلغي الإجابات المحفوظة ولا يعيد تحميل البيانات"""
+    version = read_data_version() + 1
+    with open(DATA_VERSION_FILE, 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': version,
+            'updated_at': datetime.now().isoformat(),
+            'reason': reason
+        }, f, ensure_ascii=False, indent=2)
+    return version
+
+
+class RouteAnswerCache:
+    """ذاكرة LRU محدودة الحجم مع مدة صلاحية لكل إجابة"""
+
+    def __init__(self, maxsize: int = 512, ttl_seconds: float = 6 * 3600):
+        self.maxsize = maxsize
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Tuple, Tuple[float, Dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def make_key(self, start_landmark: str, end_landmark: str, namespace: str = '', routes: Any = None) -> Tuple:
+        """
+        مفتاح الإجابة: قائمة الخطوط + الزوج الموحد + إصدار البيانات
+        القائمة تُميَّز بهويتها (id) حتى لا تُرجع إجابة محسوبة على قائمة خطوط أخرى
+        """
+        scope = id(routes) if routes is not None else None
+        return (namespace, scope, normalize_landmark(start_landmark), normalize_landmark(end_landmark), read_data_version())
+
+    def get(self, start_landmark: str, end_landmark: str, namespace: str = '', routes: Any = None) -> Optional[Dict]:
+        """إرجاع الإجابة المحفوظة {'result', 'text'} أو None"""
+        key = self.make_key(start_landmark, end_landmark, namespace, routes)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, start_landmark: str, end_landmark: str, result: Any, text: str, namespace: str = '',
+            routes: Any = None):
+        """حفظ النتيجة المنظمة والنص المنسق معاً"""
+        key = self.make_key(start_landmark, end_landmark, namespace, routes)
+        self._entries[key] = (time.monotonic(), {'result': result, 'text': text})
+        self._entries.move_to_end(key)
+        # حذف الإجابات التابعة لإصدارات قديمة أولاً ثم الأقدم استخداماً
+        if len(self._entries) > self.maxsize:
+            version = key[-1]
+            for stale in [k for k in self._entries if k[-1] != version]:
+                del self._entries[stale]
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, predicate: Callable[[str, str, Any], bool], namespace: str = '') -> int:
+        """
+        حذف إجابات الإصدار الحالي التي يتأثر بها تعديل جزئي فقط
+        predicate(البداية الموحدة، الوجهة الموحدة، النتيجة) ← True للإجابة التي يجب حذفها
+        """
+        version = read_data_version()
+        stale = [key for key, (_, entry) in self._entries.items()
+                 if key[0] == namespace and key[-1] == version and predicate(key[2], key[3], entry['result'])]
+        for key in stale:
+            del self._entries[key]
+        return len(stale)
+
+    def clear(self):
+        """مسح كل الإجابات المحفوظة"""
+        self._entries.clear()
+
+    def stats(self) -> Dict:
+        """إحصائيات الذاكرة لعرضها في لوحة الإدارة"""
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / total * 100) if total else 0.0,
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'data_version': read_data_version()
+        }
+
+
+# الذاكرة المشتركة داخل عملية البوت
+route_answer_cache = RouteAnswerCache()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+سجل تعديلات الخطوط المشترك بين لوحة التحكم والبوت
+لوحة التحكم تضيف سطراً لكل خط أُضيف أو عُدّل أو حُذف
+والبوت يقرأ الأسطر الجديدة فقط ويطبقها على الفهرس الحالي بدون إعادة بنائه أو إعادة التشغيل
+بعد إعادة كتابة data_dynamic.py (ومعها رقم آخر تعديل طُبق فيها) تُحذف التعديلات القديمة من السجل
+"""
+
+import os
+import json
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+
+# ملف السجل بجوار ملف إصدار البيانات
+DELTA_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'route_deltas.jsonl')
+
+ROUTE_DELTA_OPS = ('add', 'update', 'remove')
+
+# سجل الأماكن المضافة من لوحة التحكم (نفس الصيغة، والبوت يتابعه بـ RouteDeltaFeed أيضاً)
+LOCATION_DELTA_LOG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'location_deltas.jsonl')
+
+# التعديلات الموجودة في data_dynamic.py تبقى في السجل هذه المدة (لبوت يعمل ولم يقرأها بعد)
+DELTA_RETENTION = timedelta(days=1)
+
+
+def _seq_path(path: str) -> str:
+    """ملف صغير بجوار السجل فيه رقم آخر تعديل (حتى لا يُقرأ السجل كله عند كل نشر)"""
+    return path + '.seq'
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _read_lines(path: str, offset: int = 0) -> Tuple[List[Dict], int]:
+    """قراءة التعديلات من موضع معين في الملف مع الموضع الجديد (السطر غير المكتمل يُقرأ لاحقاً)"""
+    deltas = []
+    try:
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read()
+    except OSError:
+        return deltas, offset
+    end = data.rfind(b'\n') + 1
+    for line in data[:end].splitlines():
+        try:
+            deltas.append(json.loads(line.decode('utf-8')))
+        except ValueError:
+            continue
+    return deltas, offset + end
+
+
+def latest_delta_seq(path: Optional[str] = None) -> int:
+    """رقم آخر تعديل منشور (من الملف الجانبي، أو من السجل نفسه إذا لم يوجد)"""
+    path = path or DELTA_LOG_FILE
+    try:
+        with open(_seq_path(path), encoding='utf-8') as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        deltas, _ = _read_lines(path)
+        return deltas[-1].get('seq', 0) if deltas else 0
+
+
+def publish_route_delta(op: str, route: Dict, old_name: Optional[str] = None, path: Optional[str] = None) -> int:
+    """إضافة تعديل خط إلى السجل وإرجاع رقمه التسلسلي"""
+    if op not in ROUTE_DELTA_OPS:
+        raise ValueError(f"نوع تعديل غير معروف: {op}")
+    return _append_delta(path or DELTA_LOG_FILE, {'op': op, 'route': route, 'old_name': old_name})
+
+
+def publish_location_delta(location: Dict, path: Optional[str] = None) -> int:
+    """إضافة مكان جديد إلى سجل الأماكن: {'name', 'neighborhood', 'category'}"""
+    return _append_delta(path or LOCATION_DELTA_LOG_FILE, {'op': 'add', 'location': location})
+
+
+def _append_delta(path: str, delta: Dict) -> int:
+    """كتابة تعديل كسطر جديد برقم تسلسلي تالٍ لآخر تعديل في الملف"""
+    seq = latest_delta_seq(path) + 1
+    line = json.dumps(dict({'seq': seq}, **delta, created_at=datetime.now().isoformat()), ensure_ascii=False)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(line + '\n')
+    _write_atomic(_seq_path(path), str(seq))
+    return seq
+
+
+def compact_delta_log(applied_seq: int, path: Optional[str] = None, now: Optional[datetime] = None) -> int:
+    """
+    حذف التعديلات حتى applied_seq (الموجودة في data_dynamic.py) بعد مرور DELTA_RETENTION عليها
+    السجل يُستبدل بملف جديد فيعرف RouteDeltaFeed أنه أُعيد إنشاؤه، ويرجع عدد التعديلات المحذوفة
+    """
+    path = path or DELTA_LOG_FILE
+    deltas, _ = _read_lines(path)
+    cutoff = ((now or datetime.now()) - DELTA_RETENTION).isoformat()
+    kept = [delta for delta in deltas
+            if delta.get('seq', 0) > applied_seq or delta.get('created_at', '') > cutoff]
+    if len(kept) == len(deltas):
+        return 0
+    # الرقم التالي لا يعتمد على السجل بعد حذف آخر تعديل منه
+    _write_atomic(_seq_path(path), str(max(latest_delta_seq(path), deltas[-1].get('seq', 0))))
+    _write_atomic(path, ''.join(json.dumps(delta, ensure_ascii=False) + '\n' for delta in kept))
+    return len(deltas) - len(kept)
+
+
+class RouteDeltaFeed:
+    """
+    متابعة السجل من لحظة بناء الفهرس
+    poll() يفحص توقيت تعديل الملف وحجمه فقط ولا يقرأ إلا الأسطر الجديدة
+    """
+
+    def __init__(self, path: Optional[str] = None, applied_seq: Optional[int] = None):
+        """
+        applied_seq: آخر تعديل موجود في البيانات المحملة (من data_dynamic.py)
+        فالتعديلات الأحدث الموجودة في السجل تُطبق عند أول poll، وبدونه تبدأ المتابعة من نهاية السجل
+        """
+        self.path = path or DELTA_LOG_FILE
+        if applied_seq is not None:
+            self._signature = None
+            self._offset = 0
+            self.last_seq = applied_seq
+            return
+        self._signature = self._stat()
+        deltas, self._offset = _read_lines(self.path)
+        self.last_seq = deltas[-1].get('seq', 0) if deltas else 0
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        """رقم الملف وتوقيت التعديل والحجم معاً (كتابتان في نفس اللحظة تغيران الحجم، والضغط يغير رقم الملف)"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def poll(self) -> List[Dict]:
+        """التعديلات المنشورة منذ آخر قراءة"""
+        signature = self._stat()
+        if signature is None or signature == self._signature:
+            return []
+        if self._signature is None or signature[0] != self._signature[0] or signature[2] < self._offset:
+            # الملف أُعيد إنشاؤه (أو ضُغط) فيُقرأ من البداية مع تجاهل ما سبق تطبيقه
+            self._offset = 0
+        self._signature = signature
+        deltas, self._offset = _read_lines(self.path, self._offset)
+        new_deltas = [delta for delta in deltas if delta.get('seq', 0) > self.last_seq]
+        if new_deltas:
+            self.last_seq = new_deltas[-1].get('seq', self.last_seq)
+        return new_deltas
+
+    def sync(self, engine) -> List[Tuple[Dict, Optional[int]]]:
+        """تطبيق التعديلات الجديدة على محرك المواصلات: [(التعديل، رقم الخط المتأثر)]"""
+        return [(delta, engine.apply_delta(delta)) for delta in self.poll()]
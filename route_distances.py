@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+المسافة التراكمية على طول كل خط (مصفوفة NumPy لكل خط) تُحسب مرة واحدة لكل إصدار بيانات
+مسافة أي رحلة = cumulative[موضع النزول] - cumulative[موضع الركوب] بدون أي حسابات هندسية وقت السؤال
+المحطات بدون إحداثيات تأخذ موضعاً تقريبياً بالتناسب بين أقرب محطتين معروفتين على نفس الخط
+"""
+
+import math
+from typing import List, Dict, Tuple, Optional
+
+import numpy as np
+
+from spatial_index import haversine_m, load_geocache_coordinates
+from stop_table import canonical_stop_key
+from route_cache import read_data_version
+
+# الطريق الفعلي أطول من الخط المستقيم بين المحطتين
+ROAD_DETOUR_FACTOR = 1.3
+
+# متوسط المسافة بين محطتين متتاليتين عند عدم توفر إحداثيات كافية للخط (متر)
+DEFAULT_STOP_SPACING_M = 400.0
+
+# متوسط سرعة الميكروباص داخل المدينة شاملاً التوقفات (متر/دقيقة ≈ 15 كم/ساعة)
+VEHICLE_SPEED_M_PER_MIN = 250.0
+
+# (رقم المحرك، إصدار البيانات) ← المسافات المحسوبة
+_route_distances: Dict[Tuple[int, int], 'RouteDistances'] = {}
+
+
+class RouteDistances:
+    """رقم الخط ← مصفوفة المسافة التراكمية (متر) عند كل موضع في keyPoints"""
+
+    def __init__(self, engine, coordinates: Dict[str, Tuple[float, float]]):
+        self.engine = engine
+        self._by_key = {canonical_stop_key(name): value for name, value in coordinates.items()}
+        self.cumulative: List[np.ndarray] = []
+        # قناع الخطوط التي لها محطتان معروفتا الإحداثيات على الأقل (تقدير دقائقها من مسافات حقيقية)
+        self.estimated_mask = 0
+        for route_idx in range(len(engine.routes)):
+            self.update_route(route_idx)
+
+    def _stop_coordinates(self, stop_id: int) -> Optional[Tuple[float, float]]:
+        return self._by_key.get(self.engine.stops.keys[stop_id]) if stop_id >= 0 else None
+
+    def update_route(self, route_idx: int):
+        """إعادة حساب خط واحد (بعد إضافته أو تعديله)"""
+        stops = self.engine.route_stops[route_idx]
+        count = len(stops)
+        known = [(position, self._stop_coordinates(stop_id)) for position, stop_id in enumerate(stops)]
+        known = [(position, value) for position, value in known if value]
+
+        if len(known) < 2:
+            cumulative = np.arange(count, dtype=np.float64) * DEFAULT_STOP_SPACING_M
+            self.estimated_mask &= ~(1 << route_idx)
+        else:
+            self.estimated_mask |= 1 << route_idx
+            positions = np.array([position for position, _ in known], dtype=np.float64)
+            lats = np.array([value[0] for _, value in known])
+            lngs = np.array([value[1] for _, value in known])
+            legs = haversine_m(lats[:-1], lngs[:-1], lats[1:], lngs[1:]) * ROAD_DETOUR_FACTOR
+            known_cumulative = np.concatenate(([0.0], np.cumsum(legs)))
+            everywhere = np.arange(count, dtype=np.float64)
+            cumulative = np.interp(everywhere, positions, known_cumulative)
+            # قبل أول محطة معروفة وبعد آخر محطة: متوسط المسافة بين محطات نفس الخط
+            spacing = known_cumulative[-1] / (positions[-1] - positions[0]) or DEFAULT_STOP_SPACING_M
+            before = everywhere < positions[0]
+            after = everywhere > positions[-1]
+            cumulative[before] = (everywhere[before] - positions[0]) * spacing
+            cumulative[after] = known_cumulative[-1] + (everywhere[after] - positions[-1]) * spacing
+
+        if route_idx < len(self.cumulative):
+            self.cumulative[route_idx] = cumulative
+        else:
+            self.cumulative.append(cumulative)
+
+    def sync(self):
+        """إضافة الخطوط الجديدة في المحرك (التعديلات تُحدَّث عبر update_route)"""
+        for route_idx in range(len(self.cumulative), len(self.engine.routes)):
+            self.update_route(route_idx)
+
+    def has_estimate(self, route_idx: int) -> bool:
+        """هل مسافات الخط محسوبة من إحداثيات (وليست متوسط المسافة الافتراضي فقط)"""
+        return bool(self.estimated_mask >> route_idx & 1)
+
+    def distance_m(self, route_idx: int, start_idx: int, end_idx: int) -> float:
+        """المسافة على طول الخط بين موضع الركوب وموضع النزول"""
+        cumulative = self.cumulative[route_idx]
+        return float(cumulative[end_idx] - cumulative[start_idx])
+
+    def in_vehicle_minutes(self, route_idx: int, start_idx: int, end_idx: int) -> int:
+        """تقدير دقائق الركوب"""
+        return max(1, math.ceil(self.distance_m(route_idx, start_idx, end_idx) / VEHICLE_SPEED_M_PER_MIN))
+
+
+def load_stop_coordinates() -> Dict[str, Tuple[float, float]]:
+    """إحداثيات geocache.json ثم إحداثيات جدول location في قاعدة البيانات (إن وُجدت)"""
+    coordinates = load_geocache_coordinates()
+    try:
+        from database_helper import get_location_coordinates_from_db
+    except ImportError:
+        return coordinates
+    coordinates.update(get_location_coordinates_from_db())
+    return coordinates
+
+
+def get_route_distances(engine, coordinates: Optional[Dict[str, Tuple[float, float]]] = None) -> RouteDistances:
+    """المسافات التراكمية لخطوط المحرك - تُبنى مرة واحدة لكل إصدار بيانات (الإحداثيات من load_stop_coordinates افتراضياً)"""
+    key = (id(engine), read_data_version())
+    distances = _route_distances.get(key)
+    if distances is None or distances.engine is not engine:
+        _route_distances.clear()
+        distances = RouteDistances(engine, load_stop_coordinates() if coordinates is None else coordinates)
+        _route_distances[key] = distances
+    else:
+        distances.sync()
+    return distances
@@ -0,0 +1,544 @@
+# -*- coding: utf-8 -*-
+"""
+محرك المواصلات - فهرس مسبق للمحطات والخطوط
+يُبنى مرة واحدة عند تحميل routes_data بدلاً من مسح كل الخطوط مع كل سؤال
+"""
+
+import re
+from bisect import bisect_right
+from typing import List, Dict, Tuple, Optional
+
+from stop_table import StopTable, canonical_stop_key
+from token_index import TokenIndex
+
+# ترتيب دقة المطابقة (الأعلى أدق)
+MATCH_PRIORITY = {'exact': 3, 'partial': 2, 'keyword': 1}
+
+# التعريفة الافتراضية عند تعذر قراءة تعريفة الخط
+DEFAULT_FARE = 4.5
+
+# أقل طول لاسم المحطة حتى يُعتبر احتواؤه في اسم آخر نقطة تبديل مكافئة
+FUZZY_MIN_LENGTH = 6
+
+# أقل درجة BM25 (من 0 إلى 1) لقبول المطابقة بالكلمات - تستبعد المطابقة على كلمة عامة مثل "شارع" فقط
+KEYWORD_MIN_SCORE = 0.35
+
+# إصدار منطق مطابقة الأماكن (توحيد الكتابة، تنظيف أسماء المحطات، حدود BM25...)
+# يُرفع مع أي تغيير يغير نتيجة المطابقة حتى تُرفض الجداول المبنية مسبقاً بالمنطق القديم
+MATCHER_VERSION = 4
+
+# عدد أسماء الأماكن المحفوظ تحليلها (الذهاب ثم العودة يستخدمان نفس التحليل)
+RESOLVE_CACHE_SIZE = 1024
+
+# اتجاه الخط من اسمه: "خط السلام (رايح البلد)" و"خط السلام (راجع - المسار الخارجي)"
+DIRECTIONS = {'رايح': 'outbound', 'راجع': 'inbound'}
+OPPOSITE_DIRECTION = {'outbound': 'inbound', 'inbound': 'outbound'}
+_ROUTE_VARIANT = re.compile(r'^(.*?)\s*\(\s*(رايح|راجع)\s*[-–]?\s*([^()]*?)\s*\)\s*$')
+
+_ARABIC_DIGITS = str.maketrans('٠١٢٣٤٥٦٧٨٩٫', '0123456789.')
+_FARE_NUMBER = re.compile(r'\d+(?:\.\d+)?')
+
+
+def parse_route_variant(route_name: str) -> Tuple[str, Optional[str], str]:
+    """(اسم الخط، الاتجاه outbound/inbound أو None، وصف المسار) من اسم الخط الكامل"""
+    name = route_name.strip() if isinstance(route_name, str) else ''
+    match = _ROUTE_VARIANT.match(name)
+    if not match:
+        return name, None, ''
+    return match.group(1).strip(), DIRECTIONS[match.group(2)], match.group(3).strip()
+
+
+def minimal_segment(starts: List[int], ends: List[int]) -> Optional[Tuple[int, int]]:
+    """
+    أقصر مقطع (موضع الركوب، موضع النزول) بالترتيب الصحيح من قائمتي مواضع مرتبتين
+    الخطوط الدائرية أو التي تلف (U-turn) تمر بنفس المحطة أكثر من مرة
+    """
+    best = None
+    for start in starts:
+        i = bisect_right(ends, start)
+        if i == len(ends):
+            # المواضع الأكبر لن تجد نزولاً بعدها
+            break
+        if best is None or ends[i] - start < best[1] - best[0]:
+            best = (start, ends[i])
+    return best
+
+
+def parse_fare(fare) -> float:
+    """استخراج قيمة التعريفة الرقمية من نص مثل '4.5 جنيه مصري'"""
+    if isinstance(fare, (int, float)):
+        return float(fare)
+    if isinstance(fare, str):
+        match = _FARE_NUMBER.search(fare.translate(_ARABIC_DIGITS))
+        if match:
+            return float(match.group())
+    return DEFAULT_FARE
+
+
+class TransitEngine:
+    """فهرس مقلوب يربط كل محطة بقائمة (رقم الخط، موضع المحطة في الخط)"""
+
+    def __init__(self, routes_data: List[Dict]):
+        self.routes_source = routes_data
+        self.routes: List[Dict] = []
+        # جدول المحطات الموحد (الأوصاف مثل "بالقرب من" تُفصل عن الاسم)
+        self.stops = StopTable()
+        # المفتاح الموحد ← رقم المحطة، ورقم المحطة ← اسمها (نفس قوائم الجدول)
+        self.stop_ids: Dict[str, int] = self.stops.ids
+        self.stop_names: List[str] = self.stops.names
+        # رقم المحطة ← [(رقم الخط، الموضع)]
+        self.stop_routes: List[List[Tuple[int, int]]] = []
+        # رقم المحطة ← قناع بتات الخطوط التي تخدمها (البت رقم الخط)
+        self.stop_masks: List[int] = []
+        # رقم الخط ← أرقام المحطات بالترتيب
+        self.route_stops: List[List[int]] = []
+        # رقم الخط ← {رقم المحطة: مواضعها في الخط مرتبة}
+        self.route_positions: List[Dict[int, List[int]]] = []
+        # رقم الخط ← التعريفة الرقمية
+        self.route_fares: List[float] = []
+        # الخطوط المحذوفة (يبقى مكانها فارغاً حتى لا تتغير أرقام بقية الخطوط)
+        self.removed_routes = set()
+        # يزيد مع كل إضافة أو تعديل أو حذف (للجداول المشتقة مثل جدول التعريفة)
+        self.revision = 0
+        # اتجاهات نفس الخط (رايح/راجع) مجمعة تحت رقم خط واحد
+        self.line_ids: Dict[str, int] = {}
+        self.line_names: List[str] = []
+        self.line_routes: List[List[int]] = []
+        # رقم الخط ← (رقم الخط الأم، الاتجاه، وصف المسار)
+        self.route_variants: List[Tuple[int, Optional[str], str]] = []
+        # اسم المكان ← نتيجة resolve_location_scored (تُمسح مع أي تعديل في الخطوط)
+        self._resolved: Dict[str, Dict[int, Tuple[str, float]]] = {}
+
+        for route in routes_data:
+            self._index_route(route)
+        # فهرس كلمات أسماء المحطات (يُحدَّث تلقائياً بالمحطات الجديدة)
+        self.token_index = TokenIndex(self.stops.keys)
+        # جدول نقاط التبديل بين كل خطين (يُبنى مرة واحدة مع الفهرس)
+        self.transfer_table = TransferTable(self)
+
+    def _get_or_create_stop(self, point: str) -> int:
+        """إرجاع رقم المحطة الموحد وإنشاؤه إن لم يكن موجوداً"""
+        stop_id = self.stops.intern(point)
+        if stop_id == len(self.stop_routes):
+            self.stop_routes.append([])
+            self.stop_masks.append(0)
+        return stop_id
+
+    def stop_annotations(self, route_idx: int, position: int) -> Tuple[str, ...]:
+        """أوصاف نقطة في خط كما وردت في keyPoints (مثل near أو uncertain)"""
+        point = self.routes[route_idx].get('keyPoints', [])[position]
+        return self.stops.annotations(point) if isinstance(point, str) else ()
+
+    def _index_route(self, route: Dict, route_idx: Optional[int] = None):
+        """إضافة خط واحد إلى الفهرس (أو إعادة فهرسته في موضعه)"""
+        if route_idx is None:
+            route_idx = len(self.routes)
+            self.routes.append(route)
+            self.route_stops.append([])
+            self.route_positions.append({})
+            self.route_fares.append(0.0)
+            self.route_variants.append((-1, None, ''))
+        else:
+            self.routes[route_idx] = route
+        self.revision += 1
+        self._resolved.clear()
+        self._assign_line(route_idx, route.get('routeName'))
+        stops = []
+        positions: Dict[int, List[int]] = {}
+        for position, point in enumerate(route.get('keyPoints', []) or []):
+            if not isinstance(point, str):
+                # الحفاظ على المواضع الأصلية حتى لو كانت النقطة غير صالحة
+                stops.append(-1)
+                continue
+            stop_id = self._get_or_create_stop(point)
+            self.stop_routes[stop_id].append((route_idx, position))
+            self.stop_masks[stop_id] |= 1 << route_idx
+            positions.setdefault(stop_id, []).append(position)
+            stops.append(stop_id)
+        self.route_stops[route_idx] = stops
+        self.route_positions[route_idx] = positions
+        self.route_fares[route_idx] = parse_fare(route.get('fare'))
+
+    def _assign_line(self, route_idx: int, route_name: str):
+        """ربط الخط باتجاهاته الأخرى تحت نفس رقم الخط الأم"""
+        line_name, direction, label = parse_route_variant(route_name)
+        old_line = self.route_variants[route_idx][0]
+        if old_line >= 0:
+            self.line_routes[old_line].remove(route_idx)
+        line_id = self.line_ids.get(line_name)
+        if line_id is None:
+            line_id = len(self.line_names)
+            self.line_ids[line_name] = line_id
+            self.line_names.append(line_name)
+            self.line_routes.append([])
+        self.line_routes[line_id].append(route_idx)
+        self.route_variants[route_idx] = (line_id, direction, label)
+
+    def reverse_routes(self, route_idx: int) -> List[int]:
+        """اتجاهات العودة لنفس الخط (مثلاً راجع لخط رايح)"""
+        line_id, direction, _ = self.route_variants[route_idx]
+        opposite = OPPOSITE_DIRECTION.get(direction)
+        return [other for other in self.line_routes[line_id]
+                if other != route_idx and other not in self.removed_routes
+                and self.route_variants[other][1] == opposite]
+
+    def reverse_direct_routes(self, route_indices: List[int], start_landmark: str, end_landmark: str,
+                              match_types: Optional[Tuple[str, ...]] = ('exact', 'partial')) -> List[Dict]:
+        """
+        رحلة العودة من اتجاهات العودة لخطوط الذهاب فقط (نفس شكل find_direct_routes)
+        تحليل المكانين محفوظ من سؤال الذهاب، والقائمة الفارغة تعني: لا اتجاه عودة يخدم الرحلة
+        """
+        route_mask = 0
+        for route_idx in route_indices:
+            if route_idx < len(self.routes):
+                for reverse_idx in self.reverse_routes(route_idx):
+                    route_mask |= 1 << reverse_idx
+        if not route_mask:
+            return []
+        return self.find_direct_routes(start_landmark, end_landmark, match_types, route_mask=route_mask)
+
+    def update_route(self, route_idx: int, route: Dict):
+        """استبدال خط واحد وتحديث صفوفه فقط في الفهرس وجدول التبديل"""
+        for stop_id in set(self.route_stops[route_idx]):
+            if stop_id >= 0:
+                self.stop_routes[stop_id] = [entry for entry in self.stop_routes[stop_id] if entry[0] != route_idx]
+                self.stop_masks[stop_id] &= ~(1 << route_idx)
+        self._index_route(route, route_idx)
+        self.removed_routes.discard(route_idx)
+        self.transfer_table.rebuild_route(route_idx)
+
+    def add_route(self, route: Dict) -> int:
+        """إضافة خط جديد وبناء صفوف التبديل الخاصة به"""
+        self._index_route(route)
+        route_idx = len(self.routes) - 1
+        self.transfer_table.rebuild_route(route_idx)
+        return route_idx
+
+    def remove_route(self, route_idx: int):
+        """حذف خط من الفهرس مع بقاء مكانه فارغاً"""
+        self.update_route(route_idx, dict(self.routes[route_idx], keyPoints=[]))
+        self.removed_routes.add(route_idx)
+
+    def apply_delta(self, delta: Dict) -> Optional[int]:
+        """
+        تطبيق تعديل خط واحد: {'op': 'add' | 'update' | 'remove', 'route': بيانات الخط، 'old_name': الاسم قبل التعديل}
+        يُحدَّث الخط أيضاً في قائمة routes_data الأصلية حتى تبقى متطابقة مع أرقام الفهرس
+        يرجع رقم الخط المتأثر أو None إذا كان الخط المحذوف غير موجود
+        """
+        route = delta.get('route') or {}
+        route_idx = self.find_route_index(delta.get('old_name') or route.get('routeName', ''))
+        if delta.get('op') == 'remove':
+            if route_idx is None:
+                return None
+            self.remove_route(route_idx)
+        elif route_idx is None:
+            route_idx = self.add_route(route)
+        else:
+            self.update_route(route_idx, route)
+
+        source = self.routes_source
+        if isinstance(source, list) and source is not self.routes:
+            if route_idx < len(source):
+                source[route_idx] = self.routes[route_idx]
+            elif route_idx == len(source):
+                source.append(self.routes[route_idx])
+        return route_idx
+
+    def active_routes(self) -> List[Dict]:
+        """الخطوط الحالية بدون أماكن الخطوط المحذوفة الفارغة"""
+        return [route for route_idx, route in enumerate(self.routes) if route_idx not in self.removed_routes]
+
+    def find_route_index(self, route_name: str) -> Optional[int]:
+        """إرجاع رقم الخط من اسمه"""
+        for route_idx, route in enumerate(self.routes):
+            if route.get('routeName') == route_name and route_idx not in self.removed_routes:
+                return route_idx
+        return None
+
+    def transfer_points(self, from_route_idx: int, to_route_idx: int) -> List[Tuple[int, int]]:
+        """نقاط التبديل من خط لآخر: [(موضع النزول، موضع الركوب)]"""
+        return self.transfer_table.rows.get(from_route_idx, {}).get(to_route_idx, [])
+
+    def find_stops_on_route(self, route_idx: int, point: str) -> List[int]:
+        """المحطات على خط معين التي تطابق اسم نقطة (تامة ثم جزئية)"""
+        key = canonical_stop_key(point)
+        route_stop_ids = [stop_id for stop_id in self.route_stops[route_idx] if stop_id >= 0]
+        exact_id = self.stops.lookup(point)
+        if exact_id is not None and exact_id in route_stop_ids:
+            return [exact_id]
+        partial = []
+        for stop_id in route_stop_ids:
+            stop_key = self.stops.keys[stop_id]
+            if (key in stop_key or stop_key in key) and stop_id not in partial:
+                partial.append(stop_id)
+        return partial
+
+    def resolve_best_stops(self, location: str, match_types: Tuple[str, ...] = ('exact', 'partial')) -> List[int]:
+        """المحطات ذات أعلى دقة مطابقة متاحة لاسم مكان"""
+        matches = self.resolve_location(location)
+        for match_type in sorted(match_types, key=lambda t: MATCH_PRIORITY.get(t, 0), reverse=True):
+            stops = [stop_id for stop_id, t in matches.items() if t == match_type]
+            if stops:
+                return sorted(stops)
+        return []
+
+    def resolve_location(self, location: str) -> Dict[int, str]:
+        """تحديد المحطات المطابقة لاسم مكان مع نوع المطابقة لكل محطة"""
+        return {stop_id: match_type for stop_id, (match_type, _) in self.resolve_location_scored(location).items()}
+
+    def resolve_location_scored(self, location: str) -> Dict[int, Tuple[str, float]]:
+        """
+        المحطات المطابقة لاسم مكان: {رقم المحطة: (نوع المطابقة، الثقة من 0 إلى 1)}
+        تامة = 1، جزئية = 0.5 إلى 0.9 حسب نسبة الطولين، بالكلمات = نصف درجة BM25
+        النتيجة محفوظة لنفس الاسم (لا تُعدَّل)
+        """
+        matches = self._resolved.get(location)
+        if matches is not None:
+            return matches
+        location_clean = canonical_stop_key(location)
+        if not location_clean:
+            return {}
+        index = self.token_index
+        index.update()
+        keys = self.stops.keys
+
+        matches: Dict[int, Tuple[str, float]] = {}
+        exact_id = self.stops.lookup(location)
+        if exact_id is not None:
+            matches[exact_id] = ('exact', 1.0)
+
+        # الجزئية: المرشحون من الفهرس ثم التحقق من الاحتواء
+        tokens = location_clean.split()
+        candidates = index.stops_containing(tokens[0])
+        for token in tokens[1:]:
+            if not candidates:
+                break
+            candidates &= index.stops_containing(token)
+        candidates |= index.stops_inside(location_clean)
+        for stop_id in candidates:
+            key = keys[stop_id]
+            if stop_id not in matches and (location_clean in key or key in location_clean):
+                shorter, longer = sorted((len(key), len(location_clean)))
+                matches[stop_id] = ('partial', 0.5 + 0.4 * shorter / longer)
+
+        # بالكلمات: ترجيح BM25 حتى لا تكفي كلمة عامة وحدها
+        words = [word for word in tokens if len(word) > 2]
+        for stop_id, score in index.score(words).items():
+            if stop_id not in matches and score >= KEYWORD_MIN_SCORE:
+                matches[stop_id] = ('keyword', 0.5 * score)
+
+        if len(self._resolved) >= RESOLVE_CACHE_SIZE:
+            self._resolved.clear()
+        self._resolved[location] = matches
+        return matches
+
+    def routes_mask(self, stop_ids) -> int:
+        """قناع الخطوط التي تخدم أياً من المحطات"""
+        mask = 0
+        for stop_id in stop_ids:
+            mask |= self.stop_masks[stop_id]
+        return mask
+
+    def _stops_by_route(self, matches: Dict[int, str], route_mask: int = -1) -> Dict[int, List[int]]:
+        """تجميع المحطات المطابقة حسب الخط (للخطوط الموجودة في القناع فقط)"""
+        by_route: Dict[int, List[int]] = {}
+        for stop_id in matches:
+            common = self.stop_masks[stop_id] & route_mask
+            while common:
+                lowest = common & -common
+                by_route.setdefault(lowest.bit_length() - 1, []).append(stop_id)
+                common ^= lowest
+        return by_route
+
+    def _filtered_matches(self, location: str, match_types: Optional[Tuple[str, ...]]) -> Dict[int, str]:
+        return {s: t for s, (t, _) in self._filtered_scored(location, match_types).items()}
+
+    def _filtered_scored(self, location: str, match_types: Optional[Tuple[str, ...]]) -> Dict[int, Tuple[str, float]]:
+        matches = self.resolve_location_scored(location)
+        if match_types is not None:
+            matches = {s: m for s, m in matches.items() if m[0] in match_types}
+        return matches
+
+    def find_direct_routes(self, start_landmark: str, end_landmark: str,
+                           match_types: Optional[Tuple[str, ...]] = None, route_mask: int = -1) -> List[Dict]:
+        """
+        البحث عن الخطوط المباشرة بين مكانين
+        يرجع قائمة [{'route', 'route_idx', 'matches'}] مرتبة حسب ترتيب الخطوط
+        لكل (محطة ركوب، محطة نزول) أقصر مقطع فقط مع عدد المحطات بينهما (تقدير تقريبي للوقت)
+        """
+        start_scored = self._filtered_scored(start_landmark, match_types)
+        end_scored = self._filtered_scored(end_landmark, match_types)
+        if not start_scored or not end_scored:
+            return []
+        start_matches = {s: t for s, (t, _) in start_scored.items()}
+        end_matches = {s: t for s, (t, _) in end_scored.items()}
+
+        # عملية AND واحدة تحدد الخطوط المشتركة، وفحص الترتيب يتم عليها فقط
+        common_mask = self.routes_mask(start_matches) & self.routes_mask(end_matches) & route_mask
+        if not common_mask:
+            return []
+        start_by_route = self._stops_by_route(start_matches, common_mask)
+        end_by_route = self._stops_by_route(end_matches, common_mask)
+
+        direct_routes = []
+        for route_idx in sorted(start_by_route.keys() & end_by_route.keys()):
+            key_points = self.routes[route_idx].get('keyPoints', [])
+            positions = self.route_positions[route_idx]
+            valid_routes = []
+            for start_stop in start_by_route[route_idx]:
+                for end_stop in end_by_route[route_idx]:
+                    segment = minimal_segment(positions[start_stop], positions[end_stop])
+                    if segment is None:
+                        continue
+                    start_idx, end_idx = segment
+                    valid_routes.append({
+                        'start_idx': start_idx,
+                        'end_idx': end_idx,
+                        'start_type': start_matches[start_stop],
+                        'end_type': end_matches[end_stop],
+                        'start_confidence': start_scored[start_stop][1],
+                        'end_confidence': end_scored[end_stop][1],
+                        'start_point': key_points[start_idx],
+                        'end_point': key_points[end_idx],
+                        'intermediate_stops': end_idx - start_idx - 1
+                    })
+
+            if valid_routes:
+                # ترتيب حسب دقة المطابقة ثم درجة الثقة ثم أقل عدد محطات في الطريق
+                valid_routes.sort(key=lambda x: (-(MATCH_PRIORITY.get(x['start_type'], 0) + MATCH_PRIORITY.get(x['end_type'], 0)),
+                                                 -(x['start_confidence'] + x['end_confidence']),
+                                                 x['intermediate_stops'], x['start_idx']))
+                direct_routes.append({
+                    'route': self.routes[route_idx],
+                    'route_idx': route_idx,
+                    'matches': valid_routes
+                })
+
+        return direct_routes
+
+    def _coverage(self, location: str, match_types: Optional[Tuple[str, ...]]) -> Tuple[int, Dict[int, Tuple[int, int]]]:
+        """قناع الخطوط للمكان مع (أول موضع، آخر موضع) على كل خط"""
+        matches = self._filtered_matches(location, match_types)
+        spans: Dict[int, Tuple[int, int]] = {}
+        for stop_id in matches:
+            for route_idx, position in self.stop_routes[stop_id]:
+                first, last = spans.get(route_idx, (position, position))
+                spans[route_idx] = (min(first, position), max(last, position))
+        return self.routes_mask(matches), spans
+
+    def batch_direct_routes(self, pairs: List[Tuple[str, str]],
+                            match_types: Optional[Tuple[str, ...]] = ('exact', 'partial'),
+                            route_mask: int = -1) -> List[List[int]]:
+        """أرقام الخطوط المباشرة لكل زوج (ضمن القناع) - كل مكان يُحلل مرة واحدة مهما تكرر"""
+        coverage: Dict[str, Tuple[int, Dict[int, Tuple[int, int]]]] = {}
+        results = []
+        for start, end in pairs:
+            if start not in coverage:
+                coverage[start] = self._coverage(start, match_types)
+            if end not in coverage:
+                coverage[end] = self._coverage(end, match_types)
+            start_mask, start_spans = coverage[start]
+            end_mask, end_spans = coverage[end]
+            common = start_mask & end_mask & route_mask
+            routes = []
+            while common:
+                lowest = common & -common
+                route_idx = lowest.bit_length() - 1
+                if start_spans[route_idx][0] < end_spans[route_idx][1]:
+                    routes.append(route_idx)
+                common ^= lowest
+            results.append(routes)
+        return results
+
+    def has_direct_route(self, start_landmark: str, end_landmark: str,
+                         match_types: Optional[Tuple[str, ...]] = ('exact', 'partial')) -> bool:
+        """فحص سريع لوجود خط مباشر بالترتيب الصحيح"""
+        return bool(self.batch_direct_routes([(start_landmark, end_landmark)], match_types)[0])
+
+
+class TransferTable:
+    """
+    جدول نقاط التبديل لكل زوج مرتب من الخطوط
+    نقطة التبديل = محطة مشتركة أو محطتان متكافئتان (اسم إحداهما جزء من الأخرى)
+    """
+
+    def __init__(self, engine: TransitEngine):
+        self.engine = engine
+        # رقم المحطة ← المحطات المكافئة لها (بدون المحطة نفسها)
+        self.equivalents: Dict[int, List[int]] = {}
+        # الخط ← {الخط الآخر ← [(موضع النزول، موضع الركوب)]}
+        self.rows: Dict[int, Dict[int, List[Tuple[int, int]]]] = {}
+        self._linked_stops = 0
+
+        self._link_new_stops()
+        for route_idx in range(len(engine.routes)):
+            self.rows[route_idx] = self._build_row(route_idx)
+
+    def _link(self, stop_a: int, stop_b: int):
+        """تسجيل تكافؤ محطتين في الاتجاهين"""
+        linked = self.equivalents.setdefault(stop_a, [])
+        if stop_b not in linked:
+            linked.append(stop_b)
+            self.equivalents.setdefault(stop_b, []).append(stop_a)
+
+    def _link_new_stops(self):
+        """ربط المحطات التي أُضيفت منذ آخر بناء بالمحطات المكافئة لها"""
+        engine = self.engine
+        first_new = self._linked_stops
+        stop_count = len(engine.stop_names)
+        for stop_id in range(first_new, stop_count):
+            key = engine.stops.keys[stop_id]
+            if len(key) < FUZZY_MIN_LENGTH:
+                continue
+            # الأسماء الأقصر الموجودة داخل هذا الاسم: بحث مباشر في الفهرس لكل جزء منه
+            for length in range(FUZZY_MIN_LENGTH, len(key)):
+                for begin in range(len(key) - length + 1):
+                    other = engine.stop_ids.get(key[begin:begin + length])
+                    if other is not None and other != stop_id:
+                        self._link(stop_id, other)
+            # الأسماء الأطول القديمة التي تحتوي هذا الاسم (الجديدة تلتقطه بالبحث السابق)
+            if first_new:
+                for other in range(first_new):
+                    other_key = engine.stops.keys[other]
+                    if len(other_key) > len(key) and key in other_key:
+                        self._link(stop_id, other)
+        self._linked_stops = stop_count
+
+    def _build_row(self, route_idx: int) -> Dict[int, List[Tuple[int, int]]]:
+        """حساب نقاط التبديل من خط معين إلى كل الخطوط الأخرى"""
+        engine = self.engine
+        row: Dict[int, List[Tuple[int, int]]] = {}
+        for position, stop_id in enumerate(engine.route_stops[route_idx]):
+            if stop_id < 0:
+                continue
+            for other_stop in [stop_id] + self.equivalents.get(stop_id, []):
+                for other_route, other_position in engine.stop_routes[other_stop]:
+                    if other_route != route_idx:
+                        row.setdefault(other_route, []).append((position, other_position))
+        for pairs in row.values():
+            pairs.sort()
+        return row
+
+    def rebuild_route(self, route_idx: int):
+        """إعادة بناء صفوف خط واحد فقط (صفه والأعمدة المقابلة له في الخطوط الأخرى)"""
+        self._link_new_stops()
+        for row in self.rows.values():
+            row.pop(route_idx, None)
+        self.rows[route_idx] = self._build_row(route_idx)
+        for other_route, pairs in self.rows[route_idx].items():
+            self.rows[other_route][route_idx] = sorted((to_pos, from_pos) for from_pos, to_pos in pairs)
+
+
+# محركات مبنية مسبقاً لكل قائمة خطوط محملة
+_engines: Dict[int, TransitEngine] = {}
+
+
+def get_engine(routes_data: List[Dict]) -> TransitEngine:
+    """إرجاع المحرك المبني لقائمة الخطوط أو بناؤه مرة واحدة"""
+    engine = _engines.get(id(routes_data))
+    if engine is None or engine.routes_source is not routes_data:
+        if len(_engines) >= 8:
+            _engines.clear()
+        engine = TransitEngine(routes_data)
+        _engines[id(routes_data)] = engine
+    return engine
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس مكاني (شبكة منتظمة) للمحطات والأماكن ذات الإحداثيات
+يجيب عن "أقرب k محطات في نطاق R متر" بفحص خلايا الشبكة القريبة فقط
+"""
+
+import os
+import re
+import json
+import math
+from typing import List, Dict, Tuple, Optional, Hashable, Iterable
+
+import numpy as np
+
+# ملف كاش الإحداثيات المشترك مع البوت
+GEOCACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'geocache.json')
+
+EARTH_RADIUS_M = 6371000.0
+
+# حجم خلية الشبكة الافتراضي بالمتر
+DEFAULT_CELL_SIZE_M = 250.0
+
+_COORDINATE_PAIR = re.compile(r'(-?\d+(?:\.\d+)?)\s*[,،\s]\s*(-?\d+(?:\.\d+)?)')
+
+
+def parse_coordinates(value) -> Optional[Tuple[float, float]]:
+    """قراءة الإحداثيات من نص مثل '31.2398, 32.2842' أو من قاموس {'lat', 'lng'}"""
+    if isinstance(value, dict):
+        try:
+            return float(value['lat']), float(value['lng'])
+        except (KeyError, TypeError, ValueError):
+            return None
+    if isinstance(value, (list, tuple)) and len(value) == 2:
+        try:
+            return float(value[0]), float(value[1])
+        except (TypeError, ValueError):
+            return None
+    if isinstance(value, str):
+        match = _COORDINATE_PAIR.search(value)
+        if match:
+            lat, lng = float(match.group(1)), float(match.group(2))
+            if -90 <= lat <= 90 and -180 <= lng <= 180:
+                return lat, lng
+    return None
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    """المسافة بالمتر (تعمل على أرقام أو مصفوفات NumPy)"""
+    lat1, lng1, lat2, lng2 = map(np.radians, (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+class SpatialIndex:
+    """شبكة منتظمة بالمتر فوق إسقاط مستطيل متساوي المسافات حول مركز النقاط"""
+
+    def __init__(self, points: Iterable[Tuple[Hashable, float, float]], cell_size_m: float = DEFAULT_CELL_SIZE_M):
+        points = list(points)
+        self.cell_size_m = cell_size_m
+        self.keys: List[Hashable] = [key for key, _, _ in points]
+        self.lats = np.array([lat for _, lat, _ in points], dtype=np.float64)
+        self.lngs = np.array([lng for _, _, lng in points], dtype=np.float64)
+        self._origin_lat = float(self.lats.mean()) if points else 0.0
+        self._origin_lng = float(self.lngs.mean()) if points else 0.0
+        self._lng_scale = math.cos(math.radians(self._origin_lat))
+
+        # الخلية ← أرقام النقاط داخلها
+        self._cells: Dict[Tuple[int, int], np.ndarray] = {}
+        if points:
+            xs, ys = self._project(self.lats, self.lngs)
+            cells: Dict[Tuple[int, int], List[int]] = {}
+            for i, cell in enumerate(zip(np.floor(xs / cell_size_m).astype(int).tolist(),
+                                         np.floor(ys / cell_size_m).astype(int).tolist())):
+                cells.setdefault(cell, []).append(i)
+            self._cells = {cell: np.array(indices, dtype=np.int64) for cell, indices in cells.items()}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _project(self, lat, lng):
+        """تحويل الإحداثيات إلى أمتار نسبة لمركز الفهرس"""
+        x = np.radians(np.asarray(lng) - self._origin_lng) * EARTH_RADIUS_M * self._lng_scale
+        y = np.radians(np.asarray(lat) - self._origin_lat) * EARTH_RADIUS_M
+        return x, y
+
+    def nearest(self, lat: float, lng: float, k: int = 5, radius_m: float = 500.0) -> List[Tuple[Hashable, float]]:
+        """أقرب k نقاط في نطاق radius_m متر: [(المفتاح، المسافة بالمتر)] مرتبة تصاعدياً"""
+        if not self.keys or k <= 0:
+            return []
+        x, y = self._project(lat, lng)
+        # هامش 1% لأن الإسقاط تقريبي والمسافة النهائية بصيغة هافرساين
+        reach = radius_m * 1.01
+        min_cx, max_cx = int(math.floor((x - reach) / self.cell_size_m)), int(math.floor((x + reach) / self.cell_size_m))
+        min_cy, max_cy = int(math.floor((y - reach) / self.cell_size_m)), int(math.floor((y + reach) / self.cell_size_m))
+
+        candidates = [self._cells[(cx, cy)]
+                      for cx in range(min_cx, max_cx + 1)
+                      for cy in range(min_cy, max_cy + 1)
+                      if (cx, cy) in self._cells]
+        if not candidates:
+            return []
+        indices = candidates[0] if len(candidates) == 1 else np.concatenate(candidates)
+
+        distances = haversine_m(lat, lng, self.lats[indices], self.lngs[indices])
+        within = distances <= radius_m
+        indices, distances = indices[within], distances[within]
+        if len(indices) > k:
+            top = np.argpartition(distances, k - 1)[:k]
+            indices, distances = indices[top], distances[top]
+        order = np.argsort(distances, kind='stable')
+        return [(self.keys[i], float(d)) for i, d in zip(indices[order].tolist(), distances[order].tolist())]
+
+
+def load_geocache_coordinates(path: str = GEOCACHE_FILE) -> Dict[str, Tuple[float, float]]:
+    """الإحداثيات المحفوظة في geocache.json"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    coordinates = {}
+    for name, value in cache.items():
+        parsed = parse_coordinates(value)
+        if parsed:
+            coordinates[name] = parsed
+    return coordinates
+
+
+def build_stop_index(engine, coordinates: Dict[str, Tuple[float, float]],
+                     cell_size_m: float = DEFAULT_CELL_SIZE_M) -> SpatialIndex:
+    """فهرس مكاني لمحطات المحرك التي لها إحداثيات (المفتاح = رقم المحطة)"""
+    from stop_table import canonical_stop_key
+    by_key = {canonical_stop_key(name): value for name, value in coordinates.items()}
+    points = []
+    for stop_id, key in enumerate(engine.stops.keys):
+        value = by_key.get(key)
+        if value:
+            points.append((stop_id, value[0], value[1]))
+    return SpatialIndex(points, cell_size_m)
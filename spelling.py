@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+تصحيح الأخطاء الإملائية في كلمات السؤال (SymSpell - الحذف المتماثل)
+كل كلمة في المفردات تُخزن مع كل صيغها بعد حذف حرف أو حرفين
+والكلمة المكتوبة خطأ تُولد صيغ الحذف نفسها فيلتقيان في القاموس بدون مرور على المفردات
+"""
+
+from typing import List, Dict, Set, Iterable
+
+from arabic_text import normalize_arabic
+
+# أقصى مسافة تحرير للتصحيح
+MAX_EDIT_DISTANCE = 2
+
+# صيغ الحذف تُولد من أول حروف الكلمة فقط (يحد عدد الصيغ لكل كلمة)
+PREFIX_LENGTH = 7
+
+# الكلمات الأقصر لا تُصحح، وحتى هذا الطول يُسمح بتعديل واحد فقط
+MIN_CORRECTION_LENGTH = 3
+SINGLE_EDIT_MAX_LENGTH = 4
+
+# أقصى عدد كلمات محفوظ تصحيحها
+CORRECTION_CACHE_SIZE = 4096
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """كل صيغ الكلمة بعد حذف حتى max_distance حرف"""
+    results = set()
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            for i in range(len(item)):
+                variant = item[:i] + item[i + 1:]
+                if variant not in results:
+                    results.add(variant)
+                    next_frontier.add(variant)
+        frontier = next_frontier
+    return results
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """مسافة التحرير مع تبديل حرفين متجاورين (OSA)، أو max_distance + 1 إذا تجاوزتها"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous: List[int] = []
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SpellingCorrector:
+    """قاموس الحذف المتماثل على كلمات المعالم والمحطات (يُضاف له بدون إعادة بناء)"""
+
+    def __init__(self, texts: Iterable[str] = (), max_distance: int = MAX_EDIT_DISTANCE,
+                 prefix_length: int = PREFIX_LENGTH):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        # الكلمة ← عدد مرات ظهورها في الأسماء (للترجيح بين تصحيحين بنفس المسافة)
+        self.words: Dict[str, int] = {}
+        # صيغة الحذف ← الكلمات التي تنتج عنها
+        self.deletes: Dict[str, List[str]] = {}
+        # الكلمة المكتوبة ← تصحيحها (يُمسح عند إضافة كلمات)
+        self._corrections: Dict[str, str] = {}
+        self.add_texts(texts)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def add_texts(self, texts: Iterable[str]):
+        """إضافة كلمات أسماء جديدة (مثل مكان أضافه المشرف)"""
+        for text in texts:
+            for word in normalize_arabic(text).split():
+                self.add_word(word)
+
+    def add_word(self, word: str):
+        if word in self.words:
+            self.words[word] += 1
+            return
+        self.words[word] = 1
+        self._corrections.clear()
+        prefix = word[:self.prefix_length]
+        for variant in _deletes(prefix, self.max_distance) | {prefix}:
+            self.deletes.setdefault(variant, []).append(word)
+
+    def _allowed_distance(self, word: str) -> int:
+        if len(word) < MIN_CORRECTION_LENGTH:
+            return 0
+        return min(self.max_distance, 1 if len(word) <= SINGLE_EDIT_MAX_LENGTH else 2)
+
+    def correct_word(self, word: str) -> str:
+        """أقرب كلمة في المفردات (أقل مسافة ثم الأكثر ظهوراً ثم أبجدياً) أو الكلمة نفسها"""
+        if word in self.words:
+            return word
+        correction = self._corrections.get(word)
+        if correction is not None:
+            return correction
+        correction = word
+        max_distance = self._allowed_distance(word)
+        if max_distance:
+            prefix = word[:self.prefix_length]
+            best_key = (max_distance + 1, 0, '')
+            seen = set()
+            for variant in _deletes(prefix, max_distance) | {prefix}:
+                for candidate in self.deletes.get(variant, ()):
+                    if candidate in seen:
+                        continue
+                    seen.add(candidate)
+                    distance = edit_distance(word, candidate, max_distance)
+                    key = (distance, -self.words[candidate], candidate)
+                    if distance <= max_distance and key < best_key:
+                        best_key = key
+                        correction = candidate
+        if len(self._corrections) >= CORRECTION_CACHE_SIZE:
+            self._corrections.clear()
+        self._corrections[word] = correction
+        return correction
+
+    def correct(self, text: str) -> str:
+        """النص الموحد بعد تصحيح كل كلمة"""
+        return ' '.join(self.correct_word(word) for word in normalize_arabic(text).split())
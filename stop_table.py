@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+جدول المحطات الموحد
+كل نص في keyPoints يُحوَّل عند التحميل إلى رقم محطة ثابت:
+  "(بالقرب من) مدرسة البنزينة؟"  ←  محطة "مدرسة البنزينة" + وصف (near، uncertain)
+  " كنيسة سانت أوجيني"          ←  نفس محطة "كنيسة سانت أوجيني"
+النصوص الأصلية تبقى أسماء بديلة (aliases) للمحطة، والمقارنة بعد ذلك تتم بالأرقام
+"""
+
+import re
+import sys
+from typing import List, Dict, Tuple, Optional, NamedTuple, Set
+
+from arabic_text import normalize_arabic
+
+# الأوصاف التي تُكتب بين قوسين قبل أو بعد اسم المكان ← رمز الوصف
+ANNOTATIONS = {
+    'بالقرب من': 'near',
+    'قرب': 'near',
+    'بجوار': 'beside',
+    'خلف': 'behind',
+    'من الخلف': 'behind',
+    'أمام': 'front',
+    'منطقة': 'area',
+}
+
+# علامة الاستفهام في البيانات تعني أن الموقع غير مؤكد
+UNCERTAIN = 'uncertain'
+
+_PARENTHESES = re.compile(r'\(([^()]*)\)')
+_QUESTION_MARKS = re.compile(r'[?؟]')
+_SPACES = re.compile(r'\s+')
+
+
+class ParsedStop(NamedTuple):
+    name: str                       # الاسم المعروض بدون الأوصاف
+    key: str                        # المفتاح الموحد للمقارنة
+    annotations: Tuple[str, ...]    # رموز الأوصاف المحذوفة من النص
+
+
+def parse_stop(text: str) -> ParsedStop:
+    """فصل اسم المحطة عن الأوصاف المكتوبة معه"""
+    annotations = []
+    if _QUESTION_MARKS.search(text):
+        annotations.append(UNCERTAIN)
+        text = _QUESTION_MARKS.sub('', text)
+
+    def strip_annotation(match):
+        code = ANNOTATIONS.get(_SPACES.sub(' ', match.group(1)).strip())
+        if code is None:
+            # الأقواس التي تميز المكان (مثل فرع البنك) جزء من الاسم
+            return match.group(0)
+        if code not in annotations:
+            annotations.append(code)
+        return ' '
+
+    name = _SPACES.sub(' ', _PARENTHESES.sub(strip_annotation, text)).strip()
+    if not name:
+        # النص كله وصف - يبقى كما هو حتى لا تندمج نقاط مختلفة في محطة فارغة
+        name = _SPACES.sub(' ', text).strip()
+    return ParsedStop(name, normalize_arabic(name), tuple(sorted(annotations)))
+
+
+def canonical_stop_key(name: str) -> str:
+    """المفتاح الموحد لاسم المحطة المستخدم في كل الفهارس"""
+    return parse_stop(name).key
+
+
+class StopTable:
+    """ربط كل نص محطة برقم ثابت مع الأسماء البديلة والأوصاف"""
+
+    def __init__(self):
+        # المفتاح الموحد ← رقم المحطة
+        self.ids: Dict[str, int] = {}
+        # رقم المحطة ← الاسم المعروض (أول صيغة نظيفة ظهرت) ومفتاحه الموحد
+        self.names: List[str] = []
+        self.keys: List[str] = []
+        # رقم المحطة ← النصوص الأصلية التي تشير إليها
+        self.aliases: List[Set[str]] = []
+        # النص الأصلي ← (رقم المحطة، الأوصاف) حتى لا يُحلل النص مرتين
+        self._parsed: Dict[str, Tuple[int, Tuple[str, ...]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def intern(self, text: str) -> int:
+        """رقم المحطة لنص من keyPoints (وإنشاؤها إن لم تكن موجودة)"""
+        entry = self._parsed.get(text)
+        if entry is not None:
+            return entry[0]
+        parsed = parse_stop(text)
+        key = sys.intern(parsed.key)
+        stop_id = self.ids.get(key)
+        if stop_id is None:
+            stop_id = len(self.names)
+            self.ids[key] = stop_id
+            self.names.append(sys.intern(parsed.name))
+            self.keys.append(key)
+            self.aliases.append(set())
+        text = sys.intern(text)
+        self.aliases[stop_id].add(text)
+        self._parsed[text] = (stop_id, parsed.annotations)
+        return stop_id
+
+    def lookup(self, text: str) -> Optional[int]:
+        """رقم المحطة لنص (أصلي أو موحد) بدون إنشاء محطة جديدة"""
+        entry = self._parsed.get(text)
+        if entry is not None:
+            return entry[0]
+        return self.ids.get(canonical_stop_key(text))
+
+    def annotations(self, text: str) -> Tuple[str, ...]:
+        """أوصاف نص محطة كما ورد في keyPoints"""
+        entry = self._parsed.get(text)
+        return entry[1] if entry is not None else parse_stop(text).annotations
+
+    def containing(self, text: str) -> Set[int]:
+        """المحطات التي يحتوي مفتاحها على النص (بديل البحث الجزئي في النصوص)"""
+        key = canonical_stop_key(text)
+        if not key:
+            return set()
+        return {stop_id for stop_key, stop_id in self.ids.items() if key in stop_key}
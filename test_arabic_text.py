@@ -0,0 +1,28 @@
+import unittest
+from arabic_text import normalize_arabic, normalize_with_positions
+from routing_engine import TransitEngine
+from nlp_search import NLPSearchSystem
+
+class TestArabicText(unittest.TestCase):
+    def test_folds_spelling_variants(self):
+        self.assertEqual(normalize_arabic("المستشفى"), normalize_arabic("المستشفي"))
+        self.assertEqual(normalize_arabic("الجامعة"), normalize_arabic("الجامعه"))
+        self.assertEqual(normalize_arabic("إسكان أحمد"), "اسكان احمد")
+        self.assertEqual(normalize_arabic(" مَــدْرَسَة   ٣ "), "مدرسه 3")
+
+    def test_positions_map_back_to_original(self):
+        text = "  من الجامعـة ٣"
+        normalized, positions = normalize_with_positions(text)
+        self.assertEqual(normalized, normalize_arabic(text))
+        start = normalized.index("الجامعه")
+        self.assertEqual(text[positions[start]:positions[start + len("الجامعه")]], "الجامعـة")
+
+    def test_spelling_variants_are_exact_matches(self):
+        engine = TransitEngine([{"routeName": "Route 1", "keyPoints": ["المستشفى العام", "جامعة بورسعيد"], "fare": "5"}])
+        self.assertEqual(list(engine.resolve_location("المستشفي العام").values()), ['exact'])
+        system = NLPSearchSystem({"North": {"Places": ["جامعة بورسعيد"]}})
+        match = system.find_best_match("جامعه بورسعيد")
+        self.assertEqual((match['name'], match['score']), ("جامعة بورسعيد", 1.0))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+from unittest import mock
+import database_helper
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+
+ROUTES = [
+    {"routeName": "R1", "keyPoints": ["Alpha", "Beta"], "fare": "5"},
+    {"routeName": "R2", "keyPoints": ["Gamma", "Delta", "Epsilon"], "fare": "7"},
+]
+
+def locations(name, limit=10):
+    return [{'name': name, 'neighborhood': "North", 'category': "Places"}]
+
+class TestFindBestRouteWithTransfers(unittest.TestCase):
+    def find(self, planner, start, end):
+        with mock.patch.object(database_helper, 'search_locations_by_name', side_effect=locations), \
+             mock.patch.object(database_helper, 'get_transit_planner', return_value=planner):
+            return database_helper.find_best_route_with_transfers(start, end)
+
+    def test_direct_route(self):
+        result = self.find(JourneyPlanner(TransitEngine(ROUTES)), "Gamma", "Epsilon")
+        self.assertEqual(result['status'], 'direct_route_found')
+        self.assertEqual(result['routes'][0]['route']['name'], "R2")
+
+    def test_walk_before_single_ride_is_not_direct(self):
+        planner = JourneyPlanner(TransitEngine(ROUTES),
+                                 walking_transfers=[{'from_stop': "Alpha", 'to_stop': "Gamma", 'walking_time': 5}])
+        result = self.find(planner, "Alpha", "Epsilon")
+        self.assertEqual(result['status'], 'transfer_route_found')
+        legs = result['routes'][0]['journey']['legs']
+        self.assertEqual([leg['type'] for leg in legs], ['walk', 'ride'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from entity_extractor import AhoCorasick, LocationExtractor
+from nlp_search import NLPSearchSystem
+
+FROM_KEYWORDS = ['من', 'من عند']
+TO_KEYWORDS = ['إلى', 'الى', 'لـ', 'ل', 'اروح']
+PLACES = [("مول الفرما", "مول الفرما"), ("السلام", "السلام"), ("مستشفى السلام", "مستشفى السلام"),
+          ("الجامعه", "الجامعة"), ("الجامعة", "الجامعة")]
+
+class TestAhoCorasick(unittest.TestCase):
+    def test_reports_overlapping_matches(self):
+        automaton = AhoCorasick()
+        for pattern in ["he", "she", "his", "hers"]:
+            automaton.add(pattern, pattern)
+        matches = sorted((start, end, automaton.patterns[idx]) for start, end, idx in automaton.iter_matches("ushers"))
+        self.assertEqual(matches, [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")])
+
+class TestLocationExtractor(unittest.TestCase):
+    def setUp(self):
+        self.extractor = LocationExtractor(PLACES, FROM_KEYWORDS, TO_KEYWORDS)
+
+    def test_tags_origin_and_destination(self):
+        self.assertEqual(self.extractor.extract("من مول الفرما الى مستشفى السلام"), ("مول الفرما", "مستشفى السلام"))
+        self.assertEqual(self.extractor.extract("عايز اروح لمول الفرما من عند السلام"), ("السلام", "مول الفرما"))
+        self.assertEqual(self.extractor.extract("ازاي اروح الجامعه"), (None, "الجامعة"))
+
+    def test_longest_match_and_word_boundaries(self):
+        spans = self.extractor.spans("من مستشفى السلامة لـ السلام")
+        self.assertEqual([(kind, value) for _, _, kind, value in spans],
+                         [('from', 'من'), ('to', 'ل'), ('place', 'السلام')])
+
+    def test_fragments_without_known_places(self):
+        self.assertEqual(self.extractor.fragments("من البيت الى الكورنيش"), ("البيت", "الكورنيش"))
+        self.assertEqual(self.extractor.extract("من البيت الى الكورنيش"), (None, None))
+
+    def test_nlp_search_uses_known_places(self):
+        system = NLPSearchSystem({"North": {"Places": ["مول الفرما", "مستشفى السلام"]}})
+        self.assertEqual(system.extract_locations_from_text("من مول الفرما الى الكورنيش؟"), ("مول الفرما", "الكورنيش"))
+
+if __name__ == "__main__":
+    unittest.main()
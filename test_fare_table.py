@@ -0,0 +1,40 @@
+import unittest
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+from fare_table import FareTable, get_fare_table
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Alpha", "Beta", "Gamma"], "fare": "4.5 جنيه مصري (تعريفة موحدة)"},
+    {"routeName": "Route 2", "keyPoints": ["Gamma", "Delta"], "fare": "٧ جنيه"},
+    {"routeName": "Route 3", "keyPoints": ["Alpha", "Delta"], "fare": "12 جنيه"},
+]
+
+class TestFareTable(unittest.TestCase):
+    def test_numeric_tables(self):
+        table = FareTable(TransitEngine(ROUTES))
+        self.assertEqual(table.route_fares.tolist(), [4.5, 7.0, 12.0])
+        self.assertEqual(table.journey_fare([0, 1]), 11.5)
+        self.assertEqual(table.route_mask(7), 0b011)
+        self.assertEqual(table.route_mask(4), 0)
+
+    def test_cheapest_and_fare_limited_journeys(self):
+        engine = TransitEngine(ROUTES)
+        planner = JourneyPlanner(engine)
+        journeys = planner.plan("Alpha", "Delta")
+        self.assertEqual(journeys[0]['transfers'], 0)
+        cheapest = get_fare_table(engine).cheapest_first(journeys)
+        self.assertEqual([leg['route_idx'] for leg in cheapest[0]['legs']], [0, 1])
+        limited = planner.plan("Alpha", "Delta", max_fare=11.5)
+        self.assertEqual([journey['fare'] for journey in limited], [11.5])
+
+    def test_table_follows_route_edits(self):
+        engine = TransitEngine(ROUTES)
+        table = get_fare_table(engine)
+        engine.update_route(2, dict(ROUTES[2], fare="3 جنيه"))
+        self.assertIs(get_fare_table(engine), table)
+        self.assertEqual(table.route_fares[2], 3.0)
+        engine.remove_route(2)
+        self.assertEqual(get_fare_table(engine).route_mask(100), 0b011)
+
+if __name__ == "__main__":
+    unittest.main()
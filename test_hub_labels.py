@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+from route_distances import RouteDistances
+from benchmark_routing import make_synthetic_network
+from hub_labels import HubLabels, transit_graph, online_minutes, load_hub_labels
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Alpha", "Beta", "Gamma"], "fare": "5"},
+    {"routeName": "Route 2", "keyPoints": ["Gamma", "Delta"], "fare": "5"},
+    {"routeName": "Route 3", "keyPoints": ["Omega", "Kappa"], "fare": "5"},
+]
+WALKING = [{'from_stop': 'Delta', 'to_stop': 'Omega', 'walking_time': 3}]
+
+def _build(routes, walking_transfers=None):
+    engine = TransitEngine(routes)
+    planner = JourneyPlanner(engine, None, walking_transfers)
+    distances = RouteDistances(engine, {})
+    return engine, planner, distances, HubLabels.build(planner, distances)
+
+class TestHubLabels(unittest.TestCase):
+    def test_matches_online_search(self):
+        engine, planner, distances, labels = _build(make_synthetic_network(20, 300, stops_per_route=15))
+        _, graph = transit_graph(planner, distances)
+        stop_count = len(engine.stops.keys)
+        for source in range(0, stop_count, 7):
+            for target in range(0, stop_count, 11):
+                self.assertAlmostEqual(labels.stop_minutes(source, target),
+                                       online_minutes(graph, [source], [target]), places=3)
+
+    def test_landmark_minutes_and_unreachable(self):
+        engine, planner, distances, labels = _build(ROUTES, WALKING)
+        _, graph = transit_graph(planner, distances)
+        alpha, kappa = engine.resolve_best_stops("Alpha"), engine.resolve_best_stops("Kappa")
+        minutes = labels.minutes(alpha, kappa)
+        self.assertLess(minutes, float('inf'))
+        self.assertAlmostEqual(minutes, online_minutes(graph, alpha, kappa), places=3)
+        self.assertEqual(labels.minutes(kappa, alpha), float('inf'))
+
+    def test_save_and_load_checks_network(self):
+        _, planner, distances, labels = _build(ROUTES, WALKING)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'labels.npz')
+            labels.save(path)
+            loaded = load_hub_labels(planner, distances, path)
+            self.assertEqual(loaded.label_count(), labels.label_count())
+            _, other_planner, other_distances, _ = _build(ROUTES)
+            self.assertIsNone(load_hub_labels(other_planner, other_distances, path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+from route_distances import RouteDistances, DEFAULT_STOP_SPACING_M, VEHICLE_SPEED_M_PER_MIN
+from isochrone import Isochrone, BOARDING_WAIT_MINUTES
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Alpha", "Beta", "Gamma"], "fare": "5"},
+    {"routeName": "Route 2", "keyPoints": ["Gamma", "Delta"], "fare": "5"},
+    {"routeName": "Route 3", "keyPoints": ["Omega", "Kappa"], "fare": "5"},
+]
+LANDMARKS = [("Alpha", "North"), ("Beta", "North"), ("Gamma", "Center"), ("Delta", "South"), ("Kappa", "East")]
+# دقائق محطة واحدة على الخط بدون إحداثيات
+HOP = DEFAULT_STOP_SPACING_M / VEHICLE_SPEED_M_PER_MIN
+
+class TestIsochrone(unittest.TestCase):
+    def setUp(self):
+        engine = TransitEngine(ROUTES)
+        planner = JourneyPlanner(engine, [{'from_route_name': 'Route 2', 'to_route_name': 'Route 3',
+                                           'connection_point': 'Delta', 'walking_time': 3}])
+        self.isochrone = Isochrone(planner, RouteDistances(engine, {}), LANDMARKS)
+
+    def test_bounded_by_transfers(self):
+        results = self.isochrone.query("Alpha", max_minutes=None, max_transfers=0)
+        self.assertEqual([item['landmark'] for item in results], ["Beta", "Gamma"])
+        self.assertAlmostEqual(results[0]['minutes'], round(BOARDING_WAIT_MINUTES + HOP))
+        results = self.isochrone.query("Alpha", max_minutes=None, max_transfers=1)
+        self.assertEqual(results[-1], {'landmark': "Delta", 'neighborhood': "South",
+                                       'minutes': round(2 * BOARDING_WAIT_MINUTES + 3 * HOP), 'transfers': 1})
+
+    def test_bounded_by_minutes(self):
+        results = self.isochrone.query("Alpha", max_minutes=BOARDING_WAIT_MINUTES + HOP, max_transfers=2)
+        self.assertEqual([item['landmark'] for item in results], ["Beta"])
+        self.assertIs(self.isochrone.query("Alpha", BOARDING_WAIT_MINUTES + HOP, 2), results)
+
+if __name__ == "__main__":
+    unittest.main()
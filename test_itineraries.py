@@ -0,0 +1,57 @@
+import unittest
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+from route_distances import RouteDistances, DEFAULT_STOP_SPACING_M, VEHICLE_SPEED_M_PER_MIN
+from isochrone import BOARDING_WAIT_MINUTES
+from itineraries import ItinerarySearch
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Alpha", "Beta", "Gamma"], "fare": "5"},
+    {"routeName": "Route 2", "keyPoints": ["Gamma", "Delta"], "fare": "5"},
+    {"routeName": "Route 3", "keyPoints": ["Alpha", "Kappa", "Lambda", "Mu", "Delta"], "fare": "7"},
+    {"routeName": "Route 4", "keyPoints": ["Beta", "Delta"], "fare": "5"},
+]
+# دقائق محطة واحدة على الخط بدون إحداثيات
+HOP = DEFAULT_STOP_SPACING_M / VEHICLE_SPEED_M_PER_MIN
+
+def route_names(itinerary):
+    return [leg['route']['routeName'] for leg in itinerary['legs'] if leg['type'] == 'ride']
+
+class TestItineraries(unittest.TestCase):
+    def setUp(self):
+        engine = TransitEngine(ROUTES)
+        self.search = ItinerarySearch(JourneyPlanner(engine), RouteDistances(engine, {}))
+
+    def test_ranked_by_minutes_and_paged_from_saved_state(self):
+        first = self.search.alternatives("Alpha", "Delta", offset=0, count=2)
+        self.assertEqual([route_names(itinerary) for itinerary in first],
+                         [["Route 3"], ["Route 1", "Route 4"]])
+        self.assertEqual(first[0]['minutes'], round(BOARDING_WAIT_MINUTES + 4 * HOP))
+        self.assertEqual(first[1]['transfers'], 1)
+        self.assertEqual(first[1]['fare'], 10)
+
+        generator = self.search.generator("Alpha", "Delta")
+        more = self.search.alternatives("Alpha", "Delta", offset=2, count=2)
+        self.assertIs(self.search.generator("Alpha", "Delta"), generator)
+        self.assertEqual([route_names(itinerary) for itinerary in more], [["Route 1", "Route 2"]])
+        self.assertEqual(more[0]['minutes'], round(2 * BOARDING_WAIT_MINUTES + 3 * HOP))
+        self.assertTrue(generator.exhausted)
+
+    def test_bounded_by_transfers(self):
+        itineraries = self.search.alternatives("Alpha", "Delta", count=5, max_transfers=0)
+        self.assertEqual([route_names(itinerary) for itinerary in itineraries], [["Route 3"]])
+
+    def test_never_reboards_a_line_in_the_prefix(self):
+        routes = [
+            {"routeName": "A", "keyPoints": ["S", "X", "Y", "T"], "fare": "5"},
+            {"routeName": "B", "keyPoints": ["X", "Z", "Y"], "fare": "5"},
+            {"routeName": "C (رايح البلد)", "keyPoints": ["S", "Q"], "fare": "5"},
+            {"routeName": "C (راجع البلد)", "keyPoints": ["Q", "R", "T"], "fare": "5"},
+        ]
+        engine = TransitEngine(routes)
+        search = ItinerarySearch(JourneyPlanner(engine), RouteDistances(engine, {}))
+        names = [route_names(itinerary) for itinerary in search.alternatives("S", "T", count=10)]
+        self.assertEqual(names, [["A"]])
+
+if __name__ == "__main__":
+    unittest.main()
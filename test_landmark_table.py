@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import landmark_table
+from landmark_table import rebuild_table, load_landmark_table
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Alpha Stop", "Beta", "Gamma", "Delta"], "fare": "5 جنيه"},
+    {"routeName": "Route 2", "keyPoints": ["Delta", "Gamma", "Epsilon"], "fare": "7 جنيه"},
+]
+NEIGHBORHOODS = {"North": {"Places": ["Beta", "Delta", "Gamma"]}, "South": {"Places": ["Epsilon"]}}
+
+class TestLandmarkTable(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'table.bin')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookup_matches_direct_routes(self):
+        rebuild_table(ROUTES, NEIGHBORHOODS, self.path, processes=1)
+        table = load_landmark_table(ROUTES, self.path)
+        self.assertEqual(table.lookup("Beta", "Delta"), [0])
+        self.assertEqual(table.lookup("Gamma", "Delta"), [0])
+        self.assertEqual(table.lookup("Delta", "Gamma"), [1])
+        self.assertEqual(table.lookup("Epsilon", "Beta"), [])
+        self.assertIsNone(table.lookup("Unknown", "Beta"))
+        table.close()
+
+    def test_partial_rebuild_adds_landmark(self):
+        rebuild_table(ROUTES, NEIGHBORHOODS, self.path, processes=1)
+        neighborhoods = {"North": {"Places": ["Beta", "Delta", "Gamma", "Alpha"]}, "South": {"Places": ["Epsilon"]}}
+        result = rebuild_table(ROUTES, neighborhoods, self.path, processes=1, touched_landmarks=[])
+        self.assertTrue(result['partial'])
+        self.assertEqual(result['recomputed'], 1)
+        table = load_landmark_table(ROUTES, self.path)
+        self.assertEqual(table.lookup("Alpha", "Epsilon"), [])
+        self.assertEqual(table.lookup("Alpha", "Gamma"), [0])
+        self.assertEqual(table.lookup("Delta", "Epsilon"), [1])
+        table.close()
+
+    def test_rejects_table_for_other_routes(self):
+        rebuild_table(ROUTES, NEIGHBORHOODS, self.path, processes=1)
+        self.assertIsNone(load_landmark_table(ROUTES[:1], self.path))
+
+    def test_rejects_table_from_older_matcher(self):
+        rebuild_table(ROUTES, NEIGHBORHOODS, self.path, processes=1)
+        with mock.patch.object(landmark_table, 'MATCHER_VERSION', landmark_table.MATCHER_VERSION + 1):
+            self.assertIsNone(load_landmark_table(ROUTES, self.path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import unittest
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+from network_analysis import ReachabilityAnalysis
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Alpha", "Beta", "Gamma"], "fare": "5"},
+    {"routeName": "Route 2", "keyPoints": ["Gamma", "Delta"], "fare": "7"},
+    {"routeName": "Route 3", "keyPoints": ["Kappa", "Omega"], "fare": "4"},
+]
+LOCATIONS = [("Alpha", "North"), ("Beta", "North"), ("Delta", "South"), ("Omega", "East"), ("Nowhere", "East")]
+
+class TestReachabilityAnalysis(unittest.TestCase):
+    def setUp(self):
+        engine = TransitEngine(ROUTES)
+        self.planner = JourneyPlanner(engine, walking_transfers=[
+            {"from_stop": "Delta", "to_stop": "Kappa", "walking_time": 3}])
+        self.analysis = ReachabilityAnalysis(self.planner, max_transfers=2)
+        self.stop = engine.stop_ids
+
+    def test_matches_planner(self):
+        for source in self.stop.values():
+            for target in self.stop.values():
+                if source == target:
+                    continue
+                for k in range(3):
+                    expected = bool(self.planner.plan_between_stops([source], [target], max_transfers=k))
+                    self.assertEqual(bool(self.analysis.reach[k][source, target]), expected)
+
+    def test_neighborhood_report(self):
+        heatmap = self.analysis.neighborhood_heatmap(LOCATIONS, transfers=1)
+        self.assertEqual(heatmap['neighborhoods'], ["East", "North", "South"])
+        # North ← South: المعلمان في North يصلان إلى Delta بتبديل واحد
+        self.assertEqual(heatmap['matrix'][1][2], 1.0)
+        report = self.analysis.badly_connected_report(LOCATIONS, transfers=1)
+        self.assertEqual(report[0]['neighborhood'], "East")
+        self.assertEqual(report[0]['unserved_landmarks'], ["Nowhere"])
+        self.assertTrue(report[0]['poor'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,26 @@
+import random
+import unittest
+from ngram_index import NGramIndex, char_ngrams
+from nlp_search import NLPSearchSystem
+from benchmark_matching import make_synthetic_landmarks, misspell, _scan_best_match
+
+class TestNGramIndex(unittest.TestCase):
+    def test_short_words_have_ngrams(self):
+        self.assertEqual(char_ngrams("مول"), [" مو", "مول", "ول "])
+
+    def test_shortlist_keeps_index_order(self):
+        index = NGramIndex(["مستشفى السلام", "مول الفرما", "مستشفى الزهور"])
+        self.assertEqual(index.shortlist("مستشفي الزهور", "الفرما", limit=1), ["مول الفرما", "مستشفى الزهور"])
+        self.assertEqual(index.shortlist("xyz"), [])
+
+    def test_best_match_agrees_with_full_scan(self):
+        system = NLPSearchSystem(make_synthetic_landmarks(1000))
+        rng = random.Random(3)
+        names = list(system.landmarks_index)
+        for _ in range(30):
+            query = misspell(rng.choice(names), rng)
+            match = system.find_best_match(query)
+            self.assertEqual(match['name'] if match else None, _scan_best_match(system, query))
+
+if __name__ == "__main__":
+    unittest.main()
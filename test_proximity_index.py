@@ -0,0 +1,39 @@
+import unittest
+from proximity_index import ProximityIndex, get_proximity_index
+
+ROUTES = [
+    {"routeName": "Line A (outbound)", "keyPoints": ["North Gate", "Market", "Harbor"], "fare": "5"},
+    {"routeName": "Line A (return)", "keyPoints": ["Harbor", "Market", "North Gate"], "fare": "5"},
+]
+NEIGHBORHOODS = {
+    "Center": {"Places": [
+        {"name": "Old Mosque", "served_by": {"Line A": {"proximity": "قريبة جدا", "nearest_stop": "north gate"}}},
+        {"name": "Fish Port", "served_by": {"Line A": {"proximity": "متوسطة", "nearest_stop": "Harbor"}}},
+        {"name": "Far Farm", "served_by": {"Line A": {"proximity": "بعيدة", "nearest_stop": "Market"}}},
+    ]}
+}
+
+class TestProximityIndex(unittest.TestCase):
+    def test_landmark_lookup_is_case_insensitive(self):
+        index = ProximityIndex(ROUTES, NEIGHBORHOODS)
+        self.assertEqual(index.get_landmark(" old mosque ")['neighborhood'], "Center")
+        self.assertIsNone(index.get_landmark("Unknown"))
+
+    def test_direction_picks_matching_variant(self):
+        index = ProximityIndex(ROUTES, NEIGHBORHOODS)
+        start, end = index.get_landmark("Old Mosque"), index.get_landmark("Fish Port")
+        options = index.find_direct_options("Old Mosque", "Fish Port", start, end)
+        self.assertEqual([o['routeName'] for o in options], ["Line A (outbound)"])
+        options = index.find_direct_options("Fish Port", "Old Mosque", end, start)
+        self.assertEqual([o['routeName'] for o in options], ["Line A (return)"])
+
+    def test_far_proximity_is_rejected(self):
+        index = ProximityIndex(ROUTES, NEIGHBORHOODS)
+        start, end = index.get_landmark("Old Mosque"), index.get_landmark("Far Farm")
+        self.assertEqual(index.find_direct_options("Old Mosque", "Far Farm", start, end), [])
+
+    def test_index_is_built_once(self):
+        self.assertIs(get_proximity_index(ROUTES, NEIGHBORHOODS), get_proximity_index(ROUTES, NEIGHBORHOODS))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+import route_cache
+from route_cache import RouteAnswerCache, bump_data_version
+from datetime import datetime, timedelta
+from route_deltas import RouteDeltaFeed, publish_route_delta, latest_delta_seq, compact_delta_log
+from routing_engine import TransitEngine
+
+class TestRouteAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.original_file = route_cache.DATA_VERSION_FILE
+        route_cache.DATA_VERSION_FILE = os.path.join(self.tmpdir.name, 'data_version.json')
+
+    def tearDown(self):
+        route_cache.DATA_VERSION_FILE = self.original_file
+        self.tmpdir.cleanup()
+
+    def test_hit_after_put_with_normalized_key(self):
+        cache = RouteAnswerCache()
+        self.assertIsNone(cache.get("Hospital", "University"))
+        cache.put("Hospital", "University", ["Route 1"], "text")
+        self.assertEqual(cache.get("  hospital ", "UNIVERSITY")['text'], "text")
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_answers_are_scoped_to_routes_list(self):
+        cache = RouteAnswerCache()
+        routes, other_routes = [{"routeName": "Route 1"}], [{"routeName": "Route 2"}]
+        cache.put("a", "b", routes, "all routes", routes=routes)
+        self.assertIsNone(cache.get("a", "b", routes=other_routes))
+        self.assertEqual(cache.get("a", "b", routes=routes)['text'], "all routes")
+
+    def test_version_bump_invalidates(self):
+        cache = RouteAnswerCache()
+        cache.put("a", "b", [], "old")
+        bump_data_version('test')
+        self.assertIsNone(cache.get("a", "b"))
+
+    def test_lru_eviction_and_ttl(self):
+        cache = RouteAnswerCache(maxsize=2)
+        cache.put("a", "b", [], "1")
+        cache.put("c", "d", [], "2")
+        cache.get("a", "b")
+        cache.put("e", "f", [], "3")
+        self.assertIsNone(cache.get("c", "d"))
+        self.assertIsNotNone(cache.get("a", "b"))
+        expired = RouteAnswerCache(ttl_seconds=-1)
+        expired.put("a", "b", [], "1")
+        self.assertIsNone(expired.get("a", "b"))
+
+    def test_invalidate_only_affected_answers(self):
+        cache = RouteAnswerCache()
+        cache.put("a", "b", [{"routeName": "Route 1"}], "1")
+        cache.put("c", "d", [{"routeName": "Route 2"}], "2")
+        dropped = cache.invalidate(lambda start, end, result: result[0]['routeName'] == "Route 1")
+        self.assertEqual(dropped, 1)
+        self.assertIsNone(cache.get("a", "b"))
+        self.assertIsNotNone(cache.get("c", "d"))
+
+class TestRouteDeltaFeed(unittest.TestCase):
+    def test_feed_applies_only_new_deltas(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'route_deltas.jsonl')
+            publish_route_delta('add', {"routeName": "Old", "keyPoints": ["A", "B"]}, path=path)
+            engine = TransitEngine([{"routeName": "Route 1", "keyPoints": ["A", "B"]}])
+            feed = RouteDeltaFeed(path)
+            self.assertEqual(feed.sync(engine), [])
+            publish_route_delta('update', {"routeName": "Route 1", "keyPoints": ["B", "A"]}, "Route 1", path=path)
+            publish_route_delta('add', {"routeName": "Route 2", "keyPoints": ["A", "C"]}, path=path)
+            applied = feed.sync(engine)
+            self.assertEqual([route_idx for _, route_idx in applied], [0, 1])
+            self.assertEqual(feed.last_seq, 3)
+            self.assertEqual(engine.batch_direct_routes([("B", "A"), ("A", "C")]), [[0], [1]])
+
+    def test_removed_route_is_not_active(self):
+        engine = TransitEngine([{"routeName": "Route 1", "keyPoints": ["A", "B"]}, {"routeName": "Route 2", "keyPoints": ["B", "C"]}])
+        engine.apply_delta({'op': 'remove', 'route': {"routeName": "Route 1"}})
+        self.assertEqual([route['routeName'] for route in engine.active_routes()], ["Route 2"])
+
+    def test_compaction_keeps_seq_and_unapplied_deltas(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'route_deltas.jsonl')
+            for name in ("R1", "R2", "R3"):
+                publish_route_delta('add', {"routeName": name, "keyPoints": ["A", "B"]}, path=path)
+            feed = RouteDeltaFeed(path)
+            # data_dynamic.py كُتبت بعد التعديل الثاني
+            self.assertEqual(compact_delta_log(2, path=path), 0)
+            self.assertEqual(compact_delta_log(2, path=path, now=datetime.now() + timedelta(days=2)), 2)
+            self.assertEqual(latest_delta_seq(path), 3)
+            self.assertEqual(publish_route_delta('add', {"routeName": "R4", "keyPoints": ["A", "C"]}, path=path), 4)
+            self.assertEqual([delta['seq'] for delta in feed.poll()], [4])
+            # بوت يبدأ من data_dynamic.py بعد التعديل الثاني يطبق الثالث والرابع فقط
+            restarted = RouteDeltaFeed(path, applied_seq=2)
+            self.assertEqual([delta['seq'] for delta in restarted.poll()], [3, 4])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,28 @@
+import unittest
+from spatial_index import haversine_m
+from routing_engine import TransitEngine
+from route_distances import RouteDistances, ROAD_DETOUR_FACTOR
+
+# نقاط على خط عرض واحد بفارق ~950 متر تقريباً
+COORDINATES = {"Beta": (31.25, 32.300), "Gamma": (31.25, 32.310), "Delta": (31.25, 32.320), "Epsilon": (31.25, 32.330)}
+
+class TestRouteDistances(unittest.TestCase):
+    def test_cumulative_route_distances(self):
+        engine = TransitEngine([{"routeName": "Route 4", "keyPoints": ["Beta", "Unknown", "Delta", "Epsilon", "Far"]}])
+        distances = RouteDistances(engine, COORDINATES)
+        leg = haversine_m(31.25, 32.300, 31.25, 32.320) * ROAD_DETOUR_FACTOR
+        self.assertAlmostEqual(distances.distance_m(0, 0, 2), leg, places=3)
+        # المحطة بدون إحداثيات في منتصف المسافة بين جارتيها
+        self.assertAlmostEqual(distances.distance_m(0, 0, 1), leg / 2, places=3)
+        self.assertGreater(distances.distance_m(0, 3, 4), 0)
+        self.assertGreaterEqual(distances.in_vehicle_minutes(0, 0, 4), 1)
+
+    def test_routes_without_coordinates_have_no_estimate(self):
+        engine = TransitEngine([{"routeName": "Route 4", "keyPoints": ["Beta", "Delta"]},
+                                {"routeName": "Route 5", "keyPoints": ["Beta", "Nowhere", "Far"]}])
+        distances = RouteDistances(engine, COORDINATES)
+        self.assertEqual((distances.has_estimate(0), distances.has_estimate(1)), (True, False))
+        self.assertEqual(distances.estimated_mask, 0b01)
+
+if __name__ == "__main__":
+    unittest.main()
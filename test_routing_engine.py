@@ -0,0 +1,165 @@
+import unittest
+from routing_engine import TransitEngine, get_engine, parse_route_variant, minimal_segment
+from stop_table import parse_stop
+from journey_planner import JourneyPlanner
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Alpha Stop", "Beta", "Gamma", "Delta"], "fare": "5 جنيه"},
+    {"routeName": "Route 2", "keyPoints": ["Delta", "Gamma", "Epsilon"], "fare": "7 جنيه"},
+]
+
+class TestTransitEngine(unittest.TestCase):
+    def test_direct_route_in_order(self):
+        engine = TransitEngine(ROUTES)
+        result = engine.find_direct_routes("Beta", "Delta")
+        self.assertEqual([r['route']['routeName'] for r in result], ["Route 1"])
+        self.assertEqual(result[0]['matches'][0]['start_idx'], 1)
+        self.assertEqual(result[0]['matches'][0]['end_idx'], 3)
+
+    def test_wrong_direction(self):
+        engine = TransitEngine(ROUTES)
+        result = engine.find_direct_routes("Gamma", "Delta")
+        self.assertEqual([r['route']['routeName'] for r in result], ["Route 1"])
+        self.assertEqual(engine.find_direct_routes("Epsilon", "Delta"), [])
+
+    def test_partial_match_types(self):
+        engine = TransitEngine(ROUTES)
+        result = engine.find_direct_routes("alpha", "delta")
+        self.assertEqual(result[0]['matches'][0]['start_type'], 'partial')
+        self.assertEqual(result[0]['matches'][0]['end_type'], 'exact')
+        self.assertEqual(engine.find_direct_routes("alpha", "delta", match_types=('exact',)), [])
+
+    def test_stop_masks_and_batch_direct_routes(self):
+        engine = TransitEngine(ROUTES)
+        self.assertEqual(engine.stop_masks[engine.stop_ids['gamma']], 0b11)
+        self.assertEqual(engine.batch_direct_routes([("Beta", "Delta"), ("Delta", "Gamma"), ("Epsilon", "Beta")]),
+                         [[0], [1], []])
+        self.assertTrue(engine.has_direct_route("Gamma", "Delta"))
+        self.assertFalse(engine.has_direct_route("Epsilon", "Delta"))
+
+    def test_repeated_stops_use_minimal_segment(self):
+        engine = TransitEngine([
+            {"routeName": "Loop", "keyPoints": ["Alpha", "Beta", "Gamma", "Delta", "Gamma", "Beta", "Epsilon"]},
+        ])
+        self.assertEqual(minimal_segment([1, 5], [2, 4]), (1, 2))
+        self.assertIsNone(minimal_segment([5], [2, 4]))
+        match = engine.find_direct_routes("Beta", "Gamma")[0]['matches'][0]
+        self.assertEqual((match['start_idx'], match['end_idx'], match['intermediate_stops']), (1, 2, 0))
+        match = engine.find_direct_routes("Gamma", "Beta")[0]['matches'][0]
+        self.assertEqual((match['start_idx'], match['end_idx']), (4, 5))
+
+    def test_direction_variants_are_paired(self):
+        engine = TransitEngine([
+            {"routeName": "خط السلام (رايح البلد)", "keyPoints": ["Alpha", "Beta"]},
+            {"routeName": "خط السلام (راجع - المسار الخارجي)", "keyPoints": ["Beta", "Alpha"]},
+            {"routeName": "خط الامين (راجع)", "keyPoints": ["Beta", "Alpha"]},
+        ])
+        self.assertEqual(parse_route_variant("خط السلام (راجع - المسار الخارجي)"),
+                         ("خط السلام", "inbound", "المسار الخارجي"))
+        self.assertEqual(engine.reverse_routes(0), [1])
+        self.assertEqual(engine.reverse_routes(1), [0])
+        self.assertEqual(engine.reverse_routes(2), [])
+        engine.remove_route(1)
+        self.assertEqual(engine.reverse_routes(0), [])
+
+    def test_return_trip_uses_paired_variants_only(self):
+        engine = TransitEngine([
+            {"routeName": "خط السلام (رايح)", "keyPoints": ["Alpha", "Beta", "Gamma"]},
+            {"routeName": "خط السلام (راجع)", "keyPoints": ["Gamma", "Alpha"]},
+            {"routeName": "خط الامين (راجع)", "keyPoints": ["Gamma", "Alpha"]},
+            {"routeName": "خط النور (راجع)", "keyPoints": ["Alpha", "Gamma"]},
+        ])
+        forward = [route_info['route_idx'] for route_info in engine.find_direct_routes("Alpha", "Gamma")]
+        self.assertEqual(forward, [0, 3])
+        backward = engine.reverse_direct_routes(forward, "Gamma", "Alpha")
+        self.assertEqual([route_info['route_idx'] for route_info in backward], [1])
+        self.assertEqual((backward[0]['matches'][0]['start_idx'], backward[0]['matches'][0]['end_idx']), (0, 1))
+        # اتجاه العودة لا يخدم الرحلة بالترتيب الصحيح
+        self.assertEqual(engine.reverse_direct_routes(forward, "Alpha", "Gamma"), [])
+        self.assertEqual(engine.reverse_direct_routes([3], "Gamma", "Alpha"), [])
+
+    def test_engine_is_built_once(self):
+        self.assertIs(get_engine(ROUTES), get_engine(ROUTES))
+
+class TestTransferTable(unittest.TestCase):
+    def test_shared_and_fuzzy_transfer_points(self):
+        routes = ROUTES + [{"routeName": "Route 3", "keyPoints": ["Epsilon Gate", "Omega"], "fare": "4 جنيه"}]
+        engine = TransitEngine(routes)
+        self.assertEqual(engine.transfer_points(0, 1), [(2, 1), (3, 0)])
+        self.assertEqual(engine.transfer_points(1, 2), [(2, 0)])
+        self.assertEqual(engine.transfer_points(0, 2), [])
+        journeys = JourneyPlanner(engine).plan("Beta", "Omega")
+        self.assertEqual([leg['type'] for leg in journeys[0]['legs']], ['ride', 'ride', 'ride'])
+
+    def test_update_route_rebuilds_its_rows(self):
+        engine = TransitEngine([dict(route) for route in ROUTES])
+        engine.update_route(1, {"routeName": "Route 2", "keyPoints": ["Beta", "Zeta"], "fare": "7"})
+        self.assertEqual(engine.transfer_points(0, 1), [(1, 0)])
+        self.assertEqual(engine.transfer_points(1, 0), [(0, 1)])
+        self.assertEqual(engine.find_direct_routes("Delta", "Epsilon"), [])
+        self.assertEqual(engine.transfer_table.rows, TransitEngine(engine.routes).transfer_table.rows)
+
+    def test_apply_route_deltas(self):
+        routes = [dict(route) for route in ROUTES]
+        engine = TransitEngine(routes)
+        added = engine.apply_delta({"op": "add", "route": {"routeName": "Route 3", "keyPoints": ["Epsilon", "Zeta"]}})
+        self.assertEqual(engine.find_direct_routes("Epsilon", "Zeta")[0]['route_idx'], added)
+        engine.apply_delta({"op": "update", "old_name": "Route 1",
+                            "route": {"routeName": "Route 1b", "keyPoints": ["Beta", "Zeta"], "fare": "5"}})
+        self.assertEqual(engine.find_direct_routes("Beta", "Delta"), [])
+        self.assertEqual(engine.apply_delta({"op": "remove", "route": {"routeName": "Route 2"}}), 1)
+        self.assertEqual(engine.find_direct_routes("Gamma", "Epsilon"), [])
+        self.assertIsNone(engine.find_route_index("Route 2"))
+        # قائمة الخطوط الأصلية تبقى متطابقة مع أرقام الفهرس
+        self.assertEqual([route['routeName'] for route in routes], ["Route 1b", "Route 2", "Route 3"])
+        self.assertEqual(engine.transfer_table.rows, TransitEngine(engine.routes).transfer_table.rows)
+
+class TestStopTable(unittest.TestCase):
+    def test_parse_annotations(self):
+        parsed = parse_stop("(بالقرب من) مدرسة البنزينة؟")
+        self.assertEqual(parsed.name, "مدرسة البنزينة")
+        self.assertEqual(parsed.annotations, ("near", "uncertain"))
+        self.assertEqual(parse_stop("بنك مصر (فرع الصباح)").name, "بنك مصر (فرع الصباح)")
+
+    def test_aliases_share_one_stop(self):
+        engine = TransitEngine([
+            {"routeName": "Route 1", "keyPoints": [" Church", "Beta"]},
+            {"routeName": "Route 2", "keyPoints": ["Beta", "(بالقرب من) church"]},
+        ])
+        church = engine.stops.lookup("Church")
+        self.assertEqual(engine.stops.aliases[church], {" Church", "(بالقرب من) church"})
+        self.assertEqual(engine.stop_annotations(1, 1), ("near",))
+        self.assertEqual(engine.transfer_points(0, 1), [(0, 1), (1, 0)])
+
+class TestTokenIndex(unittest.TestCase):
+    def test_generic_word_alone_is_not_a_keyword_match(self):
+        engine = TransitEngine([
+            {"routeName": "Route 1", "keyPoints": ["شارع الثلاثيني", "شارع محمد علي", "مستشفى النصر"]},
+            {"routeName": "Route 2", "keyPoints": ["شارع أسوان", "شارع 23 يوليو", "مدرسة النصر"]},
+        ])
+        matches = engine.resolve_location_scored("شارع النصر")
+        names = {engine.stop_names[stop_id]: match for stop_id, match in matches.items()}
+        self.assertEqual(set(names), {"مستشفى النصر", "مدرسة النصر"})
+        self.assertTrue(all(match_type == 'keyword' and 0 < confidence < 0.5 for match_type, confidence in names.values()))
+        self.assertEqual(engine.resolve_location_scored("شارع أسوان")[engine.stops.lookup("شارع أسوان")], ('exact', 1.0))
+
+class TestJourneyPlanner(unittest.TestCase):
+    def test_transfer_at_shared_stop(self):
+        planner = JourneyPlanner(TransitEngine(ROUTES))
+        journeys = planner.plan("Beta", "Epsilon")
+        self.assertEqual(journeys[0]['transfers'], 1)
+        self.assertEqual(journeys[0]['fare'], 12.0)
+        self.assertEqual([leg['route']['routeName'] for leg in journeys[0]['legs']], ["Route 1", "Route 2"])
+
+    def test_transfer_through_walking_connection(self):
+        routes = ROUTES + [{"routeName": "Route 3", "keyPoints": ["East Gate", "Omega"], "fare": "4 جنيه"}]
+        self.assertEqual(JourneyPlanner(TransitEngine(routes)).plan("Beta", "Omega"), [])
+        connection = {'from_route_name': 'Route 2', 'to_route_name': 'Route 3',
+                      'connection_point': 'Epsilon / East Gate', 'walking_time': 5}
+        journeys = JourneyPlanner(TransitEngine(routes), [connection]).plan("Beta", "Omega")
+        self.assertEqual(journeys[0]['transfers'], 2)
+        self.assertEqual(journeys[0]['walking_minutes'], 5.0)
+        self.assertEqual([leg['type'] for leg in journeys[0]['legs']], ['ride', 'ride', 'walk', 'ride'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+from spatial_index import SpatialIndex, parse_coordinates, build_stop_index, haversine_m
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Beta", "Gamma", "Delta"], "fare": "5"},
+    {"routeName": "Route 2", "keyPoints": ["Delta", "Epsilon"], "fare": "7"},
+]
+# نقاط على خط عرض واحد بفارق ~950 متر تقريباً
+COORDINATES = {"Beta": (31.25, 32.300), "Gamma": (31.25, 32.310), "Delta": (31.25, 32.320), "Epsilon": (31.25, 32.330)}
+
+class TestSpatialIndex(unittest.TestCase):
+    def test_parse_coordinates(self):
+        self.assertEqual(parse_coordinates("31.2398, 32.2842"), (31.2398, 32.2842))
+        self.assertEqual(parse_coordinates({"lat": 31.2, "lng": 32.1}), (31.2, 32.1))
+        self.assertIsNone(parse_coordinates("غير معروف"))
+
+    def test_nearest_within_radius(self):
+        index = SpatialIndex([(name, lat, lng) for name, (lat, lng) in COORDINATES.items()], cell_size_m=200)
+        result = index.nearest(31.25, 32.3005, k=2, radius_m=1200)
+        self.assertEqual([key for key, _ in result], ["Beta", "Gamma"])
+        self.assertAlmostEqual(result[0][1], haversine_m(31.25, 32.3005, 31.25, 32.300), places=3)
+        self.assertEqual(index.nearest(31.30, 32.30, k=3, radius_m=500), [])
+
+    def test_plan_from_coordinates(self):
+        engine = TransitEngine(ROUTES)
+        stops = build_stop_index(engine, COORDINATES)
+        journeys = JourneyPlanner(engine).plan_from_coordinates((31.2505, 32.300), (31.2505, 32.330), stops, radius_m=300)
+        self.assertEqual(journeys[0]['transfers'], 1)
+        self.assertGreater(journeys[0]['walking_minutes'], 0)
+
+    def test_plan_from_coordinates_alights_next_to_destination(self):
+        engine = TransitEngine(ROUTES[:1])
+        stops = build_stop_index(engine, COORDINATES)
+        journeys = JourneyPlanner(engine).plan_from_coordinates((31.2505, 32.300), (31.2505, 32.320), stops, radius_m=1000)
+        self.assertEqual(len(journeys), 1)
+        self.assertEqual(journeys[0]['legs'][-1]['alight_stop'], "Delta")
+        self.assertLess(journeys[0]['walking_minutes'], 2)
+
+if __name__ == "__main__":
+    unittest.main()
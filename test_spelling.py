@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from spelling import SpellingCorrector, edit_distance
+from nlp_search import NLPSearchSystem
+from route_deltas import RouteDeltaFeed, publish_location_delta
+
+class TestSpellingCorrector(unittest.TestCase):
+    def test_edit_distance_with_transposition(self):
+        self.assertEqual(edit_distance("السلام", "السلام", 2), 0)
+        self.assertEqual(edit_distance("السلام", "السلما", 2), 1)
+        self.assertEqual(edit_distance("السلام", "النور", 2), 3)
+
+    def test_corrects_tokens_within_two_edits(self):
+        corrector = SpellingCorrector(["مستشفى السلام", "مول الفرما", "مدرسة النور"])
+        self.assertEqual(corrector.correct("مستشفي السلم"), "مستشفي السلام")
+        self.assertEqual(corrector.correct("مول الفرمااا"), "مول الفرما")
+        # الكلمات القصيرة أو البعيدة تبقى كما هي
+        self.assertEqual(corrector.correct("من بيتنا"), "من بيتنا")
+
+    def test_incremental_add(self):
+        corrector = SpellingCorrector(["مول الفرما"])
+        self.assertEqual(corrector.correct("الكورنيس"), "الكورنيس")
+        corrector.add_texts(["الكورنيش"])
+        self.assertEqual(corrector.correct("الكورنيس"), "الكورنيش")
+
+    def test_location_delta_reaches_nlp_search(self):
+        system = NLPSearchSystem({"North": {"Places": ["مستشفى السلام"]}})
+        self.assertEqual(system.find_best_match("مستشفي السلم")['name'], "مستشفى السلام")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'location_deltas.jsonl')
+            feed = RouteDeltaFeed(path)
+            publish_location_delta({'name': "نادي المصري", 'neighborhood': "South", 'category': "Clubs"}, path=path)
+            for delta in feed.poll():
+                location = delta['location']
+                system.add_landmark(location['name'], location['neighborhood'], location['category'])
+        self.assertEqual(system.find_best_match("نادى المصرى")['score'], 1.0)
+        self.assertEqual(system.find_best_match("نادي المصرري")['info']['neighborhood'], "South")
+
+if __name__ == "__main__":
+    unittest.main()
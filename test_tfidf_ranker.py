@@ -0,0 +1,50 @@
+import random
+import unittest
+from collections import Counter
+import numpy as np
+from arabic_text import normalize_arabic
+from ngram_index import char_ngrams
+from tfidf_ranker import TfidfRanker
+from nlp_search import NLPSearchSystem
+from benchmark_matching import make_synthetic_landmarks, misspell
+
+class TestTfidfRanker(unittest.TestCase):
+    def setUp(self):
+        self.ranker = TfidfRanker(["مستشفى السلام", "مستشفى الزهور", "مول الفرما", "مسجد السلام"])
+
+    def test_scores_match_dense_cosine(self):
+        query = "مستشفي السلام"
+        grams = sorted(self.ranker.columns, key=self.ranker.columns.get)
+        def dense(text):
+            counts = Counter(char_ngrams(normalize_arabic(text)))
+            vector = np.array([counts[gram] for gram in grams], dtype=float) * self.ranker.idf
+            return vector / np.linalg.norm(vector)
+        expected = [dense(name) @ dense(query) for name in self.ranker.names]
+        np.testing.assert_allclose(self.ranker.scores(query), expected)
+
+    def test_top_k_is_sorted_and_drops_zero_scores(self):
+        top = self.ranker.top_k("مستشفى السلام", k=3)
+        self.assertEqual(top[0][0], "مستشفى السلام")
+        self.assertAlmostEqual(top[0][1], 1.0)
+        self.assertEqual([score for _, score in top], sorted((score for _, score in top), reverse=True))
+        self.assertEqual(len(self.ranker.top_k("مول", k=10)), 1)
+        self.assertEqual(self.ranker.top_k("xyz"), [])
+
+    def test_top_matches_contain_misspelled_name(self):
+        system = NLPSearchSystem(make_synthetic_landmarks(1000))
+        rng = random.Random(4)
+        names = [info['data']['name'] for info in system.landmarks_index.values()]
+        found = 0
+        for _ in range(30):
+            name = rng.choice(names)
+            found += name in [match['name'] for match in system.find_top_matches(misspell(name, rng))]
+        self.assertGreaterEqual(found, 28)
+
+    def test_added_landmark_is_ranked(self):
+        system = NLPSearchSystem({"حي الشرق": {"مول": ["مول الفرما"]}})
+        self.assertEqual(system.get_suggestions_for_text("نادي المريخ"), ["مول الفرما - حي الشرق"])
+        system.add_landmark("نادي المريخ", "حي الضواحي", "نادي")
+        self.assertEqual(system.get_suggestions_for_text("نادى المريخ")[0], "نادي المريخ - حي الضواحي")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,25 @@
+import unittest
+from routing_engine import TransitEngine
+from journey_planner import JourneyPlanner
+from transfer_inference import infer_walking_transfers
+
+ROUTES = [
+    {"routeName": "Route 1", "keyPoints": ["Beta", "Gamma", "Delta"], "fare": "5"},
+    {"routeName": "Route 2", "keyPoints": ["Delta", "Epsilon"], "fare": "7"},
+]
+# نقاط على خط عرض واحد بفارق ~950 متر تقريباً
+COORDINATES = {"Beta": (31.25, 32.300), "Gamma": (31.25, 32.310), "Delta": (31.25, 32.320), "Epsilon": (31.25, 32.330)}
+
+class TestWalkingTransferInference(unittest.TestCase):
+    def test_infers_transfer_between_close_stops_on_different_routes(self):
+        routes = ROUTES + [{"routeName": "Route 3", "keyPoints": ["Kappa", "Omega"], "fare": "4"}]
+        coordinates = dict(COORDINATES, Kappa=(31.2515, 32.330), Omega=(31.26, 32.35))
+        engine = TransitEngine(routes)
+        transfers = infer_walking_transfers(engine, coordinates, max_distance_m=300)
+        self.assertEqual([(t['from_stop'], t['to_stop']) for t in transfers], [("Epsilon", "Kappa")])
+        self.assertEqual(transfers[0]['walking_time'], 3)
+        journeys = JourneyPlanner(engine, walking_transfers=transfers).plan("Beta", "Omega")
+        self.assertEqual(journeys[0]['walking_minutes'], 3.0)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+ترتيب أقرب المعالم لنص البحث بأوزان TF-IDF على المقاطع الحرفية
+كل أسماء المعالم مصفوفة متفرقة (مقطع ← المعالم ووزنه فيها) تُبنى مرة واحدة
+ودرجات كل المعالم = ضرب متجه السؤال في المصفوفة (np.bincount) ثم أفضل k بـ argpartition
+"""
+
+from collections import Counter
+from typing import List, Dict, Tuple, Iterable
+
+import numpy as np
+
+from arabic_text import normalize_arabic
+from ngram_index import char_ngrams
+
+# عدد الاقتراحات الافتراضي ("هل تقصد")
+DEFAULT_TOP_K = 5
+
+
+class TfidfRanker:
+    """
+    مصفوفة TF-IDF مخزنة بالأعمدة (CSC): لكل مقطع حرفي مدى في indices/data
+    الصفوف (المعالم) مطبّعة بطول 1 فالدرجة = تشابه جيب التمام مع السؤال
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names: List[str] = list(names)
+        self.columns: Dict[str, int] = {}
+        rows: List[int] = []
+        columns: List[int] = []
+        counts: List[int] = []
+        for row, name in enumerate(self.names):
+            for gram, count in Counter(char_ngrams(normalize_arabic(name))).items():
+                rows.append(row)
+                columns.append(self.columns.setdefault(gram, len(self.columns)))
+                counts.append(count)
+
+        row_ids = np.array(rows, dtype=np.int64)
+        column_ids = np.array(columns, dtype=np.int64)
+        data = np.array(counts, dtype=np.float64)
+        # IDF الناعم: المقطع الموجود في كل المعالم وزنه 1
+        document_frequency = np.bincount(column_ids, minlength=len(self.columns))
+        self.idf = np.log((1 + len(self.names)) / (1 + document_frequency)) + 1.0
+        data *= self.idf[column_ids]
+        norms = np.sqrt(np.bincount(row_ids, weights=data * data, minlength=len(self.names)))
+        data /= norms[row_ids]
+
+        order = np.argsort(column_ids, kind='stable')
+        self.indptr = np.zeros(len(self.columns) + 1, dtype=np.int64)
+        self.indptr[1:] = np.cumsum(document_frequency)
+        self.indices = row_ids[order]
+        self.data = data[order]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def scores(self, text: str) -> np.ndarray:
+        """درجة كل المعالم للنص (0 للمعالم بدون أي مقطع مشترك)"""
+        grams = Counter(char_ngrams(normalize_arabic(text)))
+        columns = [(self.columns[gram], count) for gram, count in grams.items() if gram in self.columns]
+        if not columns:
+            return np.zeros(len(self.names))
+        weights = np.array([count * self.idf[column] for column, count in columns])
+        # المقاطع غير الموجودة في أي معلم (df = 0) تدخل في طول متجه السؤال فتخفض الدرجة
+        unseen_idf = np.log(1 + len(self.names)) + 1.0
+        unseen = sum(count * count for gram, count in grams.items() if gram not in self.columns)
+        weights /= np.sqrt(np.dot(weights, weights) + unseen * unseen_idf ** 2)
+        spans = [(self.indptr[column], self.indptr[column + 1]) for column, _ in columns]
+        indices = np.concatenate([self.indices[start:end] for start, end in spans])
+        values = np.concatenate([self.data[start:end] * weight for (start, end), weight in zip(spans, weights)])
+        return np.bincount(indices, weights=values, minlength=len(self.names))
+
+    def top_k(self, text: str, k: int = DEFAULT_TOP_K) -> List[Tuple[str, float]]:
+        """أقرب k معالم مرتبة من الأعلى درجة: [(الاسم، الدرجة)]"""
+        scores = self.scores(text)
+        if not len(scores) or k <= 0:
+            return []
+        if k < len(scores):
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(scores))
+        best = best[np.argsort(-scores[best], kind='stable')]
+        return [(self.names[idx], float(scores[idx])) for idx in best if scores[idx] > 0]
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+فهرس مقلوب على كلمات أسماء المحطات مع ترجيح BM25
+الكلمات الشائعة مثل "شارع" أو "منطقة" وزنها منخفض (IDF)
+فلا تكفي وحدها لاعتبار المحطة مطابقة بالكلمات
+"""
+
+import math
+from typing import List, Dict, Set, Tuple
+
+# معاملات BM25 المعتادة
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# أقصى عدد كلمات بحث محفوظة نتائجها
+WORD_CACHE_SIZE = 4096
+
+
+class TokenIndex:
+    """الكلمة ← المحطات التي تحتويها، مع إحصائيات BM25 لكل محطة"""
+
+    def __init__(self, keys: List[str]):
+        # نفس قائمة المفاتيح في جدول المحطات (تُضاف لها المحطات الجديدة فقط)
+        self.keys = keys
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.lengths: List[int] = []
+        self._total_length = 0
+        # كلمة البحث ← الكلمات في الفهرس التي تحتويها
+        self._containing: Dict[str, Tuple[str, ...]] = {}
+        self.update()
+
+    def update(self):
+        """فهرسة المحطات التي أُضيفت منذ آخر تحديث"""
+        if len(self.lengths) == len(self.keys):
+            return
+        for stop_id in range(len(self.lengths), len(self.keys)):
+            tokens = self.keys[stop_id].split()
+            for token in tokens:
+                counts = self.postings.setdefault(token, {})
+                counts[stop_id] = counts.get(stop_id, 0) + 1
+            self.lengths.append(len(tokens))
+            self._total_length += len(tokens)
+        # كلمات جديدة قد تحتوي كلمات بحث سابقة
+        self._containing.clear()
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def idf(self, token: str) -> float:
+        """وزن الكلمة: أعلى للكلمات النادرة"""
+        count = len(self.lengths)
+        frequency = len(self.postings.get(token, ()))
+        return math.log(1 + (count - frequency + 0.5) / (frequency + 0.5))
+
+    def tokens_containing(self, word: str) -> Tuple[str, ...]:
+        """كلمات الفهرس التي تحتوي كلمة البحث (تُحسب مرة واحدة لكل كلمة)"""
+        tokens = self._containing.get(word)
+        if tokens is None:
+            tokens = tuple(token for token in self.postings if word in token)
+            if len(self._containing) >= WORD_CACHE_SIZE:
+                self._containing.clear()
+            self._containing[word] = tokens
+        return tokens
+
+    def stops_containing(self, word: str) -> Set[int]:
+        """المحطات التي يحتوي اسمها الكلمة (داخل كلمة واحدة من الاسم)"""
+        stops = set()
+        for token in self.tokens_containing(word):
+            stops.update(self.postings[token])
+        return stops
+
+    def stops_inside(self, text: str) -> Set[int]:
+        """المحطات المرشحة لأن يكون اسمها جزءاً من النص (كل كلماتها موجودة فيه)"""
+        stops = set()
+        for token, counts in self.postings.items():
+            if token in text:
+                stops.update(counts)
+        return stops
+
+    def score(self, words: List[str]) -> Dict[int, float]:
+        """
+        درجة BM25 لكل محطة مطابقة مقسومة على أعلى درجة ممكنة للكلمات (0 إلى 1)
+        الكلمة غير الموجودة في أي محطة تُحسب بأعلى وزن فتخفض الثقة
+        """
+        count = len(self.lengths)
+        if not count or not words:
+            return {}
+        average_length = self._total_length / count
+        max_idf = math.log(1 + (count + 0.5) / 0.5)
+        scores: Dict[int, float] = {}
+        ideal = 0.0
+        for word in words:
+            tokens = self.tokens_containing(word)
+            ideal += max((self.idf(token) for token in tokens), default=max_idf)
+            # أفضل كلمة مطابقة لكل محطة (حتى لا تُحسب الكلمة أكثر من مرة)
+            best: Dict[int, float] = {}
+            for token in tokens:
+                idf = self.idf(token)
+                for stop_id, frequency in self.postings[token].items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[stop_id] / average_length)
+                    weight = idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    if weight > best.get(stop_id, 0.0):
+                        best[stop_id] = weight
+            for stop_id, weight in best.items():
+                scores[stop_id] = scores.get(stop_id, 0.0) + weight
+        if ideal <= 0:
+            return {}
+        # كلمة مطابقة مرة واحدة في اسم بطول متوسط تساوي درجتها idf بالضبط
+        return {stop_id: min(1.0, score / ideal) for stop_id, score in scores.items()}
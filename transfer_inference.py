@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""
+استنتاج تحويلات المشي بين محطات الخطوط المختلفة من الإحداثيات
+يحسب المسافات بين كل المحطات دفعة واحدة (هافرساين على مصفوفات NumPy)
+ويحفظ الأزواج الأقرب من الحد المسموح في جدول walking_transfer بجوار route_connection
+
+الاستخدام: python transfer_inference.py --max-distance 300
+"""
+
+import sys
+import math
+import sqlite3
+import argparse
+from datetime import datetime
+from typing import List, Dict, Tuple
+
+import numpy as np
+
+from routing_engine import TransitEngine
+from stop_table import canonical_stop_key
+from spatial_index import haversine_m, load_geocache_coordinates
+
+DB_FILE = 'admin_bot.db'
+
+# أقصى مسافة مشي افتراضية للتحويل (متر)
+DEFAULT_MAX_DISTANCE_M = 300.0
+
+# المشي الفعلي أطول من الخط المستقيم بسبب الشوارع
+WALKING_DETOUR_FACTOR = 1.3
+WALKING_SPEED_M_PER_MIN = 80.0
+
+# عدد الصفوف في كل دفعة حتى لا تكبر مصفوفة المسافات في الذاكرة
+BLOCK_SIZE = 1024
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS walking_transfer (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    from_stop VARCHAR(200) NOT NULL,
+    to_stop VARCHAR(200) NOT NULL,
+    distance_m FLOAT NOT NULL,
+    walking_time INTEGER NOT NULL,
+    created_at DATETIME
+)
+"""
+
+
+def estimate_walking_time(distance_m: float) -> int:
+    """تقدير دقائق المشي من المسافة المستقيمة"""
+    return max(1, math.ceil(distance_m * WALKING_DETOUR_FACTOR / WALKING_SPEED_M_PER_MIN))
+
+
+def infer_walking_transfers(engine: TransitEngine, coordinates: Dict[str, Tuple[float, float]],
+                            max_distance_m: float = DEFAULT_MAX_DISTANCE_M) -> List[Dict]:
+    """
+    أزواج المحطات (بدون تكرار) الأقرب من max_distance_m وتخدمها خطوط مختلفة
+    المحطات المشتركة أو المتكافئة بالاسم مستبعدة لأنها تحويل بدون مشي أصلاً
+    """
+    by_key = {canonical_stop_key(name): value for name, value in coordinates.items()}
+    stop_ids = []
+    for stop_id, key in enumerate(engine.stops.keys):
+        if engine.stop_routes[stop_id] and key in by_key:
+            stop_ids.append(stop_id)
+    if len(stop_ids) < 2:
+        return []
+
+    points = np.array([by_key[engine.stops.keys[stop_id]] for stop_id in stop_ids])
+    lats, lngs = points[:, 0], points[:, 1]
+    route_sets = [frozenset(route_idx for route_idx, _ in engine.stop_routes[stop_id]) for stop_id in stop_ids]
+    equivalents = engine.transfer_table.equivalents
+
+    transfers = []
+    count = len(stop_ids)
+    for block_start in range(0, count, BLOCK_SIZE):
+        block_end = min(block_start + BLOCK_SIZE, count)
+        distances = haversine_m(lats[block_start:block_end, None], lngs[block_start:block_end, None],
+                                lats[None, :], lngs[None, :])
+        # المثلث العلوي فقط حتى لا يتكرر الزوج
+        rows, cols = np.nonzero(distances <= max_distance_m)
+        rows = rows + block_start
+        upper = cols > rows
+        for i, j, distance in zip(rows[upper].tolist(), cols[upper].tolist(),
+                                  distances[rows[upper] - block_start, cols[upper]].tolist()):
+            if route_sets[i] == route_sets[j]:
+                continue
+            from_stop, to_stop = stop_ids[i], stop_ids[j]
+            if to_stop in equivalents.get(from_stop, ()):
+                continue
+            transfers.append({
+                'from_stop': engine.stop_names[from_stop],
+                'to_stop': engine.stop_names[to_stop],
+                'distance_m': round(distance, 1),
+                'walking_time': estimate_walking_time(distance)
+            })
+    transfers.sort(key=lambda transfer: transfer['distance_m'])
+    return transfers
+
+
+def save_walking_transfers(transfers: List[Dict], db_path: str = DB_FILE):
+    """استبدال محتوى جدول walking_transfer بالنتائج الجديدة"""
+    conn = sqlite3.connect(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(CREATE_TABLE_SQL)
+        cursor.execute("DELETE FROM walking_transfer")
+        now = datetime.utcnow().isoformat(sep=' ')
+        cursor.executemany(
+            "INSERT INTO walking_transfer (from_stop, to_stop, distance_m, walking_time, created_at) VALUES (?, ?, ?, ?, ?)",
+            [(t['from_stop'], t['to_stop'], t['distance_m'], t['walking_time'], now) for t in transfers]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="استنتاج تحويلات المشي بين الخطوط")
+    parser.add_argument('--max-distance', type=float, default=DEFAULT_MAX_DISTANCE_M)
+    parser.add_argument('--dry-run', action='store_true', help="عرض النتائج بدون حفظ")
+    args = parser.parse_args()
+
+    from database_helper import get_routes_from_db, get_location_coordinates_from_db
+    from route_cache import bump_data_version
+
+    engine = TransitEngine(get_routes_from_db())
+    coordinates = load_geocache_coordinates()
+    coordinates.update(get_location_coordinates_from_db())
+    transfers = infer_walking_transfers(engine, coordinates, args.max_distance)
+
+    for transfer in transfers[:20]:
+        print(f"🚶 {transfer['from_stop']} ↔ {transfer['to_stop']}: "
+              f"{transfer['distance_m']:.0f}م (~{transfer['walking_time']} د)")
+    if args.dry_run:
+        print(f"ℹ️ {len(transfers)} تحويل (لم يتم الحفظ)")
+        return 0
+
+    save_walking_transfers(transfers)
+    bump_data_version('walking_transfers')
+    print(f"✅ تم حفظ {len(transfers)} تحويل مشي في جدول walking_transfer")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())